@@ -3,18 +3,23 @@ import subprocess
 import sys
 import io
 import shutil
+import argparse
+import threading
+import time
 from pathlib import Path
 
+POLITICAS_FALHA = ('perguntar', 'continuar', 'abortar')
+
 def setup_utf8_encoding():
-    """Configura o encoding para UTF-8 no terminal"""
-    sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
-    sys.stderr = io.TextIOWrapper(sys.stderr.buffer, encoding='utf-8')
+    """Configura o encoding para UTF-8 no terminal (linha a linha, para logs ao vivo em arquivo ou no modo --vigiar)"""
+    sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8', line_buffering=True)
+    sys.stderr = io.TextIOWrapper(sys.stderr.buffer, encoding='utf-8', line_buffering=True)
 
 def limpar_pasta_done():
     """Limpa apenas a pasta done antes de iniciar o processamento"""
     try:
         base_dir = Path(__file__).resolve().parent
-        done_path = base_dir / "src" / "output" / "gerador" / "done"
+        done_path = Path(os.getenv('geradorPath') or base_dir / "src" / "output" / "gerador").resolve() / "done"
         
         if done_path.exists():
             shutil.rmtree(done_path)
@@ -42,8 +47,11 @@ def load_env_file(env_path='.env'):
 
 def run_script(script_path, script_name):
     """
-    Executa um script Python com encoding UTF-8
+    Executa um script Python com encoding UTF-8, repassando a saída ao vivo;
+    as linhas de evento (eventosPipe) vão para o consumidor de progresso
     """
+    from src.utils.eventos import ler_evento, publicar
+
     if not os.path.exists(script_path):
         print(f"Erro: Arquivo {script_path} não encontrado!")
         return False
@@ -61,52 +69,375 @@ def run_script(script_path, script_name):
         # Garante que o pacote src seja encontrado
         project_root = str(Path(__file__).resolve().parent)
         env['PYTHONPATH'] = project_root + os.pathsep + env.get('PYTHONPATH', '')
+        env['PYTHONUNBUFFERED'] = '1'
+        # O script publica seus eventos de progresso no stdout, com prefixo próprio
+        env['eventosPipe'] = '1'
         
-        # Executa o script com encoding UTF-8
-        result = subprocess.run(
-            [sys.executable, "-X", "utf8", script_path], 
-            capture_output=True, 
+        # Executa o script com encoding UTF-8; a saída é lida linha a linha, sem acumular em memória
+        process = subprocess.Popen(
+            [sys.executable, "-X", "utf8", script_path],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
             text=True,
             encoding='utf-8',
+            errors='replace',
             env=env,
-            timeout=300
         )
-        
-        if result.returncode == 0:
+        estourou = threading.Event()
+
+        def encerrar_por_timeout():
+            estourou.set()
+            process.kill()
+
+        timer = threading.Timer(300, encerrar_por_timeout)
+        timer.start()
+        try:
+            for linha in process.stdout:
+                evento = ler_evento(linha)
+                if evento is not None:
+                    publicar(evento)
+                else:
+                    print(f"[{script_name}] {linha}", end='')
+            returncode = process.wait()
+        finally:
+            timer.cancel()
+
+        if estourou.is_set():
+            print(f"ERRO: Timeout ao executar {script_name}")
+            return False
+        if returncode == 0:
             print(f"SUCESSO: {script_name} executado com sucesso!")
-            if result.stdout:
-                print(f"Saída: {result.stdout}")
             return True
-        else:
-            print(f"ERRO: Erro ao executar {script_name}")
-            print(f"Código de saída: {result.returncode}")
-            if result.stderr:
-                print(f"Erro: {result.stderr}")
-            return False
-            
-    except subprocess.TimeoutExpired:
-        print(f"ERRO: Timeout ao executar {script_name}")
+        print(f"ERRO: Erro ao executar {script_name}")
+        print(f"Código de saída: {returncode}")
         return False
+
     except Exception as e:
         print(f"ERRO: Erro inesperado ao executar {script_name}: {e}")
         return False
 
-def main():
+def run_stage(script_key, script_name):
+    """
+    Executa a etapa no próprio processo, reaproveitando config, token, sessão HTTP e planilha
     """
-    Função principal que carrega o .env e executa os scripts na sequência
+    from src.main.pipeline.runner import executar_etapa
+
+    print(f"\n{'='*50}")
+    print(f"Executando: {script_name}")
+    print(f"{'='*50}")
+
+    if executar_etapa(script_key):
+        print(f"SUCESSO: {script_name} executado com sucesso!")
+        return True
+    print(f"ERRO: Erro ao executar {script_name}")
+    return False
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Geração de dossiês de Boletins de Ocorrência")
+    parser.add_argument(
+        "--subprocess",
+        action="store_true",
+        help="Executa cada etapa em um interpretador separado (modo antigo, usa os caminhos do .env)",
+    )
+    parser.add_argument(
+        "--sequencial",
+        action="store_true",
+        help="Executa uma etapa por vez, na ordem declarada (sem paralelismo)",
+    )
+    parser.add_argument(
+        "--retomar",
+        action="store_true",
+        help="Retoma a execução anterior: não limpa as pastas e pula os documentos já concluídos (ledger)",
+    )
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Processa só as linhas novas ou alteradas desde a última execução, reaproveitando os PDFs já baixados",
+    )
+    parser.add_argument(
+        "--streaming",
+        action="store_true",
+        help="Monta cada dossiê (placa_userId) de ponta a ponta, sem esperar a planilha inteira em cada etapa",
+    )
+    parser.add_argument(
+        "--em-voo",
+        type=int,
+        default=None,
+        metavar="N",
+        help="Máximo de dossiês em andamento ao mesmo tempo no modo --streaming (padrão: 4)",
+    )
+    parser.add_argument(
+        "--headless",
+        action="store_true",
+        help="Execução sem interação (cron): nunca pergunta nada e aplica a política de --ao-falhar (padrão: continuar)",
+    )
+    parser.add_argument(
+        "--ao-falhar",
+        choices=POLITICAS_FALHA,
+        default=None,
+        help="O que fazer quando uma etapa falha: perguntar (padrão interativo), continuar ou abortar",
+    )
+    parser.add_argument(
+        "--repetir",
+        type=int,
+        default=None,
+        metavar="N",
+        help="Repete uma etapa com falha até N vezes antes de aplicar a política de --ao-falhar (padrão: 0)",
+    )
+    parser.add_argument(
+        "--relatorio",
+        default=None,
+        metavar="CAMINHO",
+        help="Arquivo JSON do relatório da execução (padrão: src/output/relatorios/execucao_<data_hora>.json)",
+    )
+    parser.add_argument(
+        "--eventos",
+        default=None,
+        metavar="CAMINHO",
+        help="Arquivo JSONL dos eventos de progresso (padrão: src/output/eventos/eventos_<data_hora>.jsonl)",
+    )
+    parser.add_argument(
+        "--sem-progresso",
+        action="store_true",
+        help="Não mostra a barra de progresso (os eventos continuam sendo gravados no JSONL)",
+    )
+    parser.add_argument(
+        "--planilha",
+        default=None,
+        metavar="CAMINHO",
+        help="Planilha de entrada ou pasta com várias (juntas numa execução, sem chaves repetidas); padrão: excel do .env",
+    )
+    parser.add_argument(
+        "--todas-as-abas",
+        action="store_true",
+        help="Lê todas as abas de cada pasta de trabalho (o mesmo que excelPage=*)",
+    )
+    parser.add_argument(
+        "--vigiar",
+        nargs="?",
+        const="",
+        default=None,
+        metavar="PASTA",
+        help="Fica rodando e processa cada planilha (.xlsx, .csv, .jsonl, .parquet) que chegar na pasta (padrão: pastaEntrada do .env)",
+    )
+    parser.add_argument(
+        "--intervalo",
+        type=float,
+        default=None,
+        metavar="SEGUNDOS",
+        help="Intervalo entre as varreduras da pasta no modo --vigiar (padrão: 5)",
+    )
+    parser.add_argument(
+        "--shard",
+        default=None,
+        metavar="I/N",
+        help="Processa só a fatia I de N da planilha (hash de placa_userId), com saídas em src/output/shards/shard_I_de_N",
+    )
+    parser.add_argument(
+        "--reconciliar",
+        nargs="?",
+        type=int,
+        const=0,
+        default=None,
+        metavar="N",
+        help="Junta as saídas dos N shards e roda o merge sobre a planilha inteira (sem N, detecta os shards)",
+    )
+    parser.add_argument(
+        "--auditar",
+        nargs="?",
+        const="",
+        default=None,
+        metavar="CAMINHO",
+        help="Só confere as saídas: documentos faltando, extras e divergentes por chave (JSON em src/output/relatorios)",
+    )
+    return parser.parse_args(argv)
+
+def politica_de_falha(args):
+    """Política efetiva: argumento, variável aoFalhar do .env ou o padrão do modo (perguntar / continuar no headless)."""
+    politica = args.ao_falhar or os.getenv('aoFalhar') or ('continuar' if args.headless else 'perguntar')
+    if politica not in POLITICAS_FALHA:
+        print(f"Erro: política de falha inválida: {politica} (use {', '.join(POLITICAS_FALHA)})")
+        sys.exit(1)
+    if politica == 'perguntar' and args.headless:
+        print("Erro: --headless não pode perguntar; use --ao-falhar continuar ou abortar")
+        sys.exit(1)
+    repeticoes = args.repetir if args.repetir is not None else int(os.getenv('repetirEtapa') or 0)
+    return politica, max(repeticoes, 0)
+
+def iniciar_eventos(args, total=None):
+    """Inicia o consumidor que grava os eventos em JSONL e mostra a barra de progresso"""
+    from src.utils.eventos import ConsumidorEventos
+
+    consumidor = ConsumidorEventos(args.eventos, total=total, progresso=not args.sem_progresso).iniciar()
+    print(f"📶 Eventos de progresso: {consumidor.caminho}")
+    return consumidor
+
+def run_streaming(args, incremental=False):
     """
+    Executa o modo streaming: cada dossiê é coletado, gerado e mesclado assim que fica pronto
+    """
+    from src.main.pipeline.incremental import confirmar_incremental, preparar_incremental
+    from src.main.pipeline.runner import preparar_contexto
+    from src.main.pipeline.streaming import executar_streaming
+
+    # o incremental compara a planilha inteira com o ledger; fora dele as linhas são lidas sob demanda
+    preparar_contexto(carregar_planilha=incremental)
+    try:
+        pendentes = preparar_incremental() if incremental else None
+    except ValueError as e:
+        print(f"Erro: {e}")
+        return 1
+    if pendentes == {}:
+        print("✅ Nenhuma linha nova ou alterada desde a última execução")
+        return
+    consumidor = iniciar_eventos(args)
+    try:
+        resultados = executar_streaming(args.em_voo)
+    except ValueError as e:
+        print(f"Erro: {e}")
+        return 1
+    finally:
+        consumidor.parar()
+    if incremental:
+        confirmar_incremental(pendentes)
+    if not resultados:
+        return 1
+
+    completos = [chave for chave, ok in resultados.items() if ok]
+    incompletos = [chave for chave, ok in resultados.items() if not ok]
+
+    print(f"\n{'='*50}")
+    print("RELATÓRIO DE EXECUÇÃO (STREAMING)")
+    print(f"{'='*50}")
+    print(f"Dossiês mesclados: {len(completos)}")
+    if incompletos:
+        print(f"Dossiês incompletos: {len(incompletos)}")
+        for chave in incompletos:
+            print(f"  INCOMPLETO: {chave}")
+    print(f"{'='*50}")
+    return 2 if incompletos else 0
+
+def main(argv=None):
+    """
+    Função principal que carrega o .env e executa os scripts na sequência.
+    Retorna o código de saída: 0 sucesso, 1 erro de configuração, 2 etapa com falha, 3 execução interrompida
+    """
+    args = parse_args(argv)
+
     # Configura encoding UTF-8
     setup_utf8_encoding()
     
     print("🚀 Iniciando execução dos scripts...")
+
+    from src.utils.ledger import manter_pastas
+
+    if args.shard:
+        from src.main.pipeline.shards import configurar_shard, ler_shard
+
+        if args.subprocess:
+            print("Erro: --shard requer as etapas no mesmo processo (não use --subprocess)")
+            return 1
+        try:
+            indice, total = ler_shard(args.shard)
+        except ValueError as e:
+            print(f"Erro: {e}")
+            return 1
+        # antes do .env e dos imports das etapas: saídas, ledger e manifesto vão para a pasta do shard
+        configurar_shard(indice, total)
+
+    # antes do .env, que não sobrescreve variáveis já definidas
+    if args.planilha:
+        os.environ['excel'] = os.path.abspath(os.path.expanduser(args.planilha))
+    if args.todas_as_abas:
+        from src.utils.fileUtils import TODAS_AS_ABAS
+
+        os.environ['excelPage'] = TODAS_AS_ABAS
+
+    if args.vigiar is not None:
+        # entre um arquivo e outro só as linhas novas ou alteradas são processadas
+        args.incremental = True
+
+    if args.incremental and args.subprocess:
+        print("Erro: --incremental e --vigiar requerem as etapas no mesmo processo (não use --subprocess)")
+        return 1
+
+    if args.retomar:
+        # vale também para as etapas em subprocess, que herdam o ambiente
+        os.environ['retomar'] = '1'
+    if args.incremental:
+        os.environ['incremental'] = '1'
     
-    # Limpar apenas a pasta done
-    print("\n🧹 Limpando pasta done...")
-    limpar_pasta_done()
+    if args.auditar is not None:
+        # só leitura: nada é limpo nem baixado
+        load_env_file()
+        return run_audit(args)
+
+    # Limpar apenas a pasta done (na retomada e no modo incremental os dossiês já mesclados são mantidos)
+    if args.retomar:
+        print("\n⏯️  Retomando execução anterior: pastas mantidas, documentos concluídos serão pulados")
+    elif manter_pastas():
+        print("\n📈 Pastas mantidas: os PDFs já baixados são reaproveitados")
+    else:
+        print("\n🧹 Limpando pasta done...")
+        limpar_pasta_done()
     
     # Carrega as configurações do .env
     config = load_env_file()
+    politica, repeticoes = politica_de_falha(args)
+
+    if args.reconciliar is not None:
+        from src.main.pipeline.shards import reconciliar
+
+        return 0 if reconciliar(args.reconciliar or None) else 1
+
+    if args.vigiar is not None:
+        return run_watch(args, config, politica, repeticoes)
+
+    if args.streaming:
+        return run_streaming(args, incremental=args.incremental) or 0
+
+    return run_pipeline(args, config, politica, repeticoes)
+
+def run_audit(args):
+    """Confere as saídas contra a planilha e o ledger. Retorna 0 quando tudo confere, 2 quando há diferenças"""
+    from src.main.pipeline.auditoria import auditar
+    from src.main.pipeline.shards import preparar_shard
+
+    try:
+        preparar_shard()
+        relatorio = auditar()
+    except ValueError as e:
+        print(f"Erro: {e}")
+        return 1
+    relatorio.imprimir()
+    caminho = relatorio.salvar(args.auditar or None)
+    print(f"📄 Relatório da auditoria: {caminho}")
+    return 0 if relatorio.consistente() else 2
+
+def run_watch(args, config, politica, repeticoes):
+    """
+    Modo contínuo: processa cada planilha que chega na pasta vigiada, mantendo neste processo
+    módulos importados, token, conexões HTTP e caches entre um arquivo e outro
+    """
+    from src.main.pipeline.vigia import vigiar
 
+    pasta = args.vigiar or os.getenv('pastaEntrada')
+    if not pasta:
+        print("Erro: informe a pasta em --vigiar PASTA ou na variável pastaEntrada do .env")
+        return 1
+
+    def processar():
+        if args.streaming:
+            return run_streaming(args, incremental=True) or 0
+        return run_pipeline(args, config, politica, repeticoes)
+
+    return vigiar(pasta, processar, intervalo=args.intervalo)
+
+def run_pipeline(args, config, politica, repeticoes):
+    """
+    Executa as etapas pelo grafo de dependências (no processo ou em subprocess) e grava o relatório.
+    Retorna o código de saída
+    """
     # Define caminhos padrão relativos ao projeto, permitindo override pelo .env
     base_dir = Path(__file__).resolve().parent
     defaults = {
@@ -144,24 +475,102 @@ def main():
         print("Erro: Os seguintes scripts não foram encontrados:")
         for key, path in missing_scripts:
             print(f"  {key}: {path}")
-        sys.exit(1)
+        return 1
     
-    # Executa os scripts na sequência
-    successful_scripts = []
-    failed_scripts = []
-    
-    for script_key, script_name in execution_sequence:
-        script_path = config[script_key]
-        
-        if run_script(script_path, script_name):
-            successful_scripts.append(script_name)
+    # No modo padrão as etapas rodam neste processo e compartilham o estado carregado uma única vez
+    from src.main.pipeline.runner import DEPENDENCIAS, preparar_contexto
+    from src.main.pipeline.scheduler import executar_grafo
+    from src.main.pipeline.validacao import preparar_validacao
+
+    pendentes = None
+    rejeitadas = {}
+    if not args.subprocess:
+        preparar_contexto()
+    # linhas que nunca dariam certo saem antes do plano (no --subprocess, só do plano dos coletores)
+    try:
+        rejeitadas = preparar_validacao()
+    except ValueError as e:
+        print(f"⚠️  Validação prévia não executada: {e}")
+    if not args.subprocess:
+        if args.incremental:
+            from src.main.pipeline.incremental import preparar_incremental
+
+            pendentes = preparar_incremental()
+            if not pendentes:
+                print("✅ Nenhuma linha nova ou alterada desde a última execução")
+                return 0
+
+    # Plano único (regras por tipo de ocorrência + chaves sem repetição) consumido por todos os coletores;
+    # no modo --subprocess as etapas o leem do manifesto indicado na variável 'manifesto'
+    from src.main.pipeline.planner import preparar_plano
+    from src.main.pipeline.relatorio import RelatorioExecucao
+
+    plano = None
+    try:
+        plano = preparar_plano()
+    except ValueError as e:
+        print(f"⚠️  Plano de trabalho não gerado: {e}")
+
+    script_names = dict(execution_sequence)
+    relatorio = RelatorioExecucao(
+        modo='subprocess' if args.subprocess else 'processo',
+        politica={'ao_falhar': politica, 'repeticoes': repeticoes, 'headless': args.headless},
+        rejeitadas=rejeitadas,
+    )
+
+    def executar(script_key):
+        from src.utils.eventos import emitir_etapa
+
+        emitir_etapa(script_key, 'inicio')
+        inicio = time.perf_counter()
+        if args.subprocess:
+            ok = run_script(config[script_key], script_names[script_key])
         else:
-            failed_scripts.append(script_name)
-            # Pergunta se deve continuar apesar do erro
-            continuar = input(f"\nErro ao executar {script_name}. Deseja continuar? (s/N): ")
-            if continuar.lower() != 's':
-                print("Execução interrompida pelo usuário.")
-                break
+            ok = run_stage(script_key, script_names[script_key])
+        emitir_etapa(script_key, 'ok' if ok else 'falha', duracao=time.perf_counter() - inicio)
+        return ok
+
+    etapas_medidas = {
+        key: relatorio.medir(key, script_names[key], executar, repeticoes) for key, _ in execution_sequence
+    }
+
+    def ao_falhar(script_key):
+        if politica == 'continuar':
+            print(f"\n⚠️  {script_names[script_key]} falhou; continuando (--ao-falhar continuar)")
+            return True
+        if politica == 'abortar':
+            print(f"\n⛔ {script_names[script_key]} falhou; nenhuma etapa nova será iniciada (--ao-falhar abortar)")
+            return False
+        # Pergunta se deve continuar apesar do erro (sem terminal, como no cron, interrompe)
+        try:
+            continuar = input(f"\nErro ao executar {script_names[script_key]}. Deseja continuar? (s/N): ")
+        except EOFError:
+            continuar = ''
+        if continuar.lower() != 's':
+            print("Execução interrompida pelo usuário.")
+            return False
+        return True
+
+    # Coletores e gerador rodam em paralelo; o merge só começa quando todos terminam
+    dependencias = {key: DEPENDENCIAS[key] for key, _ in execution_sequence}
+    consumidor = iniciar_eventos(args, total=plano.total_documentos() if plano else None)
+    try:
+        resultados = executar_grafo(
+            dependencias,
+            lambda key: etapas_medidas[key](key),
+            max_paralelo=1 if args.sequencial else None,
+            ao_falhar=ao_falhar,
+        )
+    finally:
+        consumidor.parar()
+
+    if pendentes:
+        from src.main.pipeline.incremental import confirmar_incremental
+
+        confirmar_incremental(pendentes)
+
+    successful_scripts = [script_names[k] for k, ok in resultados.items() if ok]
+    failed_scripts = [script_names[k] for k, ok in resultados.items() if ok is False]
     
     # Relatório final
     print(f"\n{'='*50}")
@@ -180,5 +589,14 @@ def main():
     
     print(f"{'='*50}")
 
+    relatorio.finalizar(resultados, plano)
+    try:
+        caminho = relatorio.salvar(args.relatorio)
+        print(f"📄 Relatório JSON: {caminho}")
+    except OSError as e:
+        print(f"⚠️  Relatório JSON não gravado: {e}")
+    return relatorio.codigo_saida()
+
+
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    sys.exit(main())
\ No newline at end of file
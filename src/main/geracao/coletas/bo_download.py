@@ -1,5 +1,6 @@
 import os
-import requests
+import sys
+from pathlib import Path
 import pandas as pd
 from reportlab.lib.pagesizes import letter
 from reportlab.pdfgen import canvas
@@ -7,17 +8,29 @@ from reportlab.lib.utils import ImageReader
 import shutil
 import json
 
+# Garante que o pacote src seja encontrado quando rodar o script direto
+project_root = Path(__file__).resolve().parents[4]
+if str(project_root) not in sys.path:
+    sys.path.insert(0, str(project_root))
+
+from src.settings.auth import get_auth
+from src.settings.http import get_session, request_autenticado, request_with_timeout
+from src.main.pipeline.planner import get_plano
+from src.utils.ledger import ja_concluido, manter_pastas, registrar_documento
+
 # Configurações - consumidas do .env
-EXCEL_FILE = os.getenv("excelPath", r"C:\Users\Marcos Vinicio\Documents\scripts\dossiev4\dossiev4\src\utils\Relatório BOs.xlsx")
+EXCEL_FILE = os.getenv("excelPath") or os.getenv("excel", "src/utils/Relatório BOs.xlsx")
 OUTPUT_DIR = os.getenv("boOutputPath", r"C:\Users\Marcos Vinicio\Documents\scripts\dossiev4\dossiev4\src\output\gerador\bo")
-LOGIN_URL = os.getenv("loginUrl", "https://sso.mottu.cloud/realms/Internal/protocol/openid-connect/token")
 BO_URL_TEMPLATE = os.getenv("boUrlTemplate", "https://operation-backend.mottu.cloud/api/v2/Veiculo/BuscarDetalheVeiculoAnexos/{}/{}")
 
-# Credenciais vindo do .env
-username = os.getenv('email', 'marcos.santos@mottu.com.br')
-password = os.getenv('password', 'mitu.2809')
-client_id = os.getenv('client_id', 'mottu-admin')
-grant_type = os.getenv('grant_type', 'password')
+# MAPEAMENTO: dataOccurrenceType -> bo_type
+# Apenas processa quando dataOccurrenceType = 10, usando bo_type = 3
+OCORRENCIA_PARA_BO = {
+    10: "3"  # dataOccurrenceType 10 -> bo_type 3
+    # Adicione outros mapeamentos conforme necessário:
+    # 5: "5",  # dataOccurrenceType 5 -> bo_type 5
+    # 8: "2",  # dataOccurrenceType 8 -> bo_type 2
+}
 
 def limpar_pasta():
     """Limpa a pasta de output antes de executar"""
@@ -26,32 +39,13 @@ def limpar_pasta():
     os.makedirs(OUTPUT_DIR, exist_ok=True)
     print(f"Pasta {OUTPUT_DIR} limpa e criada")
 
-def obter_token():
-    """Obtém o token de autenticação Bearer"""
-    headers = {
-        'Content-Type': 'application/x-www-form-urlencoded',
-    }
-    authData = {
-        'username': username,
-        'password': password,
-        'client_id': client_id,
-        'grant_type': grant_type
-    }
-    try:
-        authResponse = requests.post(LOGIN_URL, headers=headers, data=authData)
-        print(LOGIN_URL)
-        print(headers)
-        print(authData)
+def caminho_bo(placa, vehicle_id, bo_type):
+    """Caminho final do PDF do BO (PLACA_VEHICLEID_BO_TIPO.pdf)"""
+    return os.path.join(OUTPUT_DIR, f"{str(placa).strip().upper()}_{int(vehicle_id)}_BO_{int(bo_type)}.pdf")
 
-        if authResponse.status_code == 200:
-            authToken = authResponse.json().get('access_token')
-            return authToken
-        else:
-            print(f'Erro na autenticação: {authResponse.status_code}')
-            return None
-    except Exception as e:
-        print(f'Erro na requisição de autenticação: {e}')
-        return None
+def obter_token():
+    """Obtém o token de autenticação Bearer (compartilhado via settings.auth)"""
+    return get_auth().get_token()
 
 def download_bo_file(url, local_filename):
     """Faz o download do arquivo do BO usando URL pré-assinada"""
@@ -59,7 +53,7 @@ def download_bo_file(url, local_filename):
         print(f"  📥 Baixando BO de URL pré-assinada: {url}")
         
         # Para URL pré-assinada, não precisa de token no header
-        with requests.get(url, stream=True, timeout=30) as r:
+        with request_with_timeout(get_session(), 'GET', url, timeout=30, stream=True) as r:
             r.raise_for_status()
             
             # Verifica o tipo de conteúdo
@@ -91,12 +85,14 @@ def download_bo_file(url, local_filename):
         print(f"  ❌ Erro ao baixar arquivo do BO: {e}")
         return None
 
-def get_bo_data(vehicle_id, bo_type, token):
-    """Obtém os dados do BO da API"""
+def get_bo_data(vehicle_id, bo_type):
+    """
+    Obtém os dados do BO da API (o token vem do Auth; num 401 é renovado e a busca repetida).
+    None quando a API não tem o BO; False quando a consulta falhou.
+    """
     try:
         headers = {
             "accept": "application/json, text/plain, */*",
-            "Authorization": f"Bearer {token}",
             "Language": "pt-BR",
             "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/141.0.0.0 Safari/537.36",
             "Referer": "https://admin-v3.mottu.cloud/"
@@ -104,7 +100,7 @@ def get_bo_data(vehicle_id, bo_type, token):
         
         url = BO_URL_TEMPLATE.format(vehicle_id, bo_type)
         print(f"  🔍 Buscando dados do BO: {url}")
-        response = requests.get(url, headers=headers)
+        response = request_autenticado(get_session(), 'GET', url, headers=headers)
         
         if response.status_code == 200:
             # Parse a resposta JSON
@@ -112,7 +108,7 @@ def get_bo_data(vehicle_id, bo_type, token):
             print(f"  ✅ Dados do BO encontrados")
             return response_data
         elif response.status_code == 401:
-            print("  🔐 Token expirado")
+            print("  🔐 Token recusado mesmo depois de renovado")
             return "TOKEN_EXPIRED"
         elif response.status_code == 404:
             print(f"  ⚠️ BO não encontrado para veículo {vehicle_id}, tipo {bo_type}")
@@ -120,10 +116,10 @@ def get_bo_data(vehicle_id, bo_type, token):
         else:
             print(f"  ❌ Erro ao buscar dados do BO: {response.status_code}")
             print(f"  Resposta: {response.text}")
-            return None
+            return False
     except Exception as e:
         print(f"  ❌ Erro na requisição dos dados do BO: {e}")
-        return None
+        return False
 
 def extrair_url_anexo(bo_data):
     """Extrai a URL do anexo dos dados do BO"""
@@ -162,7 +158,7 @@ def extrair_url_anexo(bo_data):
         print(f"  ❌ Erro ao extrair URL do anexo: {e}")
         return None
 
-def obter_url_pre_assinada(url_original, token):
+def obter_url_pre_assinada(url_original):
     """Obtém uma URL pré-assinada atualizada para o arquivo"""
     try:
         # Se a URL já é uma URL pré-assinada do S3, tentamos obter uma nova
@@ -237,8 +233,11 @@ def converter_imagem_para_pdf(arquivo_imagem, placa, vehicle_id, bo_type, output
         print(f"  ❌ Erro ao converter imagem para PDF: {e}")
         return False
 
-def process_bo(vehicle_id, bo_type, placa, token):
-    """Processa o BO do veículo: busca dados, extrai URL e baixa arquivo"""
+def process_bo(vehicle_id, bo_type, placa):
+    """
+    Processa o BO do veículo: busca dados, extrai URL e baixa arquivo.
+    True com o PDF gerado, "SEM_BO" quando a API não tem o BO, "TOKEN_EXPIRED" ou False na falha.
+    """
     try:
         vehicle_id = int(vehicle_id)
         bo_type = int(bo_type)
@@ -247,14 +246,17 @@ def process_bo(vehicle_id, bo_type, placa, token):
         print(f"  🔍 Buscando BO para Veículo: {vehicle_id}, Tipo: {bo_type}, Placa: {placa}")
         
         # Buscar dados do BO
-        bo_data = get_bo_data(vehicle_id, bo_type, token)
+        bo_data = get_bo_data(vehicle_id, bo_type)
         
         if bo_data == "TOKEN_EXPIRED":
             return "TOKEN_EXPIRED"
         
+        if bo_data is False:
+            return False
+        
         if not bo_data:
             print(f"  ⚠️ Nenhum BO encontrado para o veículo {vehicle_id}")
-            return True
+            return "SEM_BO"
         
         # Extrair URL do anexo
         anexo_url = extrair_url_anexo(bo_data)
@@ -265,7 +267,7 @@ def process_bo(vehicle_id, bo_type, placa, token):
             return criar_pdf_com_dados_bo(bo_data, placa, vehicle_id, bo_type)
         
         # Verificar se a URL precisa de renovação
-        anexo_url_atualizada = obter_url_pre_assinada(anexo_url, token)
+        anexo_url_atualizada = obter_url_pre_assinada(anexo_url)
         if anexo_url_atualizada:
             anexo_url = anexo_url_atualizada
         
@@ -375,69 +377,57 @@ def criar_pdf_com_dados_bo(bo_data, placa, vehicle_id, bo_type, file_extension=N
 
 def processar_boletins():
     """Processa todos os boletins de ocorrência"""
-    # Limpa a pasta
-    limpar_pasta()
+    # Limpa a pasta (na retomada e no modo incremental mantém os BOs já baixados)
+    if manter_pastas():
+        os.makedirs(OUTPUT_DIR, exist_ok=True)
+    else:
+        limpar_pasta()
     
-    # Obtém o token
-    bearer_token = obter_token()
-    if not bearer_token:
+    # Token via Auth (compartilhado no processo); as requisições o leem de lá
+    if not obter_token():
         print("Falha ao obter token. Abortando...")
-        return
+        return False
     
-    # Lê o arquivo Excel
+    # Plano de trabalho: um BO por (placa, veículo), apenas para os tipos cujo dossiê inclui BO
     try:
-        df = pd.read_excel(EXCEL_FILE)
-        print(f"Encontrados {len(df)} registros no arquivo Excel")
-        
-        # Verifica se as colunas necessárias existem
-        required_columns = ['dataVehiclePlate', 'dataVehicleId', 'dataOccurrenceType']
-        missing_columns = [col for col in required_columns if col not in df.columns]
-        if missing_columns:
-            print(f"❌ Colunas faltando no Excel: {missing_columns}")
-            return
-            
+        itens = get_plano().itens('BO')
+        print(f"BOs planejados: {len(itens)}")
     except Exception as e:
         print(f"Erro ao ler arquivo Excel: {e}")
-        return
-    
-    # MAPEAMENTO: dataOccurrenceType -> bo_type
-    # Apenas processa quando dataOccurrenceType = 10, usando bo_type = 3
-    ocorrencia_para_bo = {
-        10: "3"  # dataOccurrenceType 10 -> bo_type 3
-        # Adicione outros mapeamentos conforme necessário:
-        # 5: "5",  # dataOccurrenceType 5 -> bo_type 5
-        # 8: "2",  # dataOccurrenceType 8 -> bo_type 2
-    }
+        return False
     
-    # Processa cada linha do Excel
-    for index, row in df.iterrows():
+    for item in itens:
         try:
-            placa = str(row['dataVehiclePlate']).strip()
-            vehicle_id = str(int(row['dataVehicleId'])).strip()
-            data_occurrence_type = int(row['dataOccurrenceType'])
+            placa, vehicle_id, bo_type, chave = item.placa, item.vehicle_id, item.bo_type, item.chave
+            if ja_concluido(chave, 'BO'):
+                continue
             
-            # Verifica se este dataOccurrenceType deve ser processado
-            if data_occurrence_type in ocorrencia_para_bo:
-                bo_type = ocorrencia_para_bo[data_occurrence_type]
-                
-                print(f"\n📋 Processando linha {index + 1}: Placa {placa}, VehicleID {vehicle_id}, DataOccurrenceType {data_occurrence_type}, TipoBO {bo_type}")
-                
-                # Usa a função para processar o BO
-                resultado = process_bo(vehicle_id, bo_type, placa, bearer_token)
-                
-                if resultado == "TOKEN_EXPIRED":
-                    print("🔐 Token expirado. Reinicie o processo.")
-                    break
-                elif not resultado:
-                    print(f"❌ Falha ao processar BO para veículo {vehicle_id}")
-            else:
-                print(f"⏭️  Pulando linha {index + 1}: dataOccurrenceType {data_occurrence_type} não está no mapeamento")
+            print(f"\n📋 Processando: Placa {placa}, VehicleID {vehicle_id}, DataOccurrenceType {item.tipo_ocorrencia}, TipoBO {bo_type}")
+            
+            # Usa a função para processar o BO
+            resultado = process_bo(vehicle_id, bo_type, placa)
+            
+            if resultado == "TOKEN_EXPIRED":
+                # conta como falha deste item (e da etapa, se nenhum der certo) e segue para os demais
+                print("🔐 Token recusado mesmo depois de renovado. Verifique as credenciais do .env.")
+                registrar_documento(chave, 'BO', erro="token recusado mesmo depois de renovado")
+                continue
+            # sem PDF novo não registra o caminho: um arquivo antigo da pasta (retomada/incremental) não vira 'ok'
+            if resultado == "SEM_BO":
+                registrar_documento(chave, 'BO', erro="BO não encontrado na API")
+                continue
+            if not resultado:
+                print(f"❌ Falha ao processar BO para veículo {vehicle_id}")
+                registrar_documento(chave, 'BO', erro="falha ao buscar ou baixar o BO")
+                continue
+            registrar_documento(chave, 'BO', caminho_bo(placa, vehicle_id, bo_type))
                 
         except Exception as e:
-            print(f"❌ Erro ao processar linha {index}: {e}")
+            print(f"❌ Erro ao processar {item.chave}: {e}")
             continue
 
 if __name__ == "__main__":
     print("🚀 Iniciando processo de download e conversão de Boletins de Ocorrência...")
-    processar_boletins()
+    if processar_boletins() is False:
+        sys.exit(1)
     print("✅ Processo concluído!")
\ No newline at end of file
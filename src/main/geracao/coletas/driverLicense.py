@@ -7,13 +7,10 @@ if str(project_root) not in sys.path:
     sys.path.insert(0, str(project_root))
 
 import os
-import requests
-import pandas as pd
 from reportlab.lib.pagesizes import letter
 from reportlab.pdfgen import canvas
 from reportlab.lib.utils import ImageReader
 import shutil
-import json
 
 # Carrega .env de forma robusta usando src/settings/env_loader.py (com fallback)
 try:
@@ -48,21 +45,13 @@ except Exception as e:
     raise
 
 # Substitui valores hardcoded por variáveis do .env (com fallback para caminhos relativos ao projeto)
-EXCEL_FILE = Path(os.getenv('excel', r"src\utils\Relatório BOs.xlsx")).resolve()
 # se a variável 'saida' estiver definida, usa; senão usa pasta output padrão do projeto
 OUTPUT_DIR = Path(os.getenv('saida', r"src\output\gerador\cnh")).resolve()
 
-LOGIN_URL = os.getenv('auth_url', 'https://sso.mottu.cloud/realms/Internal/protocol/openid-connect/token')
 # Endpoint para buscar CNH — pode compor com backendUrl se preferir
 BACKEND_URL = os.getenv('backendUrl', 'https://backend.mottu.cloud/api/v2')
 CNH_URL_TEMPLATE = os.getenv('cnh_url_template', BACKEND_URL + '/UsuarioCnh/BuscarUrlCnh/{}?fullUrl=true')
 
-# Credenciais vindas do .env (NÃO deixar segredos hardcoded)
-username = os.getenv('email')
-password = os.getenv('password')
-client_id = os.getenv('client_id', 'mottu-admin')
-grant_type = os.getenv('grant_type', 'password')
-
 def limpar_pasta():
     """Limpa a pasta de output antes de executar"""
     if os.path.exists(OUTPUT_DIR):
@@ -71,12 +60,14 @@ def limpar_pasta():
     print(f"Pasta {OUTPUT_DIR} limpa e criada")
 
 # Auth handling now centralized in settings.auth
-from src.settings.auth import Auth
+from src.settings.auth import get_auth
+from src.settings.http import get_session, request_autenticado, request_with_timeout
+from src.main.pipeline.planner import get_plano
+from src.utils.ledger import ja_concluido, manter_pastas, registrar_documento
 
 
 def obter_token_via_auth() -> str | None:
-    auth = Auth()
-    token = auth.get_token()
+    token = get_auth().get_token()
     if not token:
         print("Falha ao obter token via Auth")
     return token
@@ -87,7 +78,7 @@ def download_cnh_file(url, local_filename):
         print(f"  📥 Baixando de URL pré-assinada: {url}")
         
         # Para URL pré-assinada, não precisa de token no header
-        with requests.get(url, stream=True, timeout=30) as r:
+        with request_with_timeout(get_session(), 'GET', url, timeout=30, stream=True) as r:
             r.raise_for_status()
             
             # Verifica o tipo de conteúdo
@@ -119,17 +110,19 @@ def download_cnh_file(url, local_filename):
         print(f"  ❌ Erro ao baixar arquivo: {e}")
         return None
 
-def get_driver_license_url(userId, token):
-    """Obtém a URL da CNH do usuário"""
+def get_driver_license_url(userId):
+    """
+    Obtém a URL da CNH do usuário (o token vem do Auth; num 401 é renovado e a busca repetida).
+    None quando o usuário não tem CNH; False quando a consulta falhou.
+    """
     try:
         headers = {
             "accept": "application/json",
-            "Authorization": f"Bearer {token}"
         }
         
         url = CNH_URL_TEMPLATE.format(userId)
         print(f"  🔍 Buscando URL da CNH: {url}")
-        response = requests.get(url, headers=headers)
+        response = request_autenticado(get_session(), 'GET', url, headers=headers)
         
         if response.status_code == 200:
             # Parse a resposta JSON
@@ -144,15 +137,15 @@ def get_driver_license_url(userId, token):
                 print(f"  ⚠️ Nenhuma CNH encontrada para o usuário {userId}")
                 return None
         elif response.status_code == 401:
-            print("  🔐 Token expirado")
+            print("  🔐 Token recusado mesmo depois de renovado")
             return "TOKEN_EXPIRED"
         else:
             print(f"  ❌ Erro ao buscar URL da CNH: {response.status_code}")
             print(f"  Resposta: {response.text}")
-            return None
+            return False
     except Exception as e:
         print(f"  ❌ Erro na requisição da URL da CNH: {e}")
-        return None
+        return False
 
 def converter_imagem_para_pdf(arquivo_imagem, placa, user_id, output_pdf):
     """Converte arquivo de imagem (JPG, PNG) para PDF"""
@@ -203,8 +196,11 @@ def converter_imagem_para_pdf(arquivo_imagem, placa, user_id, output_pdf):
         print(f"  ❌ Erro ao converter imagem para PDF: {e}")
         return False
 
-def process_driver_license(userId, plate, token):
-    """Processa a CNH do usuário: busca URL, baixa e converte para PDF se necessário"""
+def process_driver_license(userId, plate):
+    """
+    Processa a CNH do usuário: busca URL, baixa e converte para PDF se necessário.
+    True com o PDF gerado, "SEM_CNH" quando o usuário não tem CNH, "TOKEN_EXPIRED" ou False na falha.
+    """
     try:
         userId = int(userId)
         plate = str(plate).strip().upper()
@@ -212,17 +208,21 @@ def process_driver_license(userId, plate, token):
         print(f"  🔍 Buscando CNH para User: {userId}, Placa: {plate}")
         
         # Buscar URL da CNH
-        cnh_url = get_driver_license_url(userId, token)
+        cnh_url = get_driver_license_url(userId)
         
         if cnh_url == "TOKEN_EXPIRED":
             return "TOKEN_EXPIRED"
         
+        if cnh_url is False:
+            return False
+        
         if not cnh_url:
             print(f"  ⚠️ Nenhuma CNH encontrada para o usuário {userId}")
-            return True
+            return "SEM_CNH"
         
         # Nome do arquivo temporário
-        temp_filename = os.path.join(OUTPUT_DIR, f"temp_cnh_{userId}")
+        # inclui a placa: o modo streaming pode baixar CNHs do mesmo usuário em paralelo
+        temp_filename = os.path.join(OUTPUT_DIR, f"temp_cnh_{plate}_{userId}")
         
         # Fazer download do arquivo usando URL pré-assinada
         print(f"  📥 Baixando CNH de URL pré-assinada")
@@ -296,36 +296,6 @@ def process_driver_license(userId, plate, token):
                 pass
         return False
 
-def baixar_arquivo_cnh(user_id, bearer_token, filename):
-    """Baixa o arquivo da CNH para o usuário específico"""
-    headers = {
-        "accept": "application/json",
-        "Authorization": f"Bearer {bearer_token}"
-    }
-    
-    url = CNH_URL_TEMPLATE.format(user_id)
-    print(url)
-    response = requests.get(url, headers=headers)
-    
-    if response.status_code == 200:
-        # Parse a resposta JSON
-        response_data = response.json()
-        if response_data.get('dataResult'):
-            cnh_url = response_data['dataResult']
-            
-            # Baixa o arquivo da URL pré-assinada
-            temp_file = os.path.join(OUTPUT_DIR, f"temp_{filename}")
-            with requests.get(cnh_url, stream=True) as r:
-                r.raise_for_status()
-                with open(temp_file, 'wb') as f:
-                    for chunk in r.iter_content(chunk_size=8192):
-                        f.write(chunk)
-            print(f"Arquivo baixado para {filename}")
-            return temp_file
-    else:
-        print(f"Erro ao baixar CNH para user_id {user_id}: {response.status_code}")
-        return None
-
 def converter_para_pdf(arquivo_temp, placa, user_id, output_path):
     """Converte o arquivo baixado para PDF (função legada)"""
     try:
@@ -375,75 +345,58 @@ def converter_para_pdf(arquivo_temp, placa, user_id, output_path):
 
 def processar_boletins():
     """Processa todos os boletins de ocorrência"""
-    # Limpa a pasta
-    limpar_pasta()
+    # Limpa a pasta (na retomada e no modo incremental mantém as CNHs já baixadas)
+    if manter_pastas():
+        os.makedirs(OUTPUT_DIR, exist_ok=True)
+    else:
+        limpar_pasta()
     
-    # Obtém o token via Auth
-    auth = Auth()
-    bearer_token = auth.get_token()
-    if not bearer_token:
+    # Token via Auth (compartilhado no processo); as requisições o leem de lá
+    if not get_auth().get_token():
         print("Falha ao obter token. Abortando...")
-        return
+        return False
     
-    # Lê o arquivo Excel
+    # Plano de trabalho: uma CNH por (placa, userId), apenas para os tipos que usam CNH
     try:
-        df = pd.read_excel(EXCEL_FILE)
-        print(f"Encontrados {len(df)} registros no arquivo Excel: {EXCEL_FILE}")
+        itens = get_plano().itens('CNH')
+        print(f"CNHs planejadas: {len(itens)}")
     except Exception as e:
         print(f"Erro ao ler arquivo Excel: {e}")
-        return
+        return False
     
-    # Processa cada linha do Excel usando a nova função
-    for index, row in df.iterrows():
+    for item in itens:
         try:
-            placa = str(row.get('dataVehiclePlate', '')).strip()
-            raw_user = row.get('dataUserId', None)
-            occurrence_type = row.get('dataOccurrenceType', None)
-            
-            # Converter tipo de ocorrência
-            try:
-                occ_type_int = int(occurrence_type) if occurrence_type not in (None, '-', '') else 0
-            except (ValueError, TypeError):
-                occ_type_int = 0
-            
-            # Pular tipo 12 (VEICULO ENCONTRADO SEM LOCACAO) - não precisa de CNH
-            if occ_type_int == 12:
-                print(f"⏭️  Pulando CNH para tipo 12 (VEÍCULO ENCONTRADO SEM LOCAÇÃO) - Placa: {placa}")
+            placa, user_id, chave = item.placa, item.user_id, item.chave
+            if ja_concluido(chave, 'CNH'):
                 continue
 
-            # valida user_id
-            if pd.isna(raw_user) or str(raw_user).strip() in ('', '-', 'NaN', 'None'):
-                print(f"Linha {index}: userId inválido ('{raw_user}'), pulando")
-                continue
-
-            # tenta converter de forma segura (aceita floats como '123.0')
-            try:
-                user_id = str(int(float(raw_user))).strip()
-            except Exception:
-                cleaned = str(raw_user).strip()
-                if cleaned.isdigit():
-                    user_id = cleaned
-                else:
-                    print(f"Linha {index}: userId não conversível ('{raw_user}'), pulando")
-                    continue
-
             print(f"Processando: Placa {placa}, UserID {user_id}")
 
             # Usa a nova função para processar a CNH
-            resultado = process_driver_license(user_id, placa, bearer_token)
+            resultado = process_driver_license(user_id, placa)
 
             if resultado == "TOKEN_EXPIRED":
-                print("Token expirado. Reinicie o processo.")
-                break
-            # Se resultado for False, não cria nada - a CNH não será incluída no merge
+                # conta como falha deste item (e da etapa, se nenhum der certo) e segue para os demais
+                print("Token recusado mesmo depois de renovado. Verifique as credenciais do .env.")
+                registrar_documento(chave, 'CNH', erro="token recusado mesmo depois de renovado")
+                continue
+            # sem PDF novo não registra o caminho: um arquivo antigo da pasta (retomada/incremental) não vira 'ok'
+            if resultado == "SEM_CNH":
+                registrar_documento(chave, 'CNH', erro="CNH não encontrada na API")
+                continue
             if not resultado:
+                # a CNH não será incluída no merge
                 print(f"Aviso: CNH não foi baixada para {placa}_{user_id}")
+                registrar_documento(chave, 'CNH', erro="falha ao buscar ou baixar a CNH")
+                continue
+            registrar_documento(chave, 'CNH', os.path.join(OUTPUT_DIR, f"{chave}.pdf"))
 
         except Exception as e:
-            print(f"Erro ao processar linha {index}: {e}")
+            print(f"Erro ao processar {item.chave}: {e}")
             continue
 
 if __name__ == "__main__":
     print("Iniciando processo de download e conversão de CNHs...")
-    processar_boletins()
+    if processar_boletins() is False:
+        sys.exit(1)
     print("Processo concluído!")
\ No newline at end of file
@@ -10,10 +10,11 @@ import os
 import time
 import requests
 
-from src.settings.auth import Auth
+from src.settings.auth import get_auth
 from src.settings.config import config
-from src.utils.fileUtils import searchExcel
-from src.settings.http import create_session, request_with_timeout
+from src.settings.http import get_session, request_autenticado, request_with_timeout
+from src.main.pipeline.planner import get_plano
+from src.utils.ledger import ja_concluido, manter_pastas, registrar_documento
 
 
 # Variáveis carregadas via config
@@ -49,20 +50,17 @@ def limpar_pasta_contract():
     except Exception as e:
         print(f"Erro ao limpar pasta contract: {e}")
 
-def processRental(userId, rentalId, plate, retry_count=0, session=None, token=None):
+def processRental(userId, rentalId, plate, retry_count=0, session=None):
     try:
         userId = int(userId)
         rentalId = int(rentalId)
         plate = str(plate).strip().upper()
 
         url = f"{paymentsUrl}/ContratoModelo/GerarDocumentoAdmin/{userId}"
-        headers = {'accept': 'application/json', 'Authorization': f'Bearer {token}'}
+        headers = {'accept': 'application/json'}
 
-        # Use session if fornecido, senão requests diretamente
-        if session:
-            response = request_with_timeout(session, 'GET', url, headers=headers, timeout=60)
-        else:
-            response = requests.get(url, headers=headers, timeout=60, verify=True)
+        # token do Auth no header; num 401 é renovado e a requisição repetida
+        response = request_autenticado(session or get_session(), 'GET', url, headers=headers, timeout=60)
 
         if response is None:
             print(f'❌ Erro ao requisitar URL do contrato para usuário {userId}')
@@ -81,10 +79,7 @@ def processRental(userId, rentalId, plate, retry_count=0, session=None, token=No
         os.makedirs(os.path.dirname(localFilename), exist_ok=True)
 
         if documentoUrl:
-            if session:
-                pdf_response = request_with_timeout(session, 'GET', documentoUrl, timeout=60)
-            else:
-                pdf_response = requests.get(documentoUrl, timeout=60)
+            pdf_response = request_with_timeout(session or get_session(), 'GET', documentoUrl, timeout=60)
 
             if pdf_response and getattr(pdf_response, 'status_code', None) == 200:
                 with open(localFilename, 'wb') as file:
@@ -114,46 +109,42 @@ def processRental(userId, rentalId, plate, retry_count=0, session=None, token=No
 
 
 def main():
-    # prepara listas de trabalho lendo o Excel
-    rentalIdList = searchExcel('dataUserRentalId')
-    userIdList = searchExcel('dataUserId')
-    plateList = searchExcel('dataVehiclePlate')  # Adicionado: buscar placas
-    occurrenceTypeList = searchExcel('dataOccurrenceType')  # Buscar tipo de ocorrência
-
-    # Criar queue com (userId, rentalId, plate) e filtrar tipo 12 (não precisa de contrato)
-    queue = []
-    for uid, rid, plate, occ_type in zip(userIdList, rentalIdList, plateList, occurrenceTypeList):
-        try:
-            occ_type_int = int(occ_type) if occ_type not in (None, '-', '') else 0
-        except (ValueError, TypeError):
-            occ_type_int = 0
-        
-        # Pular tipo 12 (VEICULO ENCONTRADO SEM LOCACAO) - não precisa de contrato
-        if occ_type_int == 12:
-            print(f"⏭️  Pulando contrato para tipo 12 (VEÍCULO ENCONTRADO SEM LOCAÇÃO) - Placa: {plate}")
-            continue
-        
-        queue.append((uid, rid, plate))
+    # Plano de trabalho: um contrato por (placa, userId), apenas para os tipos que usam contrato
+    try:
+        itens = get_plano().itens('CONTRATO')
+    except ValueError as e:
+        print("Erro ao localizar o arquivo Excel:", e)
+        return False
+    print(f"Contratos planejados: {len(itens)}")
+
+    # Criar queue com (userId, rentalId, plate, chave)
+    queue = [
+        (item.user_id, item.rental_id, item.placa, item.chave)
+        for item in itens
+        if not ja_concluido(item.chave, 'CONTRATO')
+    ]
     
-    retries = {f"{uid}_{rid}": 0 for uid, rid, _, _ in zip(userIdList, rentalIdList, plateList, occurrenceTypeList)}
+    retries = {f"{uid}_{rid}": 0 for uid, rid, _, _ in queue}
 
-    # Limpa pasta
-    limpar_pasta_contract()
+    # Limpa pasta (na retomada e no modo incremental mantém os contratos já baixados)
+    if manter_pastas():
+        os.makedirs(contract_path, exist_ok=True)
+    else:
+        limpar_pasta_contract()
 
-    token_obj = Auth()
-    bearer_token = token_obj.get_token()
-    if not bearer_token:
+    if not get_auth().get_token():
         print("Falha ao obter token. Abortando...")
-        return
+        return False
 
-    session = create_session(retries=2, backoff_factor=0.2)
+    session = get_session()
 
     while queue:
-        userId, rentalId, plate = queue.pop(0)
+        userId, rentalId, plate, chave = queue.pop(0)
         print(f"Processando contrato - Usuário: {userId}, Rental: {rentalId}, Placa: {plate}")
-        ok = processRental(userId, rentalId, plate, session=session, token=bearer_token)
+        ok = processRental(userId, rentalId, plate, session=session)
         if ok:
             print(f"Processamento concluído para o contrato - Usuário: {userId}, Rental: {rentalId}")
+            registrar_documento(chave, 'CONTRATO', os.path.join(contract_path, f"{chave}.pdf"))
             continue
         else:
             key = f"{userId}_{rentalId}"
@@ -161,10 +152,11 @@ def main():
             if retries[key] < maxRetries:
                 print(f"Reprocessando contrato - Usuário: {userId}, Rental: {rentalId} (Tentativa {retries[key]})")
                 time.sleep(backoff)
-                queue.append((userId, rentalId, plate))
+                queue.append((userId, rentalId, plate, chave))
             else:
                 print(f"Número máximo de tentativas excedido para contrato - Usuário: {userId}, Rental: {rentalId}")
+                registrar_documento(chave, 'CONTRATO', erro="número máximo de tentativas excedido")
 
 
 if __name__ == "__main__":
-    main()
+    sys.exit(1 if main() is False else 0)
@@ -1,6 +1,5 @@
 import os
 import time
-import requests
 from pathlib import Path
 import sys
 
@@ -10,10 +9,11 @@ project_root = Path(__file__).resolve().parents[4]
 if str(project_root) not in sys.path:
     sys.path.insert(0, str(project_root))
 
-from src.settings.auth import Auth
+from src.settings.auth import get_auth
 from src.settings.config import config
-from src.utils.fileUtils import searchExcel
-from src.settings.http import create_session, request_with_timeout
+from src.settings.http import get_session, request_autenticado, request_with_timeout
+from src.main.pipeline.planner import get_plano
+from src.utils.ledger import ja_concluido, manter_pastas, registrar_documento
 
 # Config values
 # Endpoint de veículo: permite override por env VEHICLE_URL_TEMPLATE ou OPERATION_URL; fallback operation-backend
@@ -23,6 +23,9 @@ saidaPath = str(config.output_dir)
 maxRetries = config.maxRetries
 backoff = config.backoff
 
+# Caminho da pasta CRLV (permite override por env CRLV_PATH)
+CRLV_PATH = str(Path(os.environ.get('CRLV_PATH', 'src/output/gerador/crlv')).resolve())
+
 def limpar_pasta_crlv(crlv_path: str):
     try:
         if os.path.exists(crlv_path):
@@ -42,7 +45,7 @@ def limpar_pasta_crlv(crlv_path: str):
         print(f"Erro ao limpar pasta CRLV: {e}")
 
 
-def processVehicle(vehicleId, plate, userId, session=None, token=None, crlv_path=None):
+def processVehicle(vehicleId, plate, userId, session=None, crlv_path=None):
     try:
         vehicleId = int(vehicleId)
         plate = str(plate).strip().upper()  # Normaliza a placa
@@ -58,13 +61,10 @@ def processVehicle(vehicleId, plate, userId, session=None, token=None, crlv_path
         url = vehicle_url_template.format(vehicleId)
         headers = {
             'accept': 'application/json',
-            "Authorization": f"Bearer {token}"
         }
 
-        if session:
-            resp = request_with_timeout(session, 'GET', url, headers=headers, timeout=30)
-        else:
-            resp = requests.get(url, headers=headers, timeout=30)
+        # token do Auth no header; num 401 é renovado e a requisição repetida
+        resp = request_autenticado(session or get_session(), 'GET', url, headers=headers, timeout=30)
 
         if not resp or getattr(resp, 'status_code', None) != 200:
             print(f'Erro na requisição do veículo {plate}: {getattr(resp, "status_code", "N/A")}')
@@ -86,10 +86,7 @@ def processVehicle(vehicleId, plate, userId, session=None, token=None, crlv_path
             local_filename = os.path.join(crlv_path, filename)
             os.makedirs(os.path.dirname(local_filename), exist_ok=True)
 
-            if session:
-                pdf_response = request_with_timeout(session, 'GET', documentoUrl, timeout=60)
-            else:
-                pdf_response = requests.get(documentoUrl, timeout=60)
+            pdf_response = request_with_timeout(session or get_session(), 'GET', documentoUrl, timeout=60)
 
             if getattr(pdf_response, 'status_code', None) == 200:
                 with open(local_filename, 'wb') as file:
@@ -109,62 +106,60 @@ def processVehicle(vehicleId, plate, userId, session=None, token=None, crlv_path
 
 
 def main():
+    # Plano de trabalho: um CRLV por (placa, userId), com userId já normalizado (remove .0 etc.)
     try:
-        vehicleIdList = searchExcel('dataVehicleId')
-        plateList = searchExcel('dataVehiclePlate')
-        rawUserList = searchExcel('dataUserId')  # Adicionado: buscar userIds
+        itens = get_plano().itens('CRLV')
     except ValueError as e:
         print("Erro ao localizar o arquivo Excel:", e)
         print("Verifique a variável 'excel' no .env ou o caminho do arquivo Relatório BOs.xlsx.")
-        return
-
-    # Normaliza userId (remove .0 etc.)
-    userIdList = []
-    for raw in rawUserList:
-        try:
-            val = str(int(float(raw))).strip()
-        except Exception:
-            val = str(raw).strip()
-        userIdList.append(val)
-
-    token_obj = Auth()
-    bearer_token = token_obj.get_token()
-    if not bearer_token:
+        return False
+    print(f"CRLVs planejados: {len(itens)}")
+
+    if not get_auth().get_token():
         print("Falha ao obter token. Abortando...")
-        return
+        return False
 
-    # Criar queue com (vehicleId, plate, userId)
-    queue = list(zip(vehicleIdList, plateList, userIdList))
+    # Criar queue com (vehicleId, plate, userId, chave), pulando na retomada os CRLVs já baixados
+    # (a chave é o nome do arquivo gerado: plate_userId ou apenas plate)
+    queue = [
+        (item.vehicle_id, item.placa, item.user_id, item.chave)
+        for item in itens
+        if not ja_concluido(item.chave, 'CRLV')
+    ]
 
     # Modificado: usar placa como chave para retentativas
-    retries = {str(plate): 0 for plate in plateList}
+    retries = {str(plate): 0 for _, plate, _, _ in queue}
 
-    # Definir o caminho da pasta CRLV (permite override por env CRLV_PATH)
-    crlv_path = str(Path(os.environ.get('CRLV_PATH', 'src/output/gerador/crlv')).resolve())
+    crlv_path = CRLV_PATH
 
-    # Limpa pasta
-    limpar_pasta_crlv(crlv_path)
+    # Limpa pasta (na retomada e no modo incremental mantém os CRLVs já baixados)
+    if manter_pastas():
+        os.makedirs(crlv_path, exist_ok=True)
+    else:
+        limpar_pasta_crlv(crlv_path)
 
-    session = create_session(retries=2, backoff_factor=0.2)
+    session = get_session()
 
     while queue:
-        vehicleId, plate, userId = queue.pop(0)
+        vehicleId, plate, userId, chave = queue.pop(0)
         print(f"Iniciando processamento do veículo: {plate} (ID: {vehicleId})")
 
-        ok = processVehicle(vehicleId, plate, userId, session=session, token=bearer_token, crlv_path=crlv_path)
+        ok = processVehicle(vehicleId, plate, userId, session=session, crlv_path=crlv_path)
 
         if ok:
             print(f"Processamento concluído para o veículo: {plate}")
+            registrar_documento(chave, 'CRLV', os.path.join(crlv_path, f"{chave}.pdf"))
             continue
         else:
             retries[str(plate)] += 1
             if retries[str(plate)] < maxRetries:
                 print(f"Reprocessando veículo: {plate} (Tentativa {retries[str(plate)]})")
                 time.sleep(backoff)
-                queue.append((vehicleId, plate, userId))
+                queue.append((vehicleId, plate, userId, chave))
             else:
                 print(f"Número máximo de tentativas excedido para o veículo: {plate}")
+                registrar_documento(chave, 'CRLV', erro="número máximo de tentativas excedido")
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    sys.exit(1 if main() is False else 0)
\ No newline at end of file
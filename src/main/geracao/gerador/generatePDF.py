@@ -1,7 +1,6 @@
 import os
 import sys
 import time
-import requests
 import pandas as pd
 import unicodedata
 from fpdf import FPDF
@@ -18,7 +17,11 @@ if str(project_root) not in sys.path:
     sys.path.insert(0, str(project_root))
 
 from src.settings.config import config
-from src.settings.auth import Auth
+from src.settings.auth import get_auth
+from src.settings.http import get_session, request_autenticado, request_with_timeout
+from src.utils.fileUtils import carregar_colunas
+from src.utils.ledger import chave_documento, ja_concluido, manter_pastas, registrar_documento, retomada_ativa
+from src.utils.ocorrencia import COLUNAS_EXECUCAO, normalizar_id, normalizar_ids, normalizar_placas
 
 # Configurações via Config
 GEOPYFY_URL = os.getenv("geopifyUrl", "https://api.geoapify.com/v1/geocode/")
@@ -26,11 +29,11 @@ GEOPYFY_KEY = os.getenv("geopify", "")
 
 # Caminho correto para a pasta document
 project_root_for_output = Path(__file__).resolve().parents[4]
-saidaPath = str(project_root_for_output / "src" / "output" / "gerador" / "document")
+saidaPath = str(Path(os.getenv('geradorPath') or project_root_for_output / "src" / "output" / "gerador").resolve() / "document")
 logoPath = os.getenv('logoPath') or os.getenv('logo') or str(project_root_for_output / "src" / "utils" / "logo.png")
 
-# Auth helper
-_auth = Auth()
+# Auth helper (instância compartilhada pelo processo)
+_auth = get_auth()
 
 def auth_token():
     """Obtém token usando Auth (cached)"""
@@ -45,7 +48,7 @@ MOTTU_ADDRESS = os.getenv("MOTTU_ADDRESS", "Av. Dr. Gastão Vidigal, 501 - Vila
 MOTTU_PHONE = os.getenv("MOTTU_PHONE", "(11) 3181-8188")
 
 # Caminho do Excel (valor do .env com fallback)
-EXCEL_PATH = os.getenv("excelPath", r"C:\Users\Marcos Vinicio\Documents\scripts\dossiev4\dossiev4\src\utils\Relatório BOs.xlsx")
+EXCEL_PATH = os.getenv("excelPath") or os.getenv("excel", "src/utils/Relatório BOs.xlsx")
 
 # Função para limpar a pasta document (mantida a implementação existente)
 def limpar_pasta_document():
@@ -184,23 +187,17 @@ class PDFGenerator:
             return None
         
 # ... (o restante do código permanece exatamente igual) ...
-def get_cpf_from_api(user_id, token):
+def get_cpf_from_api(user_id):
     headers = {
         "accept": "text/plain",
-        "Authorization": f"Bearer {token}",
         "Content-Type": "application/json-patch+json"
     }
     try:
-        uid = str(user_id).strip()
-        if uid in ('', '-', 'None', 'NaN'):
+        uid = normalizar_id(user_id)
+        if not uid:
             return 'CPF não encontrado'
-        # tenta normalizar para inteiro quando aplicável
-        try:
-            uid_int = int(float(uid))
-        except Exception:
-            uid_int = uid
-        url = f'https://user-management.mottu.cloud/v1/users?Code={uid_int}'
-        resp = requests.get(url, headers=headers, timeout=8)
+        url = f'https://user-management.mottu.cloud/v1/users?Code={uid}'
+        resp = request_autenticado(get_session(), 'GET', url, headers=headers, timeout=8)
         if resp.status_code == 200:
             return resp.json().get('result', {}).get('individualRegistration', 'CPF não encontrado')
         return 'CPF não encontrado'
@@ -239,7 +236,7 @@ def geopify_search(lat, lon):
             return f"{lat}, {lon}"
         url = GEOPYFY_URL.rstrip('/') + "/reverse"
         params = {"lat": lat, "lon": lon, "apiKey": GEOPYFY_KEY}
-        resp = requests.get(url, params=params, timeout=8)
+        resp = request_with_timeout(get_session(), 'GET', url, params=params, timeout=8)
         resp.raise_for_status()
         data = resp.json()
         # melhora: pega first feature properties.formatted
@@ -267,20 +264,256 @@ def format_cellphone(val):
         return f"({s[:2]}) {s[2:6]}-{s[6:]}"
     return str(val)
 
+def endereco_de_coordenada(coord):
+    """Converte 'lat, lon' em endereço via Geoapify; outros valores são devolvidos como texto."""
+    if isinstance(coord, str) and ',' in coord:
+        try:
+            lat, lon = map(float, coord.replace(' ', '').split(','))
+            return geopify_search(lat, lon)
+        except:
+            return str(coord)
+    return str(coord)
+
+# Mapear tipos de ocorrência para nomes
+TYPE_NAMES = {
+    1: "REGISTRO DE BOLETIM DE OCORRÊNCIA - ROUBO",
+    2: "REGISTRO DE BOLETIM DE OCORRÊNCIA - INVENTÁRIO", 
+    3: "REGISTRO DE BOLETIM DE OCORRÊNCIA - FURTO",
+    4: "REGISTRO DE BOLETIM DE OCORRÊNCIA - VIOLAÇÃO",
+    5: "REGISTRO DE BOLETIM DE OCORRÊNCIA - APROPRIAÇÃO INDÉBITA",
+    6: "BAIXA DE BOLETIM DE OCORRÊNCIA - VEÍCULO ENCONTRADO",
+    7: "BAIXA DE BOLETIM DE OCORRÊNCIA - VEÍCULO RECUPERADO",
+    8: "BAIXA DE BOLETIM DE OCORRÊNCIA - VEÍCULO APREENDIDO",
+    9: "BAIXA DE BOLETIM DE OCORRÊNCIA - VEÍCULO APREENDIDO - BO ATIVO",
+    10: "ALTERAÇÂO DE BOLETIM DE OCORRÊNCIA - ROUBO/FURTO",
+    11: "NÃO CRIMINAL - OUTROS NÃO CRIMINAL",
+    12: "BAIXA DE BOLETIM DE OCORRÊNCIA - VEÍCULO ENCONTRADO SEM LOCAÇÃO"
+}
+
+def montar_texto(occurrence_type, row, d):
+    """
+    Monta o histórico do documento para o tipo de ocorrência.
+    `d` traz os dados já formatados da linha: data_ocorrencia, hora_ocorrencia, data_rastreio,
+    hora_rastreio, endereco_ocorrencia, endereco_rastreio, endereco_locatario, nome, rg e cpf.
+    """
+    plate = row['dataVehiclePlate']
+    model = row['dataVehicleModel']
+    user_name = d['nome']
+    user_rg = d['rg']
+    user_cpf = d['cpf']
+    data_ocorrencia, hora_ocorrencia = d['data_ocorrencia'], d['hora_ocorrencia']
+    data_rastreio, hora_rastreio = d['data_rastreio'], d['hora_rastreio']
+    endereco_ocorrencia = d['endereco_ocorrencia']
+    endereco_rastreio = d['endereco_rastreio']
+    endereco_locatario = d['endereco_locatario']
+
+    if occurrence_type == 1:  # ROUBO
+        return (
+            f'No dia {data_ocorrencia} e hora {hora_ocorrencia}, o locatario {user_name}, portador do RG {user_rg},'
+            f'notificou através do aplicativo que a motocicleta de modelo {model} e placa {plate}, foi comunicada como roubada no endereço'
+            f'{endereco_ocorrencia}. Apos o incidente, o GPS do veiculo deixou de transmitir sinais. O gps do veiculo deixou'
+            f'de transmitir sinails. O cliente entrou em contato inicialmente pelo aplicativo para relatar o ocorrido. '
+            f'Apesar das dilegências, realizadas para a recuperação do veiculo, não foi possivel alcançar êxito nas operações. '
+            f'O ultimo sinal de GPS foi registrado em {data_rastreio} às {hora_rastreio} UTC, na endereço {endereco_rastreio}.'
+        )
+
+    elif occurrence_type == 2:  # INVENTARIO
+        return (
+            f'No dia {data_ocorrencia} e hora {hora_ocorrencia}, durante a realização do inventario, foi constatado que a motocicleta,'
+            f'de modelo {model} e placa {plate}, não se encontrava mais nas instalações da Mottu '
+            f'localizada no endereço {endereco_locatario}, e não há mais registros da sua localização através do rastreador '
+            f'O ultimo sinal de GPS foi registrado em {data_rastreio} às {hora_rastreio} UTC, no endereço {endereco_rastreio}.'
+        )
+
+    elif occurrence_type == 3:  # FURTO
+        return (
+            f'No dia {data_ocorrencia} e hora {hora_ocorrencia}, o locatario {user_name}, portador do RG {user_rg}, '
+            f'notificou através do aplicativo que a motocicleta de modelo {model} e placa {plate}, foi comunicada como furtada '
+            f'no endereço {endereco_ocorrencia}. Apos o incidente, o GPS do veiculo deixou de transmitir sinais. O gps do veiculo '
+            f'deixou de transmitir sinais. O cliente entrou em contato inicialmente pelo aplicativo para relatar o ocorrido. '
+            f'Apesar das dilegências, realizadas para a recuperação do veiculo, não foi possivel alcançar êxito nas operações. '
+            f'O ultimo sinal de GPS foi registrado em {data_rastreio} às {hora_rastreio} UTC, na endereço {endereco_rastreio}.'
+        )
+
+    elif occurrence_type == 4:  # VIOLAÇÃO
+        return (
+            f'A Sra. Solange Brolezo, RG: 16.505.649-6, CPF: 094.377.888-39, residente na Rua Altamiro de Souza Bueno, 417, JD Bela Vista Joanópolis - SP, '
+            f'Telefone: (11) 96904-7320, representante das empresas locadoras de moto denominadas Mottu Locação de Veículos, Mottu I S/A, Mottu II S/A, '
+            f'Mottu III S/A, Mottu IV S/A, Mottu V S/A, Mottu VI S/A, Mottu VII S.A, Mottu Natal e Mottu Brasília através do presente documento informa que '
+            f'o motociclo acima descrito foi furtado na data e hora acima informadas no endereço declarado como local do fato. '
+            f'Foram adotadas diligências para localização e recuperação do bem, porém sem êxito até o momento. '
+            f'O último sinal de GPS foi captado em {data_rastreio}, às {hora_rastreio} UTC, com geolocalização correspondente ao endereço {endereco_rastreio}.'
+        )
+
+    elif occurrence_type == 5:  # APROPRIAÇÃO INDÉBITA
+        return (
+            f'No dia {data_ocorrencia} foi encerrado o contrato de locação celebrado com {user_name}, portador do RG {user_rg}, '
+            f'referente à motocicleta de modelo {model} e placa {plate}. '
+            f'A partir deste momento, o veiculo deixou de ser localizado, passando a ser deliberadamente ocultado pelo '
+            f'ex-locatario. Todas as tentativas de contato foram ignoradas, não sendo possivel qualquer forma '
+            f'de recuperação do bem. O rastreador foi desativado e o ultimo sinal de GPS foi registrado em '
+            f'{data_rastreio} às {hora_rastreio} UTC, no endereço {endereco_rastreio}. '
+            f'Desde então, a motocicleta encontra-se em local ignorado, fora do alcance da empresa, sem qualquer devolutiva por parte do ex-locatario. '
+            f'O conjunto dos fatos, apontam para uma conduta que extrapola a mera inadimplencia contratual, configurando '
+            f'evidente subtração do veiculo, que permanece fora da posse da legitima proprietaria.'
+        )
+
+    elif occurrence_type == 6:  # VEICULO ENCONTRADO
+        return (
+            f'No dia {data_ocorrencia} e hora {hora_ocorrencia}, o rastreador do veiculo voltou a emitir sinais com a sua localização nas coordenadas: ({row["dataTrackingGeolocation"]}). '
+            f'Deste modo, para averiguação dos sinais transmitidos foi enviado um prestador ao local. O motorista {row.get("dataOccurrenceBranchDriverName", "Motorista não informado")} foi designado  '
+            f'para a tarefa. Ao chegar ao local, confirmou a presença do veiculo da placa: {plate.upper()}, e chassi: {row.get("dataVehicleChassis", "Chassi não informado").upper()}, '
+            f'abandonado e procedeu com a sua recolha. O veiculo foi encaminhado para o pátio da empresa para as devidas providências legais e contato.'
+        )
+
+    elif occurrence_type == 7:  # VEICULO RECUPERADO POR DENUNCIA ANONIMA
+        return (
+            f'No dia {data_ocorrencia} e hora {hora_ocorrencia}, recebemos uma denúncia por volta das {hora_ocorrencia}, informando que uma moto de modelo {model.upper()}, '
+            f'e placa {plate.upper()}, estava abandonada na localização das coordenadas: ({row["dataTrackingGeolocation"]}). '
+            f'Para averiguação da denúncia, foi enviado um prestador ao local. O motorista: {row.get("dataOccurrenceBranchDriverName", "Motorista não informado")} foi designado para a tarefa. '
+            f'Ao chegar ao local, onde foi confirmada a presença do veículo da {plate.upper()}, e chassi: {row.get("dataVehicleChassis", "Chassi não informado").upper()}, abandonado e procedeu com a sua recolha. '
+            f'O veículo foi encaminhado para o pátio da empresa para as devidas providências legais e contato.'
+        )
+
+    elif occurrence_type == 8:  # VEICULO APREENDIDO
+        return (
+            f'No dia {data_ocorrencia} e hora {hora_ocorrencia}, recebemos uma denúncia anônima informando que uma motocicleta de modelo {model.upper()}, '
+            f'e placa {plate.upper()}, havia sido apreendida no endereço {endereco_ocorrencia}. '
+            f'Para averiguação da denúncia, foi enviado um prestador ao local. O motorista: {row.get("dataOccurrenceBranchDriverName", "Motorista não informado")} foi designado para a tarefa. '
+            f'Ao chegar no local, foi confirmado a presença do veiculo citado, apos a liberação do veiculo a restrição contida no mesmo ainda continua ativa em sistema, '
+            f'Por meio deste documento solicitamos a remoção da restrição do veiculo, uma vez que apos a apreensão foram tomadas as devidas providências legais e contato. '
+            f'O veiculo foi encaminhado para o pátio e atualmente encontra-se sob a guarda da empresa, aguardando a regularização de sua situação.'
+        )
+
+    elif occurrence_type == 9:  # VEICULO APREENDIDO -padrao
+        return (
+            f'Na data {data_ocorrencia} recebemos a informação de que a motocicleta de placa {plate}, modelo {model} e chassi {row.get("dataVehicleChassis", "Chassi não informado")}, '
+            f'foi apreendida e encontra-se em pátio. Ressaltamos que, conforme orientação passada pelo orgão responsável, a liberação do veículo não poderá ser efetuada '
+            f'enquanto o boletim de ocorrência estiver ativo. Portanto, faz-se necessária a baixa do referido boletim para que o procedimento de liberação do veículo possa ser realizado.'
+        )
+
+    elif occurrence_type == 10:  # ALTERAÇÃO ROUBO/FURTO (formato específico)
+        occ_date = data_ocorrencia
+        loc_name = user_name if user_name else "Nome não disponível"
+        # tenta extrair somente dígitos do CPF; senão mostra o que vier
+        cpf_digits = ''.join(ch for ch in (user_cpf or "") if ch.isdigit())
+        loc_cpf_display = cpf_digits if cpf_digits else (user_cpf or "CPF não disponível")
+        model_display = (model or "Modelo não disponível")
+        plate_display = (plate or "PLACA NÃO DISPONÍVEL")
+
+        return (
+            f"Compareceu a esta Unidade Policial, a Sra. Solange Brolezo, RG: 16.505.649-6, CPF: 094.377.888-39, residente na Rua Altamiro de\n"
+            f"Souza Bueno, 417, JD Bela Vista Joanopolis - SP, Telefone: (11) 96904-7320, representante das empresas locadoras de moto\n"
+            f"denominadas Mottu Locacao de Veiculos, Mottu I S/A, Mottu II S/A, Mottu III S/A, Mottu IV S/A, Mottu V S/A, Mottu VI S/A, Mottu VII\n"
+            f"S.A e MOTTU Natal S/A, declarando que no dia {occ_date} a empresa locadora cadastrada como vitima, conseguiu contato com o\n"
+            f"locatario {loc_name} (CPF: {loc_cpf_display}), locatario do motociclo {model_display} placa {plate_display}, tendo\n"
+            f"ele informado que nao devolveu o motociclo locado em virtude do mesmo ter sido furtado, conforme descrito na documentacao ora\n"
+            f"apresentada e que nao conseguiu comunicar a empresa/vitima sobre o ocorrido, gerando assim o equivoco quanto a natureza dos\n"
+            f"fatos. O representante esclareceu ainda que a empresa/vitima tem realizado levantamentos dos boletins de ocorrencia registrados por\n"
+            f"apropriacao indebita, tentando novo contato com os locatarios e em alguns casos tem sido apurado que o ocorrido na verdade\n"
+            f"tratou-se de furto, tal como o presente registro. Face a isso, o representante da empresa/vitima solicita que o veiculo mencionado\n"
+            f"neste registro seja cadastrado nesta edicao como FURTADO, motivo pelo qual esta edicao e lavrada para fins de alterar o bloqueio de\n"
+            f"apropriacao indebita para bloqueio de furto junto ao CEPOL."
+        )
+
+    elif occurrence_type ==11:  # FALTA_DE_MOTOR_SPORT
+        return (
+            f'No dia {data_ocorrencia} e hora {hora_ocorrencia}, durante a realização do inventário, foi '
+            f'constatado que o motociclo de modelo {model} e placa {plate}, encontrava-se nas instalações da Mottu '
+            f'localizada no endereço {endereco_locatario}, porém sem o motor. Até o presente momento,  não há informações'
+            f' precisas acerca da localização do referido componente.'
+        )
+
+    elif occurrence_type == 12:  # VEICULO ENCONTRADO SEM LOCACAO
+        return (
+            f'No dia {data_ocorrencia} e hora {hora_ocorrencia}, o rastreador do veiculo voltou a emitir sinais com a sua localização nas coordenadas: ({row["dataTrackingGeolocation"]}). '
+            f'Deste modo, para averiguação dos sinais transmitidos foi enviado um prestador ao local. O motorista {row.get("dataOccurrenceBranchDriverName", "Motorista não informado")} foi designado  '
+            f'para a tarefa. Ao chegar ao local, confirmou a presença do veiculo da placa: {plate.upper()}, e chassi: {row.get("dataVehicleChassis", "Chassi não informado").upper()}, '
+            f'abandonado e procedeu com a sua recolha. O veiculo foi encaminhado para o pátio da empresa para as devidas providências legais e contato.'
+        )
+
+    else:
+        return (
+            f"Ocorrência registrada em {data_ocorrencia} às {hora_ocorrencia} envolvendo o veículo "
+            f"{model} de placa {plate}. Local da ocorrência: {endereco_ocorrencia}. "
+            f"Última localização conhecida: {endereco_rastreio}. "
+            f"Locatário: {user_name} (CPF: {user_cpf})."
+        )
+
+def montar_replacements(row, plate, d, texto):
+    """Prepara os dados de substituição do documento a partir da linha e dos dados formatados."""
+    return {
+        'RAZAO_MOTTU': row.get('dataBranchIdName', 'MOTTU LOCACAO DE VEICULOS LTDA'),
+        'ENDERECO_MOTTU': row.get('dataBranchAddress', 'Endereço não disponível'),
+        'DATA_OCORRENCIA': d['data_ocorrencia'],
+        'HORA_OCORRENCIA': d['hora_ocorrencia'],
+        'MARCA_MODELO': row.get('dataVehicleModel', 'Modelo não disponível'),
+        'PLACA': plate,
+        'NOME_LOCAT': d['nome'],
+        'RG_LOCAT': d['rg'],
+        'CPF_LOCAT': d['cpf'],
+        'TELEFONE_LOCAT': d['telefone'],
+        'LOCAL DO FATO: ENDERECO_OCORRENCIA': d['endereco_ocorrencia'],
+        'ENDERECO_LOCAT': d['endereco_locatario'],
+        'DATA_INICIO_LOCACAO': '07/05/2025',  # Valor padrão, pode ser ajustado conforme necessidade
+        'TEXTO': texto
+    }
+
+def _valores_da_coluna(df, coluna, padrao):
+    """Valores da coluna como lista; `padrao` em todas as linhas quando a coluna não existe."""
+    return df[coluna].tolist() if coluna in df.columns else [padrao] * len(df)
+
+def gerar_documento_linha(ocorrencia, pdf_generator=None):
+    """
+    Gera o documento de uma única linha do Excel (CPF, endereços, datas e histórico) a partir da
+    Ocorrencia já normalizada (com a linha original em ocorrencia.linha).
+    Usado pelo modo streaming, que monta cada dossiê assim que seus dados ficam prontos.
+    Retorna o caminho do PDF ou None.
+    """
+    pdf_generator = pdf_generator or PDFGenerator()
+    row = ocorrencia.linha.copy()
+    row['dataVehiclePlate'] = plate = ocorrencia.placa
+    user_id = ocorrencia.user_id
+    occurrence_type = ocorrencia.tipo
+
+    cpf = get_cpf_from_api(user_id) if user_id else "ID não disponível"
+    occurrence_dates, occurrence_hours = format_date([row.get('dataOccurenceDate')])
+    tracking_dates, tracking_hours = format_date([row.get('dataTrackingDate')])
+    dados = {
+        'data_ocorrencia': occurrence_dates[0],
+        'hora_ocorrencia': occurrence_hours[0],
+        'data_rastreio': tracking_dates[0],
+        'hora_rastreio': tracking_hours[0],
+        'endereco_ocorrencia': endereco_de_coordenada(row.get('dataOccurenceAddress')),
+        'endereco_rastreio': endereco_de_coordenada(row.get('dataTrackingGeolocation')),
+        'endereco_locatario': row.get('dataBranchAddress', 'Endereço não disponível'),
+        'nome': row.get('dataNameUser', 'Nome não disponível'),
+        'rg': "RG não disponível",
+        'cpf': cpf,
+        'telefone': format_cellphone("Telefone não disponível"),
+    }
+    texto = montar_texto(occurrence_type, row, dados)
+    replacements = montar_replacements(row, plate, dados, texto)
+    doc_type_name = TYPE_NAMES.get(occurrence_type, "OCORRÊNCIA")
+    return pdf_generator.generate_document_pdf(replacements, plate, doc_type_name, row.get('dataBranchId'), user_id)
+
 def main():
     """Função principal"""
     print("🚀 Iniciando geração de Boletins de Ocorrência...")
     
-    # Limpar a pasta document antes de iniciar
-    print("🧹 Limpando pasta document...")
-    limpar_pasta_document()
+    # Limpar a pasta document antes de iniciar (na retomada e no modo incremental mantém os documentos já gerados)
+    if manter_pastas():
+        os.makedirs(saidaPath, exist_ok=True)
+    else:
+        print("🧹 Limpando pasta document...")
+        limpar_pasta_document()
     
     # Obter token de autenticação
     print("🔑 Obtendo token de autenticação...")
     token = auth_token()
     if not token:
         print("❌ Erro ao obter token de autenticação")
-        return
+        return False
     print("✅ Token obtido com sucesso!")
     
     # Verificar se o logo existe
@@ -290,63 +523,53 @@ def main():
     
     # Carregar dados do Excel
     try:
-        df = pd.read_excel(EXCEL_PATH, sheet_name='Página1')
+        # 'excel' lido agora, não no import: --planilha e o modo --vigiar trocam a entrada durante o processo
+        df = carregar_colunas(COLUNAS_EXECUCAO, os.getenv('excel') or EXCEL_PATH)
         print(f"📊 Excel carregado: {len(df)} registros encontrados")
         
         print("📋 Colunas disponíveis:", df.columns.tolist())
         
     except Exception as e:
         print(f"❌ Erro ao carregar Excel: {e}")
-        return
+        return False
 
     # Remover duplicatas para não gerar o mesmo PDF mais de uma vez
-    def _normalize_user(val):
-        try:
-            s = str(val).strip()
-            if s in ('', '-', 'None', 'NaN'):
-                return ''
-            return str(int(float(s)))
-        except Exception:
-            return str(val).strip()
-
     if 'dataVehiclePlate' in df.columns and 'dataUserId' in df.columns:
-        df['dataVehiclePlate'] = df['dataVehiclePlate'].astype(str).str.strip().str.upper()
-        df['__user_norm__'] = df['dataUserId'].apply(_normalize_user)
+        df['dataVehiclePlate'] = normalizar_placas(df['dataVehiclePlate'])
+        df['dataUserId'] = normalizar_ids(df['dataUserId'])
 
         before = len(df)
-        df = df.drop_duplicates(subset=['dataVehiclePlate', '__user_norm__'])
+        df = df.drop_duplicates(subset=['dataVehiclePlate', 'dataUserId']).reset_index(drop=True)
         after = len(df)
         if after < before:
             print(f"🔁 Linhas duplicadas removidas: {before - after}")
 
-        df['dataUserId'] = df['__user_norm__']
-        df = df.drop(columns=['__user_norm__']).reset_index(drop=True)
+        # Na retomada, pula os documentos já gerados numa execução anterior (evita CPF/geocoding de novo)
+        if retomada_ativa() and len(df):
+            feitos = [
+                ja_concluido(chave_documento(placa, user_id), 'DOCUMENTO_GERADO')
+                for placa, user_id in zip(df['dataVehiclePlate'].tolist(), df['dataUserId'].tolist())
+            ]
+            df = df[[not feito for feito in feitos]].reset_index(drop=True)
+            print(f"📄 Documentos a gerar: {len(df)}")
 
     # Inicializar gerador de PDF
     pdf_generator = PDFGenerator()
     
-    # Arrays para armazenar dados processados
-    data_user_full_name = []
-    data_user_rg = []
-    data_user_cpf = []
-    data_user_phone = []
-    data_user_address = []
-    data_address = []
-    data_tracking_address = []
+    # Colunas lidas uma vez como listas e linhas como dicts (sem montar um pd.Series por linha)
+    registros = df.to_dict('records')
+    data_user_full_name = _valores_da_coluna(df, 'dataNameUser', 'Nome não disponível')
+    data_user_address = _valores_da_coluna(df, 'dataBranchAddress', 'Endereço não disponível')
+    data_user_rg = ["RG não disponível"] * len(df)
+    data_user_phone = ["Telefone não disponível"] * len(df)
     
-    # Processar dados dos usuários
-    for i, row in df.iterrows():
-        data_user_full_name.append(row.get('dataNameUser', 'Nome não disponível'))
-        data_user_rg.append("RG não disponível")
-        data_user_phone.append("Telefone não disponível")
-        data_user_address.append(row.get('dataBranchAddress', 'Endereço não disponível'))
-        
-        # Buscar CPF via API
-        user_id = row.get('dataUserId')
+    # Buscar CPF via API
+    data_user_cpf = []
+    for user_id in _valores_da_coluna(df, 'dataUserId', None):
         if pd.notna(user_id):
             try:
                 print(f"🔍 Buscando CPF para usuário ID: {user_id}")
-                cpf = get_cpf_from_api(user_id, token)
+                cpf = get_cpf_from_api(user_id)
                 data_user_cpf.append(cpf)
                 print(f"📋 CPF obtido: {cpf}")
                 time.sleep(0.5)
@@ -356,184 +579,19 @@ def main():
         else:
             data_user_cpf.append("ID não disponível")
     
-    # Processar endereços das ocorrências
-    for coord in df['dataOccurenceAddress']:
-        if isinstance(coord, str) and ',' in coord:
-            try:
-                lat, lon = map(float, coord.replace(' ', '').split(','))
-                address = geopify_search(lat, lon)
-                data_address.append(address)
-            except:
-                data_address.append(str(coord))
-        else:
-            data_address.append(str(coord))
-    
-    # Processar endereços de tracking
-    for coord in df['dataTrackingGeolocation']:
-        if isinstance(coord, str) and ',' in coord:
-            try:
-                lat, lon = map(float, coord.replace(' ', '').split(','))
-                address = geopify_search(lat, lon)
-                data_tracking_address.append(address)
-            except:
-                data_tracking_address.append(str(coord))
-        else:
-            data_tracking_address.append(str(coord))
+    # Processar endereços das ocorrências e de tracking
+    data_address = [endereco_de_coordenada(coord) for coord in df['dataOccurenceAddress']]
+    data_tracking_address = [endereco_de_coordenada(coord) for coord in df['dataTrackingGeolocation']]
     
     # Formatar datas
     occurrence_dates, occurrence_hours = format_date(df['dataOccurenceDate'].tolist())
     tracking_dates, tracking_hours = format_date(df['dataTrackingDate'].tolist())
     
-    # Formatar CNPJ
-    cnpj_formatted = [format_cnpj(cnpj) for cnpj in df['dataBranchId']]
-    
     # Formatar telefones
     user_phones = [format_cellphone(phone) for phone in data_user_phone]
     
-    # Gerar textos para cada tipo de ocorrência (BASEADO NO DOCUMENTO FORNECIDO)
-    texts = []
-    for i, row in df.iterrows():
-        occurrence_type = int(row['dataOccurrenceType'])
-        plate = row['dataVehiclePlate']
-        model = row['dataVehicleModel']
-        user_name = data_user_full_name[i] if i < len(data_user_full_name) else 'Nome não disponível'
-        user_cpf = data_user_cpf[i] if i < len(data_user_cpf) else 'CPF não disponível'
-        
-        if occurrence_type == 1:  # ROUBO
-            texts.append(
-                f'No dia {occurrence_dates[i]} e hora {occurrence_hours[i]}, o locatario {user_name}, portador do RG {data_user_rg[i]},'
-                f'notificou através do aplicativo que a motocicleta de modelo {model} e placa {plate}, foi comunicada como roubada no endereço'
-                f'{data_address[i]}. Apos o incidente, o GPS do veiculo deixou de transmitir sinais. O gps do veiculo deixou'
-                f'de transmitir sinails. O cliente entrou em contato inicialmente pelo aplicativo para relatar o ocorrido. '
-                f'Apesar das dilegências, realizadas para a recuperação do veiculo, não foi possivel alcançar êxito nas operações. '
-                f'O ultimo sinal de GPS foi registrado em {tracking_dates[i]} às {tracking_hours[i]} UTC, na endereço {data_tracking_address[i]}.'
-            )
-            
-        elif occurrence_type == 2:  # INVENTARIO
-            texts.append(
-                f'No dia {occurrence_dates[i]} e hora {occurrence_hours[i]}, durante a realização do inventario, foi constatado que a motocicleta,'
-                f'de modelo {model} e placa {plate}, não se encontrava mais nas instalações da Mottu '
-                f'localizada no endereço {data_user_address[i]}, e não há mais registros da sua localização através do rastreador '
-                f'O ultimo sinal de GPS foi registrado em {tracking_dates[i]} às {tracking_hours[i]} UTC, no endereço {data_tracking_address[i]}.'
-            )
-            
-        elif occurrence_type == 3:  # FURTO
-            texts.append(
-                f'No dia {occurrence_dates[i]} e hora {occurrence_hours[i]}, o locatario {user_name}, portador do RG {data_user_rg[i]}, '
-                f'notificou através do aplicativo que a motocicleta de modelo {model} e placa {plate}, foi comunicada como furtada '
-                f'no endereço {data_address[i]}. Apos o incidente, o GPS do veiculo deixou de transmitir sinais. O gps do veiculo '
-                f'deixou de transmitir sinais. O cliente entrou em contato inicialmente pelo aplicativo para relatar o ocorrido. '
-                f'Apesar das dilegências, realizadas para a recuperação do veiculo, não foi possivel alcançar êxito nas operações. '
-                f'O ultimo sinal de GPS foi registrado em {tracking_dates[i]} às {tracking_hours[i]} UTC, na endereço {data_tracking_address[i]}.'
-            )
-            
-        elif occurrence_type == 4:  # VIOLAÇÃO
-            texts.append(
-                f'A Sra. Solange Brolezo, RG: 16.505.649-6, CPF: 094.377.888-39, residente na Rua Altamiro de Souza Bueno, 417, JD Bela Vista Joanópolis - SP, '
-                f'Telefone: (11) 96904-7320, representante das empresas locadoras de moto denominadas Mottu Locação de Veículos, Mottu I S/A, Mottu II S/A, '
-                f'Mottu III S/A, Mottu IV S/A, Mottu V S/A, Mottu VI S/A, Mottu VII S.A, Mottu Natal e Mottu Brasília através do presente documento informa que '
-                f'o motociclo acima descrito foi furtado na data e hora acima informadas no endereço declarado como local do fato. '
-                f'Foram adotadas diligências para localização e recuperação do bem, porém sem êxito até o momento. '
-                f'O último sinal de GPS foi captado em {tracking_dates[i]}, às {tracking_hours[i]} UTC, com geolocalização correspondente ao endereço {data_tracking_address[i]}.'
-            )
-            
-        elif occurrence_type == 5:  # APROPRIAÇÃO INDÉBITA
-            texts.append(
-                f'No dia {occurrence_dates[i]} foi encerrado o contrato de locação celebrado com {user_name}, portador do RG {data_user_rg[i]}, '
-                f'referente à motocicleta de modelo {model} e placa {plate}. '
-                f'A partir deste momento, o veiculo deixou de ser localizado, passando a ser deliberadamente ocultado pelo '
-                f'ex-locatario. Todas as tentativas de contato foram ignoradas, não sendo possivel qualquer forma '
-                f'de recuperação do bem. O rastreador foi desativado e o ultimo sinal de GPS foi registrado em '
-                f'{tracking_dates[i]} às {tracking_hours[i]} UTC, no endereço {data_tracking_address[i]}. '
-                f'Desde então, a motocicleta encontra-se em local ignorado, fora do alcance da empresa, sem qualquer devolutiva por parte do ex-locatario. '
-                f'O conjunto dos fatos, apontam para uma conduta que extrapola a mera inadimplencia contratual, configurando '
-                f'evidente subtração do veiculo, que permanece fora da posse da legitima proprietaria.'
-            )
-            
-        elif occurrence_type == 6:  # VEICULO ENCONTRADO
-            texts.append(
-                f'No dia {occurrence_dates[i]} e hora {occurrence_hours[i]}, o rastreador do veiculo voltou a emitir sinais com a sua localização nas coordenadas: ({row["dataTrackingGeolocation"]}). '
-                f'Deste modo, para averiguação dos sinais transmitidos foi enviado um prestador ao local. O motorista {row.get("dataOccurrenceBranchDriverName", "Motorista não informado")} foi designado  '
-                f'para a tarefa. Ao chegar ao local, confirmou a presença do veiculo da placa: {plate.upper()}, e chassi: {row.get("dataVehicleChassis", "Chassi não informado").upper()}, '
-                f'abandonado e procedeu com a sua recolha. O veiculo foi encaminhado para o pátio da empresa para as devidas providências legais e contato.'
-            )
-            
-        elif occurrence_type == 7:  # VEICULO RECUPERADO POR DENUNCIA ANONIMA
-            texts.append(
-                f'No dia {occurrence_dates[i]} e hora {occurrence_hours[i]}, recebemos uma denúncia por volta das {occurrence_hours[i]}, informando que uma moto de modelo {model.upper()}, '
-                f'e placa {plate.upper()}, estava abandonada na localização das coordenadas: ({row["dataTrackingGeolocation"]}). '
-                f'Para averiguação da denúncia, foi enviado um prestador ao local. O motorista: {row.get("dataOccurrenceBranchDriverName", "Motorista não informado")} foi designado para a tarefa. '
-                f'Ao chegar ao local, onde foi confirmada a presença do veículo da {plate.upper()}, e chassi: {row.get("dataVehicleChassis", "Chassi não informado").upper()}, abandonado e procedeu com a sua recolha. '
-                f'O veículo foi encaminhado para o pátio da empresa para as devidas providências legais e contato.'
-            )
-            
-        elif occurrence_type == 8:  # VEICULO APREENDIDO
-            texts.append(
-                f'No dia {occurrence_dates[i]} e hora {occurrence_hours[i]}, recebemos uma denúncia anônima informando que uma motocicleta de modelo {model.upper()}, '
-                f'e placa {plate.upper()}, havia sido apreendida no endereço {data_address[i]}. '
-                f'Para averiguação da denúncia, foi enviado um prestador ao local. O motorista: {row.get("dataOccurrenceBranchDriverName", "Motorista não informado")} foi designado para a tarefa. '
-                f'Ao chegar no local, foi confirmado a presença do veiculo citado, apos a liberação do veiculo a restrição contida no mesmo ainda continua ativa em sistema, '
-                f'Por meio deste documento solicitamos a remoção da restrição do veiculo, uma vez que apos a apreensão foram tomadas as devidas providências legais e contato. '
-                f'O veiculo foi encaminhado para o pátio e atualmente encontra-se sob a guarda da empresa, aguardando a regularização de sua situação.'
-            )
-            
-        elif occurrence_type == 9:  # VEICULO APREENDIDO -padrao
-            texts.append(
-                f'Na data {occurrence_dates[i]} recebemos a informação de que a motocicleta de placa {plate}, modelo {model} e chassi {row.get("dataVehicleChassis", "Chassi não informado")}, '
-                f'foi apreendida e encontra-se em pátio. Ressaltamos que, conforme orientação passada pelo orgão responsável, a liberação do veículo não poderá ser efetuada '
-                f'enquanto o boletim de ocorrência estiver ativo. Portanto, faz-se necessária a baixa do referido boletim para que o procedimento de liberação do veículo possa ser realizado.'
-            )
-            
-        elif occurrence_type == 10:  # ALTERAÇÃO ROUBO/FURTO (formato específico)
-            occ_date = occurrence_dates[i] if i < len(occurrence_dates) else "Data não disponível"
-            loc_name = user_name if user_name else "Nome não disponível"
-            # tenta extrair somente dígitos do CPF; senão mostra o que vier
-            cpf_digits = ''.join(ch for ch in (user_cpf or "") if ch.isdigit())
-            loc_cpf_display = cpf_digits if cpf_digits else (user_cpf or "CPF não disponível")
-            model_display = (model or "Modelo não disponível")
-            plate_display = (plate or "PLACA NÃO DISPONÍVEL")
-
-            texts.append(
-                f"Compareceu a esta Unidade Policial, a Sra. Solange Brolezo, RG: 16.505.649-6, CPF: 094.377.888-39, residente na Rua Altamiro de\n"
-                f"Souza Bueno, 417, JD Bela Vista Joanopolis - SP, Telefone: (11) 96904-7320, representante das empresas locadoras de moto\n"
-                f"denominadas Mottu Locacao de Veiculos, Mottu I S/A, Mottu II S/A, Mottu III S/A, Mottu IV S/A, Mottu V S/A, Mottu VI S/A, Mottu VII\n"
-                f"S.A e MOTTU Natal S/A, declarando que no dia {occ_date} a empresa locadora cadastrada como vitima, conseguiu contato com o\n"
-                f"locatario {loc_name} (CPF: {loc_cpf_display}), locatario do motociclo {model_display} placa {plate_display}, tendo\n"
-                f"ele informado que nao devolveu o motociclo locado em virtude do mesmo ter sido furtado, conforme descrito na documentacao ora\n"
-                f"apresentada e que nao conseguiu comunicar a empresa/vitima sobre o ocorrido, gerando assim o equivoco quanto a natureza dos\n"
-                f"fatos. O representante esclareceu ainda que a empresa/vitima tem realizado levantamentos dos boletins de ocorrencia registrados por\n"
-                f"apropriacao indebita, tentando novo contato com os locatarios e em alguns casos tem sido apurado que o ocorrido na verdade\n"
-                f"tratou-se de furto, tal como o presente registro. Face a isso, o representante da empresa/vitima solicita que o veiculo mencionado\n"
-                f"neste registro seja cadastrado nesta edicao como FURTADO, motivo pelo qual esta edicao e lavrada para fins de alterar o bloqueio de\n"
-                f"apropriacao indebita para bloqueio de furto junto ao CEPOL."
-            )
-
-        elif occurrence_type ==11:  # FALTA_DE_MOTOR_SPORT
-            texts.append(
-                f'No dia {occurrence_dates[i]} e hora {occurrence_hours[i]}, durante a realização do inventário, foi '
-                f'constatado que o motociclo de modelo {model} e placa {plate}, encontrava-se nas instalações da Mottu '
-                f'localizada no endereço {data_user_address[i]}, porém sem o motor. Até o presente momento,  não há informações'
-                f' precisas acerca da localização do referido componente.'
-            )
-
-        elif occurrence_type == 12:  # VEICULO ENCONTRADO SEM LOCACAO
-            texts.append(
-                f'No dia {occurrence_dates[i]} e hora {occurrence_hours[i]}, o rastreador do veiculo voltou a emitir sinais com a sua localização nas coordenadas: ({row["dataTrackingGeolocation"]}). '
-                f'Deste modo, para averiguação dos sinais transmitidos foi enviado um prestador ao local. O motorista {row.get("dataOccurrenceBranchDriverName", "Motorista não informado")} foi designado  '
-                f'para a tarefa. Ao chegar ao local, confirmou a presença do veiculo da placa: {plate.upper()}, e chassi: {row.get("dataVehicleChassis", "Chassi não informado").upper()}, '
-                f'abandonado e procedeu com a sua recolha. O veiculo foi encaminhado para o pátio da empresa para as devidas providências legais e contato.'
-            )
-
-        else:
-            texts.append(
-                f"Ocorrência registrada em {occurrence_dates[i]} às {occurrence_hours[i]} envolvendo o veículo "
-                f"{model} de placa {plate}. Local da ocorrência: {data_address[i]}. "
-                f"Última localização conhecida: {data_tracking_address[i]}. "
-                f"Locatário: {user_name} (CPF: {user_cpf})."
-            )
-    
-    # Gerar PDFs para cada registro
-    for i, row in df.iterrows():
+    # Texto (BASEADO NO DOCUMENTO FORNECIDO) e PDF de cada registro, numa única passada
+    for i, row in enumerate(registros):
         plate = row['dataVehiclePlate']
         occurrence_type = int(row['dataOccurrenceType'])
         branch_id = row['dataBranchId']
@@ -541,45 +599,39 @@ def main():
         
         print(f"\n📝 Processando {i+1}/{len(df)}: Placa {plate} - Tipo {occurrence_type}")
         
-        # Mapear tipos de ocorrência para nomes
-        type_names = {
-            1: "REGISTRO DE BOLETIM DE OCORRÊNCIA - ROUBO",
-            2: "REGISTRO DE BOLETIM DE OCORRÊNCIA - INVENTÁRIO", 
-            3: "REGISTRO DE BOLETIM DE OCORRÊNCIA - FURTO",
-            4: "REGISTRO DE BOLETIM DE OCORRÊNCIA - VIOLAÇÃO",
-            5: "REGISTRO DE BOLETIM DE OCORRÊNCIA - APROPRIAÇÃO INDÉBITA",
-            6: "BAIXA DE BOLETIM DE OCORRÊNCIA - VEÍCULO ENCONTRADO",
-            7: "BAIXA DE BOLETIM DE OCORRÊNCIA - VEÍCULO RECUPERADO",
-            8: "BAIXA DE BOLETIM DE OCORRÊNCIA - VEÍCULO APREENDIDO",
-            9: "BAIXA DE BOLETIM DE OCORRÊNCIA - VEÍCULO APREENDIDO - BO ATIVO",
-            10: "ALTERAÇÂO DE BOLETIM DE OCORRÊNCIA - ROUBO/FURTO",
-            11: "NÃO CRIMINAL - OUTROS NÃO CRIMINAL",
-            12: "BAIXA DE BOLETIM DE OCORRÊNCIA - VEÍCULO ENCONTRADO SEM LOCAÇÃO"
-        }
+        doc_type_name = TYPE_NAMES.get(occurrence_type, "OCORRÊNCIA")
         
-        doc_type_name = type_names.get(occurrence_type, "OCORRÊNCIA")
+        texto = montar_texto(occurrence_type, row, {
+            'data_ocorrencia': occurrence_dates[i],
+            'hora_ocorrencia': occurrence_hours[i],
+            'data_rastreio': tracking_dates[i],
+            'hora_rastreio': tracking_hours[i],
+            'endereco_ocorrencia': data_address[i],
+            'endereco_rastreio': data_tracking_address[i],
+            'endereco_locatario': data_user_address[i],
+            'nome': data_user_full_name[i],
+            'rg': data_user_rg[i],
+            'cpf': data_user_cpf[i],
+        })
         
         # Preparar dados para substituição
-        replacements = {
-            'RAZAO_MOTTU': row.get('dataBranchIdName', 'MOTTU LOCACAO DE VEICULOS LTDA'),
-            'ENDERECO_MOTTU': row.get('dataBranchAddress', 'Endereço não disponível'),
-            'DATA_OCORRENCIA': occurrence_dates[i],
-            'HORA_OCORRENCIA': occurrence_hours[i],
-            'MARCA_MODELO': row.get('dataVehicleModel', 'Modelo não disponível'),
-            'PLACA': plate,
-            'NOME_LOCAT': data_user_full_name[i] if i < len(data_user_full_name) else 'Nome não disponível',
-            'RG_LOCAT': data_user_rg[i] if i < len(data_user_rg) else 'RG não disponível',
-            'CPF_LOCAT': data_user_cpf[i] if i < len(data_user_cpf) else 'CPF não disponível',
-            'TELEFONE_LOCAT': user_phones[i] if i < len(user_phones) else 'Telefone não disponível',
-            'LOCAL DO FATO: ENDERECO_OCORRENCIA': data_address[i] if i < len(data_address) else 'Endereço não disponível',
-            'ENDERECO_LOCAT': data_user_address[i] if i < len(data_user_address) else 'Endereço não disponível',
-            'DATA_INICIO_LOCACAO': '07/05/2025',  # Valor padrão, pode ser ajustado conforme necessidade
-            'TEXTO': texts[i] if i < len(texts) else 'Histórico não disponível'
+        dados = {
+            'data_ocorrencia': occurrence_dates[i],
+            'hora_ocorrencia': occurrence_hours[i],
+            'endereco_ocorrencia': data_address[i],
+            'endereco_locatario': data_user_address[i],
+            'nome': data_user_full_name[i],
+            'rg': data_user_rg[i],
+            'cpf': data_user_cpf[i],
+            'telefone': user_phones[i],
         }
+        replacements = montar_replacements(row, plate, dados, texto)
         
         # Gerar PDF
         try:
             pdf_path = pdf_generator.generate_document_pdf(replacements, plate, doc_type_name, branch_id, user_id)
+            registrar_documento(chave_documento(plate, user_id), 'DOCUMENTO_GERADO', pdf_path,
+                                erro=None if pdf_path else "falha ao gerar PDF")
             if pdf_path:
                 print(f"✅ PDF gerado com sucesso: {os.path.basename(pdf_path)}")
             else:
@@ -592,4 +644,4 @@ def main():
     print(f"\n🎉 Processamento concluído! PDFs salvos em: {saidaPath}")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    sys.exit(1 if main() is False else 0)
\ No newline at end of file
@@ -2,7 +2,6 @@ import os
 import shutil
 import logging
 from pathlib import Path
-import pandas as pd
 from datetime import datetime
 from PyPDF2 import PdfMerger, PdfReader
 import re
@@ -15,10 +14,13 @@ if str(project_root) not in sys.path:
     sys.path.insert(0, str(project_root))
 
 from src.settings.config import config
+from src.utils.fileUtils import carregar_colunas
+from src.utils.ledger import ja_concluido, manter_pastas, registrar_documento
+from src.utils.ocorrencia import COLUNAS_OCORRENCIA, ocorrencias
 
 # Configuração de caminhos via Config
-# BASE_PATH deve apontar para 'src/output/gerador'
-BASE_PATH = project_root / "src" / "output" / "gerador"
+# BASE_PATH deve apontar para 'src/output/gerador' (ou para 'geradorPath', ex.: a pasta de um shard)
+BASE_PATH = Path(os.getenv('geradorPath') or project_root / "src" / "output" / "gerador").resolve()
 print(f"Usando BASE_PATH: {BASE_PATH}")
 
 # Logging
@@ -67,12 +69,10 @@ def carregar_dados_excel():
                 pass
             return {}
 
-        xl = pd.ExcelFile(str(excel_path))
         sheet_env = os.getenv('excelPage')
-        sheet_name = sheet_env if sheet_env else xl.sheet_names[0]
-        print(f"[DEBUG] Usando sheet: {sheet_name}")
+        print(f"[DEBUG] Usando sheet: {sheet_env or 'primeira aba'}")
 
-        df = pd.read_excel(str(excel_path), sheet_name=sheet_name)
+        df = carregar_colunas(COLUNAS_OCORRENCIA, str(excel_path))
         print(f"[DEBUG] Excel carregado: shape={df.shape}")
         print(f"[DEBUG] Colunas encontradas: {df.columns.tolist()}")
 
@@ -83,56 +83,12 @@ def carregar_dados_excel():
             return {}
 
         mapping = {}
-        for idx, row in df.iterrows():
-            placa = str(row.get('dataVehiclePlate', '')).strip()
-            user = row.get('dataUserId', None)
-            tipo = row.get('dataOccurrenceType', None)
-
-            def normalize_candidate(val):
-                if pd.isna(val):
-                    return None
-                s = str(val).strip()
-                if s in ('', '-', 'NaN', 'None'):
-                    return None
-                try:
-                    return str(int(float(s)))
-                except Exception:
-                    return s
-
-            user_str = normalize_candidate(user)
-            source = 'dataUserId'
-
-            # tenta alternativas se user inválido
-            if not user_str:
-                for alt_col in ('dataUserRentalId', 'dataVehicleId'):
-                    if alt_col in df.columns:
-                        alt_val = normalize_candidate(row.get(alt_col))
-                        if alt_val:
-                            user_str = alt_val
-                            source = alt_col
-                            break
-
-            # tenta extrair dígitos de qualquer célula da linha
-            if not user_str:
-                combined = ' '.join([str(v) for v in row.values if pd.notna(v)])
-                m = re.search(r'\d{3,}', combined)
-                if m:
-                    user_str = m.group(0)
-                    source = 'regex'
-
-            if not user_str:
-                print(f"[DEBUG] Linha {idx} ignorada: userId ausente. placa='{placa}'")
+        for ocorrencia in ocorrencias(df):
+            idx, chave, source = ocorrencia.indice, ocorrencia.chave, ocorrencia.fonte
+            if not chave:
+                print(f"[DEBUG] Linha {idx} ignorada: {source}. placa='{ocorrencia.placa}'")
                 continue
-
-            if not placa:
-                print(f"[DEBUG] Linha {idx} ignorada: placa ausente. user='{user_str}' (fonte: {source})")
-                continue
-
-            chave = f"{placa}_{user_str}"
-            try:
-                mapping[chave] = int(tipo) if (tipo is not None and not pd.isna(tipo)) else None
-            except Exception:
-                mapping[chave] = None
+            mapping[chave] = ocorrencia.tipo
 
             print(f"[DEBUG] Linha {idx} -> chave='{chave}' (fonte: {source})")
 
@@ -177,22 +133,111 @@ def extrair_chave_sem_data(nome_arquivo):
     
     return nome_sem_data
 
+# Mapeamento de tipos de documento
+TIPO_DOCUMENTO_MAP = {
+    1: "REGISTRO_DE_BOLETIM_DE_OCORRENCIA_ROUBO",
+    2: "REGISTRO_DE_BOLETIM_DE_OCORRENCIA_INVENTARIO", 
+    3: "REGISTRO_DE_BOLETIM_DE_OCORRENCIA_FURTO",
+    4: "REGISTRO_DE_BOLETIM_DE_OCORRENCIA_VIOLACAO",
+    5: "REGISTRO_DE_BOLETIM_DE_OCORRENCIA_APROPRIACAO_INDEBITA",
+    6: "REGISTRO_DE_BOLETIM_DE_OCORRENCIA_VEICULO_ENCONTRADO",
+    7: "BAIXA_DE_BOLETIM_DE_OCORRENCIA_VEICULO_RECUPERADO",
+    8: "BAIXA_DE_BOLETIM_DE_OCORRENCIA_VEICULO_APREENDIDO",
+    9: "BAIXA_DE_BOLETIM_DE_OCORRENCIA_VEICULO_APREENDIDO_BO_ATIVO",
+    10: "ALTERACAO_DE_BOLETIM_DE_OCORRENCIA_ROUBO_FURTO",
+    11: "NAO CRIMINAL - OUTROS NAO CRIMINAL",
+    12: "BAIXA_DE_BOLETIM_DE_OCORRENCIA_VEICULO_ENCONTRADO_SEM_LOCACAO"
+}
+
+# Tipos cujo dossiê inclui o BO como último documento
+TIPOS_COM_BO = (6, 7, 8, 9, 10)
+
+def get_documentos_obrigatorios(tipo):
+    """Retorna lista de documentos obrigatórios baseado no tipo"""
+    if tipo in [4, 10]:
+        return ["DOCUMENTO_GERADO", "CNH", "CRLV"]
+    elif tipo in [11, 12]:
+        return ["DOCUMENTO_GERADO", "CRLV"]
+    else:
+        return ["DOCUMENTO_GERADO", "CNH", "CRLV", "CONTRATO"]
+
+def get_ordem_documentos(documentos, tipo):
+    """Define ordem dos documentos baseado no tipo"""
+    ordem_base = []
+
+    # Documentos base
+    if tipo in [4, 10]:
+        ordem_base = [
+            documentos["DOCUMENTO_GERADO"],
+            documentos["CNH"], 
+            documentos["CRLV"]
+        ]
+    elif tipo in [11, 12]:
+        ordem_base = [
+            documentos["DOCUMENTO_GERADO"],
+            documentos["CRLV"]
+        ]
+    else:
+        ordem_base = [
+            documentos["DOCUMENTO_GERADO"],
+            documentos["CNH"],
+            documentos["CRLV"], 
+            documentos["CONTRATO"]
+        ]
+
+    # Adicionar BO se necessário
+    if tipo in TIPOS_COM_BO and "BO" in documentos:
+        ordem_base.append(documentos["BO"])
+        print(f"🔸 Tipo {tipo} detectado - BO será incluído")
+
+    return ordem_base
+
+def mesclar_dossie(chave, tipo_documento, arquivos_ordem, pasta_tipo, data_hora):
+    """
+    Mescla os PDFs de um dossiê (na ordem dada) em pasta_tipo. Retorna o caminho gerado.
+    O nome leva a chave inteira (PLACA_USERID): no streaming, dossiês da mesma placa com usuários
+    diferentes são mesclados ao mesmo tempo e não podem disputar o mesmo arquivo.
+    """
+    with PdfMerger() as merger:
+        for arquivo in arquivos_ordem:
+            merger.append(str(arquivo))
+
+        arquivo_mesclado = f"{tipo_documento}_{chave}_{data_hora}.pdf"
+        caminho_mesclado = Path(pasta_tipo) / arquivo_mesclado
+
+        # Escrever atomicamente
+        tmp_path = caminho_mesclado.with_suffix(".tmp")
+        merger.write(str(tmp_path))
+        tmp_path.replace(caminho_mesclado)
+    return caminho_mesclado
+
+def copiar_incompleto(chave, documentos, pasta_incompletos):
+    """Copia os documentos disponíveis de um conjunto incompleto para pasta_incompletos/<chave>."""
+    subpasta_chave = Path(pasta_incompletos) / chave
+    subpasta_chave.mkdir(parents=True, exist_ok=True)
+
+    for doc_type, pdf_path in documentos.items():
+        nome_arquivo = f"{doc_type}_{Path(pdf_path).name}"
+        destino = subpasta_chave / nome_arquivo
+        shutil.copy2(pdf_path, destino)
+    return subpasta_chave
+
 def merge_pdfs():
     """Junta os PDFs das pastas na ordem especificada"""
     
-    # Limpar pasta done antes de iniciar
-    print("🧹 Limpando pasta done...")
-    limpar_pasta_done()
+    # Limpar pasta done antes de iniciar (na retomada e no modo incremental mantém os dossiês já mesclados)
+    if manter_pastas():
+        DONE_PATH.mkdir(parents=True, exist_ok=True)
+    else:
+        print("🧹 Limpando pasta done...")
+        limpar_pasta_done()
     
     # Carregar mapeamento do Excel
     print("📊 Carregando dados do Excel...")
     mapeamento_placa_tipo = carregar_dados_excel()
     if not mapeamento_placa_tipo:
         print("❌ Não foi possível carregar o mapeamento do Excel")
-        return
-    
-    # Configurações de caminhos (usa BASE_PATH já definido no topo)
-    DONE_PATH = BASE_PATH / "done"
+        return False
     
     # Configuração das pastas de origem
     pastas_config = {
@@ -207,7 +252,7 @@ def merge_pdfs():
     for nome, pasta in pastas_config.items():
         if not pasta.exists():
             print(f"❌ Pasta não encontrada: {pasta} ({nome})")
-            return
+            return False
     
     print("📁 Pastas verificadas com sucesso!")
     
@@ -255,50 +300,10 @@ def merge_pdfs():
     for chave in sorted(documentos_por_chave.keys()):
         print(f"   {chave}: {list(documentos_por_chave[chave].keys())}")
     
-    # Definir regras de documentos por tipo
-    def get_documentos_obrigatorios(tipo):
-        """Retorna lista de documentos obrigatórios baseado no tipo"""
-        if tipo in [4, 10]:
-            return ["DOCUMENTO_GERADO", "CNH", "CRLV"]
-        elif tipo in [11, 12]:
-            return ["DOCUMENTO_GERADO", "CRLV"]
-        else:
-            return ["DOCUMENTO_GERADO", "CNH", "CRLV", "CONTRATO"]
-    
-    def get_ordem_documentos(documentos, tipo):
-        """Define ordem dos documentos baseado no tipo"""
-        ordem_base = []
-        
-        # Documentos base
-        if tipo in [4, 10]:
-            ordem_base = [
-                documentos["DOCUMENTO_GERADO"],
-                documentos["CNH"], 
-                documentos["CRLV"]
-            ]
-        elif tipo in [11, 12]:
-            ordem_base = [
-                documentos["DOCUMENTO_GERADO"],
-                documentos["CRLV"]
-            ]
-        else:
-            ordem_base = [
-                documentos["DOCUMENTO_GERADO"],
-                documentos["CNH"],
-                documentos["CRLV"], 
-                documentos["CONTRATO"]
-            ]
-        
-        # Adicionar BO se necessário
-        if tipo in [6, 7, 8, 9, 10] and "BO" in documentos:
-            ordem_base.append(documentos["BO"])
-            print(f"🔸 Tipo {tipo} detectado - BO será incluído")
-        
-        return ordem_base
-    
     # Encontrar conjuntos completos
     conjuntos_completos = []
     conjuntos_incompletos = {}
+    ja_mesclados = 0
     
     for chave, documentos in documentos_por_chave.items():
         tipo_documento = mapeamento_placa_tipo.get(chave)
@@ -310,6 +315,9 @@ def merge_pdfs():
         tem_todos = all(doc in documentos for doc in documentos_obrigatorios)
         
         if tem_todos:
+            if ja_concluido(chave, 'DOSSIE'):
+                ja_mesclados += 1
+                continue
             ordem = get_ordem_documentos(documentos, tipo_documento)
             
             conjuntos_completos.append({
@@ -326,28 +334,18 @@ def merge_pdfs():
     
     print(f"\n📊 Conjuntos completos: {len(conjuntos_completos)}")
     
+    if ja_mesclados:
+        print(f"⏭️  Dossiês já mesclados em execução anterior: {ja_mesclados}")
+    
     if not conjuntos_completos:
+        if ja_mesclados:
+            print("✅ Nenhum dossiê novo para mesclar")
+            return
         print("❌ Nenhum conjunto completo encontrado!")
         print("\n🔍 DEBUG - Documentos por chave:")
         for chave, docs in documentos_por_chave.items():
             print(f"   {chave}: {list(docs.keys())}")
-        return
-    
-    # Mapeamento de tipos de documento
-    tipo_documento_map = {
-        1: "REGISTRO_DE_BOLETIM_DE_OCORRENCIA_ROUBO",
-        2: "REGISTRO_DE_BOLETIM_DE_OCORRENCIA_INVENTARIO", 
-        3: "REGISTRO_DE_BOLETIM_DE_OCORRENCIA_FURTO",
-        4: "REGISTRO_DE_BOLETIM_DE_OCORRENCIA_VIOLACAO",
-        5: "REGISTRO_DE_BOLETIM_DE_OCORRENCIA_APROPRIACAO_INDEBITA",
-        6: "REGISTRO_DE_BOLETIM_DE_OCORRENCIA_VEICULO_ENCONTRADO",
-        7: "BAIXA_DE_BOLETIM_DE_OCORRENCIA_VEICULO_RECUPERADO",
-        8: "BAIXA_DE_BOLETIM_DE_OCORRENCIA_VEICULO_APREENDIDO",
-        9: "BAIXA_DE_BOLETIM_DE_OCORRENCIA_VEICULO_APREENDIDO_BO_ATIVO",
-        10: "ALTERACAO_DE_BOLETIM_DE_OCORRENCIA_ROUBO_FURTO",
-        11: "NAO CRIMINAL - OUTROS NAO CRIMINAL",
-        12: "BAIXA_DE_BOLETIM_DE_OCORRENCIA_VEICULO_ENCONTRADO_SEM_LOCACAO"
-    }
+        return False
     
     # Agrupar e processar conjuntos por tipo
     conjuntos_por_tipo = {}
@@ -374,23 +372,13 @@ def merge_pdfs():
             print(f"  🔄 Processando: {chave}")
             
             try:
-                with PdfMerger() as merger:
-                    for arquivo in arquivos_ordem:
-                        merger.append(str(arquivo))
-                    
-                    placa = chave.split("_")[0]
-                    arquivo_mesclado = f"{tipo_documento}_{placa}_{data_hora}.pdf"
-                    caminho_mesclado = pasta_tipo / arquivo_mesclado
-                    
-                    # Escrever atomicamente
-                    tmp_path = caminho_mesclado.with_suffix(".tmp")
-                    merger.write(str(tmp_path))
-                    tmp_path.replace(caminho_mesclado)
-                    
-                print(f"    ✅ PDF mesclado salvo: {arquivo_mesclado}")
+                caminho_mesclado = mesclar_dossie(chave, tipo_documento, arquivos_ordem, pasta_tipo, data_hora)
+                print(f"    ✅ PDF mesclado salvo: {caminho_mesclado.name}")
+                registrar_documento(chave, 'DOSSIE', caminho_mesclado)
                 
             except Exception as e:
                 print(f"    ❌ Erro ao processar {chave}: {e}")
+                registrar_documento(chave, 'DOSSIE', erro=str(e))
     
     # Processar conjuntos incompletos
     if conjuntos_incompletos:
@@ -401,14 +389,7 @@ def merge_pdfs():
         
         for chave, documentos in conjuntos_incompletos.items():
             try:
-                subpasta_chave = pasta_incompletos / chave
-                subpasta_chave.mkdir(parents=True, exist_ok=True)
-                
-                for doc_type, pdf_path in documentos.items():
-                    nome_arquivo = f"{doc_type}_{pdf_path.name}"
-                    destino = subpasta_chave / nome_arquivo
-                    shutil.copy2(pdf_path, destino)
-                
+                copiar_incompleto(chave, documentos, pasta_incompletos)
                 print(f"   📄 Copiados documentos incompletos para: {chave}")
                 
             except Exception as e:
@@ -420,7 +401,7 @@ def merge_pdfs():
     print(f"   ✅ Dossiês completos mesclados: {len(conjuntos_completos)}")
     print(f"   📁 Pastas criadas: {len(conjuntos_por_tipo)} tipos diferentes")
     for tipo, quantidade in conjuntos_por_tipo.items():
-        nome_tipo = tipo_documento_map.get(tipo, f"Tipo_{tipo}")
+        nome_tipo = TIPO_DOCUMENTO_MAP.get(tipo, f"Tipo_{tipo}")
         print(f"      - Tipo {tipo} ({nome_tipo}): {len(quantidade)} dossiês")
     print(f"   ⚠️  Conjuntos incompletos: {len(conjuntos_incompletos)}")
     print(f"📁 Pasta de resultados: {DONE_PATH}")
@@ -436,4 +417,4 @@ def merge_pdfs():
 
 if __name__ == "__main__":
     print("🔄 Iniciando mesclagem de PDFs para dossiês completos...")
-    merge_pdfs()
\ No newline at end of file
+    sys.exit(1 if merge_pdfs() is False else 0)
\ No newline at end of file
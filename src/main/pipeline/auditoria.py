@@ -0,0 +1,219 @@
+"""Auditoria das saídas (--auditar): documentos esperados pela planilha x arquivos no disco.
+
+Monta um índice (dict) dos arquivos que cada linha da planilha deveria ter
+produzido e outro com os PDFs de cada pasta de saída, lidos numa única
+passada de os.scandir por pasta, e cruza os dois com o ledger (uma consulta).
+O custo é linear no número de linhas e de arquivos, então continua rápido com
+centenas de milhares de PDFs. Por chave PLACA_USERID, relata os documentos
+faltando e os divergentes (arquivo vazio ou com tamanho diferente do
+registrado no ledger); por pasta, os arquivos extras, sem linha na planilha.
+"""
+from __future__ import annotations
+
+import json
+import os
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from src.main.pipeline.relatorio import RELATORIOS_PADRAO
+from src.utils.ledger import chave_documento
+
+# Pastas com um dossiê incompleto por chave (cópias), dentro da 'done'
+PREFIXO_INCOMPLETOS = 'INCOMPLETOS_'
+
+# Quantos itens de cada lista aparecem no terminal (o JSON traz todos)
+LIMITE_TERMINAL = 20
+
+
+def pastas_documentos() -> Dict[str, Path]:
+    """Pasta onde cada etapa grava os seus PDFs (as mesmas do modo streaming); 'DOSSIE' é a done."""
+    from src.main.geracao.coletas import bo_download, driverLicense, rentalDocument, vehicleDocument
+    from src.main.geracao.gerador import generatePDF, mergePDF
+
+    return {
+        'CNH': Path(driverLicense.OUTPUT_DIR),
+        'CRLV': Path(vehicleDocument.CRLV_PATH),
+        'CONTRATO': Path(rentalDocument.contract_path),
+        'BO': Path(bo_download.OUTPUT_DIR),
+        'DOCUMENTO_GERADO': Path(generatePDF.saidaPath),
+        'DOSSIE': Path(mergePDF.DONE_PATH),
+    }
+
+
+def _pdfs(pasta, recursivo=False) -> Iterator[Tuple[str, str, int]]:
+    """(caminho, nome, tamanho) dos PDFs da pasta; recursivo desce nas subpastas, exceto as de incompletos."""
+    pendentes = [str(pasta)]
+    while pendentes:
+        try:
+            entradas = os.scandir(pendentes.pop())
+        except (FileNotFoundError, NotADirectoryError):
+            continue
+        with entradas:
+            for entrada in entradas:
+                if entrada.is_dir(follow_symlinks=False):
+                    if recursivo and not entrada.name.startswith(PREFIXO_INCOMPLETOS):
+                        pendentes.append(entrada.path)
+                elif entrada.name.lower().endswith('.pdf') and entrada.is_file():
+                    yield entrada.path, entrada.name, entrada.stat().st_size
+
+
+def indexar_pasta(pasta) -> Dict[str, int]:
+    """{nome do arquivo: tamanho} dos PDFs da pasta, numa única passada de os.scandir."""
+    return {nome: tamanho for _, nome, tamanho in _pdfs(pasta)}
+
+
+def indexar_arvore(pasta) -> Dict[str, int]:
+    """{caminho: tamanho} dos PDFs da pasta e das subpastas (a done tem uma pasta por tipo e execução)."""
+    return {os.path.normcase(os.path.abspath(caminho)): tamanho for caminho, _, tamanho in _pdfs(pasta, True)}
+
+
+def arquivos_do_dossie(ocorrencia) -> Dict[str, Optional[str]]:
+    """
+    Nome do arquivo de cada documento obrigatório da linha, como as etapas o gravam;
+    None quando falta o id que o documento exige. O BO entra só nos tipos que o usam.
+    """
+    from src.main.geracao.gerador.mergePDF import get_documentos_obrigatorios
+    from src.main.pipeline.planner import bo_da_ocorrencia
+
+    placa, user_id, vehicle_id = ocorrencia.placa, ocorrencia.user_id, ocorrencia.vehicle_id
+    chave_usuario = ocorrencia.chave_usuario
+    arquivos: Dict[str, Optional[str]] = {}
+    for tipo_doc in get_documentos_obrigatorios(ocorrencia.tipo):
+        if tipo_doc == 'DOCUMENTO_GERADO':
+            arquivos[tipo_doc] = f"{chave_usuario}.pdf"
+        elif tipo_doc == 'CRLV':
+            arquivos[tipo_doc] = f"{chave_usuario if user_id else chave_documento(placa)}.pdf" if vehicle_id else None
+        elif tipo_doc in ('CNH', 'CONTRATO'):
+            arquivos[tipo_doc] = f"{chave_usuario}.pdf" if user_id else None
+    bo_type = bo_da_ocorrencia(ocorrencia.tipo)
+    if bo_type:
+        # mesmo nome de bo_download.caminho_bo
+        arquivos['BO'] = f"{chave_documento(placa, vehicle_id)}_BO_{int(bo_type)}.pdf" if vehicle_id else None
+    return arquivos
+
+
+@dataclass
+class RelatorioAuditoria:
+    chaves: int = 0
+    arquivos: int = 0
+    faltando: Dict[str, List[str]] = field(default_factory=dict)
+    divergentes: Dict[str, Dict[str, str]] = field(default_factory=dict)
+    extras: Dict[str, List[str]] = field(default_factory=dict)
+    gerado_em: str = field(default_factory=lambda: datetime.now().isoformat(timespec='seconds'))
+
+    def consistente(self) -> bool:
+        return not (self.faltando or self.divergentes or self.extras)
+
+    def resumo(self) -> str:
+        extras = sum(len(nomes) for nomes in self.extras.values())
+        return (f"{self.chaves} chaves, {self.arquivos} PDFs no disco: {len(self.faltando)} com documentos faltando, "
+                f"{len(self.divergentes)} com documentos divergentes, {extras} arquivos extras")
+
+    def to_dict(self) -> dict:
+        return {
+            "gerado_em": self.gerado_em,
+            "consistente": self.consistente(),
+            "chaves": self.chaves,
+            "arquivos": self.arquivos,
+            "faltando": self.faltando,
+            "divergentes": self.divergentes,
+            "extras": self.extras,
+        }
+
+    def salvar(self, caminho=None) -> Path:
+        """Grava o JSON em `caminho` ou src/output/relatorios/auditoria_<data_hora>.json."""
+        if caminho is None:
+            carimbo = self.gerado_em.replace('-', '').replace(':', '').replace('T', '_')
+            caminho = RELATORIOS_PADRAO / f"auditoria_{carimbo}.json"
+        caminho = Path(caminho)
+        caminho.parent.mkdir(parents=True, exist_ok=True)
+        tmp = caminho.with_suffix('.tmp')
+        tmp.write_text(json.dumps(self.to_dict(), ensure_ascii=False, indent=2), encoding='utf-8')
+        tmp.replace(caminho)
+        return caminho
+
+    def imprimir(self, limite: int = LIMITE_TERMINAL) -> None:
+        print(f"🔎 Auditoria: {self.resumo()}")
+        for titulo, itens in (("Faltando", self.faltando), ("Divergentes", self.divergentes), ("Extras", self.extras)):
+            for nome, valor in list(itens.items())[:limite]:
+                print(f"   {titulo} - {nome}: {valor}")
+            if len(itens) > limite:
+                print(f"   ... e mais {len(itens) - limite} ({titulo.lower()}) no relatório JSON")
+
+
+def auditar(df=None, pastas: Optional[Dict[str, Path]] = None, ledger=None) -> RelatorioAuditoria:
+    """
+    Cruza as linhas da planilha (ou df) com os PDFs das pastas de saída e o ledger.
+    Linhas reprovadas na validação prévia não são cobradas, como na execução.
+    """
+    from src.main.pipeline.validacao import validacao_ativa, validar
+    from src.utils.fileUtils import carregar_colunas
+    from src.utils.ledger import get_ledger
+    from src.utils.ocorrencia import COLUNAS_EXECUCAO, ocorrencias
+
+    if df is None:
+        df = carregar_colunas(COLUNAS_EXECUCAO)
+    if validacao_ativa():
+        df = validar(df)[0]
+    pastas = pastas or pastas_documentos()
+    ledger = ledger or get_ledger()
+
+    # índices esperados: {chave: {tipo_doc: nome}} e {tipo_doc: nomes}
+    por_chave: Dict[str, Dict[str, Optional[str]]] = {}
+    for ocorrencia in ocorrencias(df):
+        if ocorrencia.chave and ocorrencia.chave not in por_chave:
+            por_chave[ocorrencia.chave] = arquivos_do_dossie(ocorrencia)
+    esperados: Dict[str, set] = {}
+    for arquivos in por_chave.values():
+        for tipo_doc, nome in arquivos.items():
+            if nome:
+                esperados.setdefault(tipo_doc, set()).add(nome)
+
+    # índices do disco (uma passada por pasta) e do ledger (uma consulta)
+    disco = {tipo_doc: indexar_pasta(pasta) for tipo_doc, pasta in pastas.items() if tipo_doc != 'DOSSIE'}
+    done = indexar_arvore(pastas['DOSSIE']) if 'DOSSIE' in pastas else {}
+    tamanhos_ledger: Dict[Tuple[str, str], int] = {}
+    dossies_ledger: Dict[str, Tuple[str, int]] = {}
+    for (chave, tipo_doc), (caminho, tamanho) in ledger.documentos_ok().items():
+        if tipo_doc == 'DOSSIE':
+            dossies_ledger[chave] = (os.path.normcase(os.path.abspath(caminho)), tamanho)
+        elif caminho:
+            tamanhos_ledger[(tipo_doc, os.path.basename(caminho))] = tamanho
+
+    relatorio = RelatorioAuditoria(chaves=len(por_chave), arquivos=sum(map(len, disco.values())) + len(done))
+
+    for chave, arquivos in por_chave.items():
+        faltando, divergentes = [], {}
+        for tipo_doc, nome in arquivos.items():
+            tamanho = disco.get(tipo_doc, {}).get(nome) if nome else None
+            if tamanho is None:
+                faltando.append(tipo_doc)
+            elif tamanho == 0:
+                divergentes[tipo_doc] = f"{nome} vazio"
+            elif tamanhos_ledger.get((tipo_doc, nome), tamanho) != tamanho:
+                divergentes[tipo_doc] = f"{nome} com {tamanho} bytes, ledger registrou {tamanhos_ledger[(tipo_doc, nome)]}"
+
+        dossie = dossies_ledger.get(chave)
+        if dossie is None:
+            faltando.append('DOSSIE')
+        elif done.get(dossie[0]) is None:
+            divergentes['DOSSIE'] = f"{dossie[0]} registrado no ledger, mas ausente da done"
+        elif done[dossie[0]] != dossie[1]:
+            divergentes['DOSSIE'] = f"{dossie[0]} com {done[dossie[0]]} bytes, ledger registrou {dossie[1]}"
+
+        if faltando:
+            relatorio.faltando[chave] = faltando
+        if divergentes:
+            relatorio.divergentes[chave] = divergentes
+
+    for tipo_doc, arquivos_disco in disco.items():
+        extras = sorted(nome for nome in arquivos_disco if nome not in esperados.get(tipo_doc, ()))
+        if extras:
+            relatorio.extras[tipo_doc] = extras
+    dossies_esperados = {dossies_ledger[chave][0] for chave in por_chave if chave in dossies_ledger}
+    extras_done = sorted(caminho for caminho in done if caminho not in dossies_esperados)
+    if extras_done:
+        relatorio.extras['DOSSIE'] = extras_done
+    return relatorio
@@ -0,0 +1,166 @@
+"""Modo incremental: processa só as linhas novas ou alteradas desde a última execução.
+
+Cada linha da planilha recebe um fingerprint (placa, userId, rentalId, vehicleId,
+tipo de ocorrência e datas) guardado no ledger por chave PLACA_USERID. Na
+execução seguinte apenas as chaves cujo fingerprint mudou (ou que ainda não
+têm dossiê concluído) vão para as etapas; os PDFs que já estão nas pastas de
+saída são reaproveitados como estão.
+"""
+from __future__ import annotations
+
+import hashlib
+from typing import Dict, Tuple
+
+import numpy as np
+import pandas as pd
+
+from src.utils.ledger import Ledger, get_ledger
+
+CAMPOS_FINGERPRINT = (
+    'dataVehiclePlate',
+    'dataUserId',
+    'dataUserRentalId',
+    'dataVehicleId',
+    'dataOccurrenceType',
+    'dataOccurenceDate',
+    'dataTrackingDate',
+)
+
+
+def _valor_normalizado(valor) -> str:
+    """Representação estável de uma célula: '123.0' e 123 viram '123'; datas em ISO; vazios viram ''."""
+    if valor is None:
+        return ''
+    try:
+        if pd.isna(valor):
+            return ''
+    except (TypeError, ValueError):
+        pass
+    if hasattr(valor, 'isoformat'):
+        return pd.Timestamp(valor).isoformat()
+    s = str(valor).strip()
+    if s in ('-', 'None', 'NaN', 'nan', 'NaT'):
+        return ''
+    try:
+        f = float(s)
+        if f.is_integer():
+            return str(int(f))
+    except ValueError:
+        pass
+    return s.upper()
+
+
+# Colunas que podem ser normalizadas sem olhar célula a célula (datas e colunas mistas seguem _valor_normalizado)
+_TIPOS_VETORIZAVEIS = ('string', 'integer', 'floating', 'mixed-integer-float', 'boolean', 'empty')
+
+
+def _valores_normalizados(serie) -> pd.Series:
+    """_valor_normalizado aplicado à coluna inteira de uma vez."""
+    if pd.api.types.is_datetime64_dtype(serie):
+        texto = pd.Series(np.datetime_as_string(serie.to_numpy(), unit='s'), index=serie.index, dtype=object)
+        # Timestamp.isoformat só mostra a fração de segundo quando ela existe
+        fracao = serie.notna() & ((serie.dt.microsecond != 0) | (serie.dt.nanosecond != 0))
+        if fracao.any():
+            texto[fracao] = serie[fracao].map(_valor_normalizado)
+        texto[serie.isna()] = ''
+        return texto
+    if pd.api.types.is_numeric_dtype(serie) and not pd.api.types.is_bool_dtype(serie):
+        valores = serie.to_numpy(dtype='float64', na_value=np.nan)
+        texto = np.full(len(valores), '', dtype=object)
+        presentes = ~np.isnan(valores)
+        texto[presentes] = [str(int(f)) if f.is_integer() else str(f).upper() for f in valores[presentes].tolist()]
+        return pd.Series(texto, index=serie.index, dtype=object)
+    if pd.api.types.infer_dtype(serie, skipna=True) not in _TIPOS_VETORIZAVEIS:
+        return serie.map(_valor_normalizado).astype(object)
+    s = serie.astype('string').str.strip()
+    s = s.where(~s.isin(('-', 'None', 'NaN', 'nan', 'NaT')), '').fillna('')
+    numeros = pd.to_numeric(s.where(s != '', None), errors='coerce')
+    inteiros = numeros.notna() & (numeros % 1 == 0)
+    texto = s.str.upper().astype(object)
+    if inteiros.any():
+        texto[inteiros] = numeros[inteiros].map(lambda f: str(int(f)))
+    return texto
+
+
+def fingerprint_linha(row) -> str:
+    partes = [_valor_normalizado(row.get(campo)) for campo in CAMPOS_FINGERPRINT]
+    return hashlib.sha1('|'.join(partes).encode('utf-8')).hexdigest()
+
+
+def fingerprints_das_linhas(df) -> list:
+    """fingerprint_linha de cada linha, com a normalização e a junção dos campos feitas por coluna."""
+    juntos = None
+    for campo in CAMPOS_FINGERPRINT:
+        if campo in df.columns:
+            parte = _valores_normalizados(df[campo])
+        else:
+            parte = pd.Series([''] * len(df), index=df.index, dtype=object)
+        juntos = parte if juntos is None else juntos.str.cat(parte, sep='|')
+    return [hashlib.sha1(texto.encode('utf-8')).hexdigest() for texto in juntos.tolist()]
+
+
+def chaves_das_linhas(df) -> list:
+    """Chave PLACA_USERID de cada linha (None quando a linha não tem chave), na ordem da planilha."""
+    from src.utils.ocorrencia import chaves
+
+    return chaves(df)
+
+
+def fingerprints_por_chave(df, chaves=None) -> Dict[str, str]:
+    """{chave: fingerprint}; chaves repetidas combinam os fingerprints de todas as suas linhas."""
+    chaves = chaves if chaves is not None else chaves_das_linhas(df)
+    por_chave: Dict[str, list] = {}
+    for chave, fingerprint in zip(chaves, fingerprints_das_linhas(df)):
+        if chave:
+            por_chave.setdefault(chave, []).append(fingerprint)
+    return {
+        chave: fps[0] if len(fps) == 1 else hashlib.sha1('|'.join(sorted(fps)).encode('utf-8')).hexdigest()
+        for chave, fps in por_chave.items()
+    }
+
+
+def selecionar_alteradas(df, ledger: Ledger) -> Tuple[pd.DataFrame, Dict[str, str]]:
+    """
+    Compara os fingerprints da planilha com os da última execução.
+    Retorna (linhas novas/alteradas, {chave: fingerprint} pendentes de confirmação).
+    O dossiê das chaves alteradas é esquecido no ledger para ser refeito.
+    """
+    chaves = chaves_das_linhas(df)
+    anteriores = ledger.fingerprints()
+    atuais = fingerprints_por_chave(df, chaves)
+
+    alteradas = {chave: fp for chave, fp in atuais.items() if anteriores.get(chave) != fp}
+    for chave in alteradas:
+        ledger.esquecer(chave, 'DOSSIE')
+
+    mascara = [chave in alteradas for chave in chaves]
+    return df[mascara].reset_index(drop=True), alteradas
+
+
+def preparar_incremental(df=None) -> Dict[str, str]:
+    """
+    Seleciona as linhas novas/alteradas e as instala como a planilha desta execução
+    (read_workbook/searchExcel passam a devolver só elas). Retorna os fingerprints pendentes.
+    """
+    from src.utils.fileUtils import carregar_colunas, instalar_planilha
+    from src.utils.ocorrencia import COLUNAS_EXECUCAO
+
+    if df is None:
+        df = carregar_colunas(COLUNAS_EXECUCAO)
+    filtrado, pendentes = selecionar_alteradas(df, get_ledger())
+    print(f"📈 Modo incremental: {len(filtrado)} de {len(df)} linhas novas ou alteradas ({len(pendentes)} dossiês)")
+    instalar_planilha(filtrado)
+    return pendentes
+
+
+def confirmar_incremental(pendentes: Dict[str, str]) -> int:
+    """
+    Grava o fingerprint das chaves cujo dossiê foi concluído nesta execução.
+    As demais continuam pendentes e voltam na próxima execução incremental.
+    """
+    ledger = get_ledger()
+    concluidas = {chave: fp for chave, fp in pendentes.items() if ledger.concluido(chave, 'DOSSIE')}
+    ledger.salvar_fingerprints(concluidas)
+    faltando = len(pendentes) - len(concluidas)
+    print(f"📈 Incremental: {len(concluidas)} dossiês confirmados" + (f", {faltando} pendentes" if faltando else ""))
+    return len(concluidas)
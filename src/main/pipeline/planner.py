@@ -0,0 +1,189 @@
+"""Planejamento do trabalho: quais documentos buscar para cada chave.
+
+Lê a planilha uma vez, aplica as regras por tipo de ocorrência
+(mergePDF.get_documentos_obrigatorios e os tipos que levam BO) e remove as
+chaves repetidas. O resultado é um manifesto consumido por todos os
+coletores, então nenhum documento que o merge descartaria é baixado.
+"""
+from __future__ import annotations
+
+import json
+import os
+import threading
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from src.utils.ledger import chave_documento
+
+MANIFESTO_PADRAO = Path(__file__).resolve().parents[3] / "src" / "output" / "manifesto.json"
+
+TIPOS_DOCUMENTO = ('CNH', 'CRLV', 'CONTRATO', 'BO')
+
+# Únicas colunas que o plano lê da planilha
+COLUNAS_PLANO = ('dataVehiclePlate', 'dataUserId', 'dataVehicleId', 'dataUserRentalId', 'dataOccurrenceType')
+
+
+@dataclass(frozen=True)
+class ItemPlano:
+    tipo_doc: str
+    chave: str
+    placa: str
+    user_id: str = ''
+    vehicle_id: str = ''
+    rental_id: str = ''
+    tipo_ocorrencia: Optional[int] = None
+    bo_type: Optional[str] = None
+
+
+@dataclass
+class Plano:
+    documentos: Dict[str, List[ItemPlano]] = field(default_factory=lambda: {t: [] for t in TIPOS_DOCUMENTO})
+    linhas: int = 0
+    ignorados: Dict[str, int] = field(default_factory=dict)
+
+    def itens(self, tipo_doc) -> List[ItemPlano]:
+        return self.documentos.get(tipo_doc, [])
+
+    def total_documentos(self) -> int:
+        """Estimativa de documentos da execução: os coletados, mais um documento gerado e um dossiê por linha."""
+        return sum(len(itens) for itens in self.documentos.values()) + 2 * self.linhas
+
+    def resumo(self) -> str:
+        partes = ", ".join(f"{tipo}: {len(itens)}" for tipo, itens in self.documentos.items())
+        return f"{self.linhas} linhas -> {partes}"
+
+    def to_dict(self) -> dict:
+        return {
+            "gerado_em": datetime.now().isoformat(timespec='seconds'),
+            "linhas": self.linhas,
+            "ignorados": self.ignorados,
+            "documentos": {tipo: [asdict(item) for item in itens] for tipo, itens in self.documentos.items()},
+        }
+
+    @classmethod
+    def from_dict(cls, dados: dict) -> "Plano":
+        documentos = {t: [] for t in TIPOS_DOCUMENTO}
+        for tipo, itens in dados.get("documentos", {}).items():
+            documentos[tipo] = [ItemPlano(**item) for item in itens]
+        return cls(documentos=documentos, linhas=dados.get("linhas", 0), ignorados=dados.get("ignorados", {}))
+
+
+def bo_da_ocorrencia(tipo) -> Optional[str]:
+    """Tipo de BO a buscar para o tipo de ocorrência, ou None quando o merge não usa BO."""
+    from src.main.geracao.coletas.bo_download import OCORRENCIA_PARA_BO
+    from src.main.geracao.gerador.mergePDF import TIPOS_COM_BO
+
+    if tipo not in TIPOS_COM_BO:
+        return None
+    return OCORRENCIA_PARA_BO.get(tipo)
+
+
+def gerar_plano(df) -> Plano:
+    """Aplica as regras por tipo a cada linha e deduplica por (documento, chave)."""
+    from src.main.geracao.gerador.mergePDF import get_documentos_obrigatorios
+    from src.utils.ocorrencia import ocorrencias
+
+    plano = Plano(linhas=len(df))
+    vistos = set()
+
+    def adicionar(item: ItemPlano):
+        if (item.tipo_doc, item.chave, item.bo_type) in vistos:
+            plano.ignorados['duplicado'] = plano.ignorados.get('duplicado', 0) + 1
+            return
+        vistos.add((item.tipo_doc, item.chave, item.bo_type))
+        plano.documentos[item.tipo_doc].append(item)
+
+    def ignorar(motivo):
+        plano.ignorados[motivo] = plano.ignorados.get(motivo, 0) + 1
+
+    for ocorrencia in ocorrencias(df):
+        placa = ocorrencia.placa
+        if not placa:
+            ignorar('sem placa')
+            continue
+        tipo, user_id = ocorrencia.tipo, ocorrencia.user_id
+        vehicle_id, rental_id = ocorrencia.vehicle_id, ocorrencia.rental_id
+        obrigatorios = get_documentos_obrigatorios(tipo)
+        dados = dict(placa=placa, user_id=user_id, vehicle_id=vehicle_id, rental_id=rental_id, tipo_ocorrencia=tipo)
+
+        if "CNH" in obrigatorios:
+            if user_id:
+                adicionar(ItemPlano('CNH', chave_documento(placa, user_id), **dados))
+            else:
+                ignorar('CNH sem userId')
+
+        if "CRLV" in obrigatorios:
+            if vehicle_id:
+                chave = chave_documento(placa, user_id) if user_id else chave_documento(placa)
+                adicionar(ItemPlano('CRLV', chave, **dados))
+            else:
+                ignorar('CRLV sem vehicleId')
+
+        if "CONTRATO" in obrigatorios:
+            if user_id:
+                adicionar(ItemPlano('CONTRATO', chave_documento(placa, user_id), **dados))
+            else:
+                ignorar('CONTRATO sem userId')
+
+        bo_type = bo_da_ocorrencia(tipo)
+        if bo_type:
+            if vehicle_id:
+                adicionar(ItemPlano('BO', chave_documento(placa, vehicle_id), bo_type=bo_type, **dados))
+            else:
+                ignorar('BO sem vehicleId')
+
+    return plano
+
+
+def salvar_manifesto(plano: Plano, caminho=None) -> Path:
+    caminho = Path(caminho or os.getenv('manifestoPath') or MANIFESTO_PADRAO)
+    caminho.parent.mkdir(parents=True, exist_ok=True)
+    tmp = caminho.with_suffix('.tmp')
+    tmp.write_text(json.dumps(plano.to_dict(), ensure_ascii=False, indent=2), encoding='utf-8')
+    tmp.replace(caminho)
+    return caminho
+
+
+def carregar_manifesto(caminho) -> Plano:
+    return Plano.from_dict(json.loads(Path(caminho).read_text(encoding='utf-8')))
+
+
+_plano: Optional[Plano] = None
+_plano_lock = threading.Lock()
+
+
+def preparar_plano(df=None) -> Plano:
+    """
+    Gera o plano da execução a partir da planilha (ou de df), grava o manifesto e o deixa
+    disponível para os coletores deste processo e, via variável 'manifesto', para os subprocessos.
+    """
+    global _plano
+    from src.utils.fileUtils import carregar_colunas
+
+    if df is None:
+        df = carregar_colunas(COLUNAS_PLANO)
+    plano = gerar_plano(df)
+    caminho = salvar_manifesto(plano)
+    os.environ['manifesto'] = str(caminho)
+    with _plano_lock:
+        _plano = plano
+    print(f"🗺️  Plano de trabalho: {plano.resumo()}")
+    if plano.ignorados:
+        print(f"   Ignorados: {plano.ignorados}")
+    print(f"   Manifesto: {caminho}")
+    return plano
+
+
+def get_plano() -> Plano:
+    """Plano da execução: o já preparado, o manifesto indicado em 'manifesto' ou um novo, gerado da planilha."""
+    global _plano
+    with _plano_lock:
+        if _plano is not None:
+            return _plano
+        manifesto = os.getenv('manifesto')
+        if manifesto and os.path.exists(manifesto):
+            _plano = carregar_manifesto(manifesto)
+            return _plano
+    return preparar_plano()
@@ -0,0 +1,168 @@
+"""Relatório de execução legível por máquina.
+
+Mede cada etapa (tempo de parede, tentativas e resultado) e, ao final, cruza
+com o ledger os documentos planejados, concluídos, com falha e os bytes
+gravados nesta execução. O relatório é salvo em JSON para acompanhar a vazão
+ao longo das execuções agendadas (cron) e define o código de saída.
+"""
+from __future__ import annotations
+
+import json
+import os
+import time
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, Optional
+
+RELATORIOS_PADRAO = Path(__file__).resolve().parents[3] / "src" / "output" / "relatorios"
+
+# Códigos de saída do main.py (1 fica para erros de configuração, como script não encontrado)
+CODIGO_OK = 0
+CODIGO_FALHA = 2
+CODIGO_INTERROMPIDO = 3
+
+# Documento que cada etapa grava no ledger
+TIPO_DOC_DA_ETAPA = {
+    'bo': 'BO',
+    'cnh': 'CNH',
+    'contrato': 'CONTRATO',
+    'docVeiculo': 'CRLV',
+    'generatePDF': 'DOCUMENTO_GERADO',
+    'mergePDF': 'DOSSIE',
+}
+
+
+@dataclass
+class MetricasEtapa:
+    chave: str
+    nome: str
+    status: str = "nao_executada"
+    duracao_s: float = 0.0
+    tentativas: int = 0
+    documentos_planejados: Optional[int] = None
+    documentos_ok: int = 0
+    documentos_falha: int = 0
+    bytes: int = 0
+
+    @property
+    def repeticoes(self) -> int:
+        return max(self.tentativas - 1, 0)
+
+
+@dataclass
+class RelatorioExecucao:
+    modo: str
+    politica: dict = field(default_factory=dict)
+    rejeitadas: Dict[str, int] = field(default_factory=dict)
+    etapas: Dict[str, MetricasEtapa] = field(default_factory=dict)
+    inicio: str = field(default_factory=lambda: datetime.now().isoformat(timespec='seconds'))
+    interrompido: bool = False
+    _t0: float = field(default_factory=time.perf_counter, repr=False)
+    _fim: Optional[str] = field(default=None, repr=False)
+    _duracao_s: float = field(default=0.0, repr=False)
+
+    def medir(self, chave: str, nome: str, executar: Callable[[str], bool], repeticoes: int = 0) -> Callable[[str], bool]:
+        """Envolve executar(chave): mede o tempo e repete a etapa até `repeticoes` vezes quando falha."""
+        metricas = self.etapas.setdefault(chave, MetricasEtapa(chave, nome))
+
+        def executar_medido(etapa):
+            inicio = time.perf_counter()
+            ok = False
+            for tentativa in range(1, repeticoes + 2):
+                metricas.tentativas = tentativa
+                if tentativa > 1:
+                    print(f"🔁 Repetindo {nome} (tentativa {tentativa}/{repeticoes + 1})")
+                try:
+                    ok = bool(executar(etapa))
+                except Exception as e:
+                    print(f"ERRO: Exceção não tratada na etapa {nome}: {e}")
+                    ok = False
+                if ok:
+                    break
+            metricas.duracao_s = round(time.perf_counter() - inicio, 3)
+            metricas.status = "ok" if ok else "falha"
+            return ok
+
+        return executar_medido
+
+    def finalizar(self, resultados: Dict[str, Optional[bool]], plano=None) -> None:
+        """Marca a interrupção, completa as métricas com o plano e o ledger e fecha o relógio."""
+        self.interrompido = any(ok is None for ok in resultados.values()) and any(
+            ok is False for ok in resultados.values()
+        )
+        self._fim = datetime.now().isoformat(timespec='seconds')
+        self._duracao_s = round(time.perf_counter() - self._t0, 3)
+
+        documentos = _documentos_desde(self.inicio)
+        for chave, metricas in self.etapas.items():
+            tipo_doc = TIPO_DOC_DA_ETAPA.get(chave)
+            contagem = documentos.get(tipo_doc, {})
+            metricas.documentos_ok = contagem.get('ok', 0)
+            metricas.documentos_falha = contagem.get('falha', 0)
+            metricas.bytes = contagem.get('bytes', 0)
+            if metricas.status == "ok" and metricas.documentos_falha and not metricas.documentos_ok:
+                # terminou sem exceção, mas nenhum documento desta execução deu certo
+                print(f"⚠️  {metricas.nome}: todos os {metricas.documentos_falha} documentos falharam")
+                metricas.status = "falha"
+            if plano is not None:
+                itens = plano.itens(tipo_doc) if tipo_doc in plano.documentos else None
+                metricas.documentos_planejados = len(itens) if itens is not None else plano.linhas
+
+    def codigo_saida(self) -> int:
+        if self.interrompido:
+            return CODIGO_INTERROMPIDO
+        if any(m.status == "falha" for m in self.etapas.values()):
+            return CODIGO_FALHA
+        return CODIGO_OK
+
+    def to_dict(self) -> dict:
+        etapas = {}
+        for chave, metricas in self.etapas.items():
+            dados = asdict(metricas)
+            dados['repeticoes'] = metricas.repeticoes
+            etapas[chave] = dados
+        return {
+            "inicio": self.inicio,
+            "fim": self._fim,
+            "duracao_s": self._duracao_s,
+            "modo": self.modo,
+            "politica": self.politica,
+            "interrompido": self.interrompido,
+            "rejeitadas": self.rejeitadas,
+            "codigo_saida": self.codigo_saida(),
+            "etapas": etapas,
+            "totais": {
+                "etapas_ok": sum(1 for m in self.etapas.values() if m.status == "ok"),
+                "etapas_falha": sum(1 for m in self.etapas.values() if m.status == "falha"),
+                "repeticoes": sum(m.repeticoes for m in self.etapas.values()),
+                "documentos_ok": sum(m.documentos_ok for m in self.etapas.values()),
+                "documentos_falha": sum(m.documentos_falha for m in self.etapas.values()),
+                "bytes": sum(m.bytes for m in self.etapas.values()),
+            },
+        }
+
+    def salvar(self, caminho=None) -> Path:
+        """Grava o JSON em `caminho`, `relatorioPath` ou src/output/relatorios/execucao_<data_hora>.json."""
+        if caminho is None and os.getenv('relatorioPath'):
+            caminho = os.getenv('relatorioPath')
+        if caminho is None:
+            carimbo = self.inicio.replace('-', '').replace(':', '').replace('T', '_')
+            caminho = RELATORIOS_PADRAO / f"execucao_{carimbo}.json"
+        caminho = Path(caminho)
+        caminho.parent.mkdir(parents=True, exist_ok=True)
+        tmp = caminho.with_suffix('.tmp')
+        tmp.write_text(json.dumps(self.to_dict(), ensure_ascii=False, indent=2), encoding='utf-8')
+        tmp.replace(caminho)
+        return caminho
+
+
+def _documentos_desde(inicio) -> dict:
+    """{tipo_doc: {'ok', 'falha', 'bytes'}} registrados no ledger a partir de `inicio`; vazio sem ledger."""
+    from src.utils.ledger import get_ledger
+
+    try:
+        return get_ledger().desde(inicio)
+    except Exception as e:
+        print(f"⚠️  Ledger indisponível para o relatório: {e}")
+        return {}
@@ -0,0 +1,97 @@
+"""Execução das etapas do pipeline dentro de um único processo.
+
+Em vez de abrir um interpretador por script, cada etapa é importada e a sua
+função de entrada é chamada diretamente. Assim config, token (Auth), sessão
+HTTP e planilha são carregados uma vez e compartilhados por todas as etapas.
+"""
+from __future__ import annotations
+
+import importlib
+import traceback
+from dataclasses import dataclass
+from typing import Tuple
+
+
+@dataclass(frozen=True)
+class Etapa:
+    chave: str
+    nome: str
+    modulo: str
+    funcao: str
+    dependencias: Tuple[str, ...] = ()
+
+
+ETAPAS = {
+    etapa.chave: etapa
+    for etapa in (
+        Etapa('bo', 'Download do BO', 'src.main.geracao.coletas.bo_download', 'processar_boletins'),
+        Etapa('cnh', 'Coleta de CNH', 'src.main.geracao.coletas.driverLicense', 'processar_boletins'),
+        Etapa('contrato', 'Coleta de Contrato', 'src.main.geracao.coletas.rentalDocument', 'main'),
+        Etapa('docVeiculo', 'Coleta de Documento do Veículo', 'src.main.geracao.coletas.vehicleDocument', 'main'),
+        Etapa('generatePDF', 'Geração de PDF Final', 'src.main.geracao.gerador.generatePDF', 'main'),
+        Etapa('mergePDF', 'Merge de PDFs', 'src.main.geracao.gerador.mergePDF', 'merge_pdfs',
+              dependencias=('bo', 'cnh', 'contrato', 'docVeiculo', 'generatePDF')),
+    )
+}
+
+# Grafo do pipeline: os coletores e o gerador são independentes; apenas o merge depende de todos
+DEPENDENCIAS = {chave: etapa.dependencias for chave, etapa in ETAPAS.items()}
+
+
+def importar_etapas() -> None:
+    """Importa os módulos das etapas antes de executá-las em paralelo (efeitos de import rodam uma vez)."""
+    for etapa in ETAPAS.values():
+        try:
+            importlib.import_module(etapa.modulo)
+        except Exception as e:
+            # a falha volta a aparecer (e é reportada) quando a etapa for executada
+            print(f"⚠️  Falha ao importar {etapa.nome}: {e}")
+
+
+def preparar_contexto(carregar_planilha: bool = True) -> bool:
+    """Carrega uma única vez o estado compartilhado: config, token, sessão HTTP e planilha
+    (só as colunas que as etapas usam e, no modo --shard, só as linhas do shard). Com
+    carregar_planilha=False a planilha não é pré-carregada (o modo streaming a lê linha a linha).
+
+    Retorna False quando o token não pôde ser obtido (as etapas tentarão de novo por conta própria).
+    """
+    from src.main.pipeline.shards import preparar_shard
+    from src.settings.config import config  # noqa: F401 - carrega o .env uma vez
+    from src.settings.auth import get_auth
+    from src.settings.http import get_session
+    from src.utils.fileUtils import carregar_colunas
+    from src.utils.ocorrencia import COLUNAS_EXECUCAO
+
+    get_session()
+    if carregar_planilha:
+        try:
+            # as etapas recortam as suas colunas desta leitura, sem abrir a planilha de novo
+            df = carregar_colunas(COLUNAS_EXECUCAO)
+            print(f"📊 Planilha carregada uma vez para todas as etapas: {len(df)} linhas, {len(df.columns)} colunas")
+            preparar_shard(df)
+        except ValueError as e:
+            print(f"⚠️  Planilha não pré-carregada: {e}")
+
+    token = get_auth().get_token()
+    importar_etapas()
+    if not token:
+        print("⚠️  Token não obtido na preparação; as etapas tentarão novamente.")
+        return False
+    return True
+
+
+def executar_etapa(chave: str) -> bool:
+    """
+    Importa a etapa e chama sua função de entrada. Retorna True em caso de sucesso;
+    a etapa que aborta (sem token, sem planilha, nada para mesclar) retorna False e conta como falha.
+    """
+    etapa = ETAPAS[chave]
+    try:
+        modulo = importlib.import_module(etapa.modulo)
+        return getattr(modulo, etapa.funcao)() is not False
+    except SystemExit as e:
+        return e.code in (None, 0)
+    except Exception as e:
+        print(f"ERRO: Erro inesperado ao executar {etapa.nome}: {e}")
+        traceback.print_exc()
+        return False
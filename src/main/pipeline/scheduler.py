@@ -0,0 +1,84 @@
+"""Agendador de etapas por grafo de dependências.
+
+Cada etapa só começa quando todas as suas dependências terminaram; etapas
+independentes rodam ao mesmo tempo em threads (cada uma pode executar no
+próprio processo ou disparar um subprocess).
+"""
+from __future__ import annotations
+
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Callable, Dict, Optional, Sequence
+
+
+def ordem_topologica(dependencias: Dict[str, Sequence[str]]) -> list:
+    """Retorna as etapas em uma ordem que respeita as dependências (mantendo a ordem de declaração).
+
+    Lança ValueError para dependências desconhecidas ou ciclos.
+    """
+    for etapa, deps in dependencias.items():
+        desconhecidas = [d for d in deps if d not in dependencias]
+        if desconhecidas:
+            raise ValueError(f"Etapa '{etapa}' depende de etapas inexistentes: {desconhecidas}")
+
+    ordem = []
+    pendentes = list(dependencias)
+    while pendentes:
+        prontas = [e for e in pendentes if all(d in ordem for d in dependencias[e])]
+        if not prontas:
+            raise ValueError(f"Ciclo de dependências entre as etapas: {pendentes}")
+        ordem.extend(prontas)
+        pendentes = [e for e in pendentes if e not in prontas]
+    return ordem
+
+
+def executar_grafo(
+    dependencias: Dict[str, Sequence[str]],
+    executar: Callable[[str], bool],
+    max_paralelo: Optional[int] = None,
+    ao_falhar: Optional[Callable[[str], bool]] = None,
+) -> Dict[str, Optional[bool]]:
+    """Executa as etapas do grafo, iniciando em paralelo todas as que já estão liberadas.
+
+    - dependencias: {etapa: [etapas das quais depende]}
+    - executar: função chamada com o nome da etapa; retorna True em caso de sucesso
+    - max_paralelo: limite de etapas simultâneas (None = todas as liberadas)
+    - ao_falhar: chamada na thread principal quando uma etapa falha; retornando False,
+      nenhuma etapa nova é iniciada (as que já estão rodando terminam normalmente)
+
+    Retorna {etapa: True | False | None}, onde None indica etapa não executada.
+    """
+    ordem = ordem_topologica(dependencias)
+    resultados: Dict[str, Optional[bool]] = {etapa: None for etapa in ordem}
+    concluidas = set()
+    em_execucao = {}
+    interrompido = False
+    workers = max_paralelo or max(len(ordem), 1)
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        while True:
+            if not interrompido:
+                for etapa in ordem:
+                    if len(em_execucao) >= workers:
+                        break
+                    if etapa in concluidas or etapa in em_execucao.values():
+                        continue
+                    if all(d in concluidas for d in dependencias[etapa]):
+                        em_execucao[executor.submit(executar, etapa)] = etapa
+
+            if not em_execucao:
+                break
+
+            finalizadas, _ = wait(list(em_execucao), return_when=FIRST_COMPLETED)
+            for futuro in finalizadas:
+                etapa = em_execucao.pop(futuro)
+                try:
+                    ok = bool(futuro.result())
+                except Exception as e:
+                    print(f"ERRO: Exceção não tratada na etapa {etapa}: {e}")
+                    ok = False
+                resultados[etapa] = ok
+                concluidas.add(etapa)
+                if not ok and ao_falhar is not None and not ao_falhar(etapa):
+                    interrompido = True
+
+    return resultados
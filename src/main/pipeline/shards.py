@@ -0,0 +1,172 @@
+"""Divisão da planilha entre vários workers (--shard i/n) e reconciliação.
+
+Cada linha vai para o shard dado pelo hash estável (sha1) da sua chave
+PLACA_USERID, então N workers, no mesmo host ou em hosts diferentes, pegam
+fatias disjuntas da mesma planilha. Cada shard grava saídas, ledger e
+manifesto em src/output/shards/shard_<i>_de_<n>/. No fim, `--reconciliar`
+junta os PDFs de todos os shards nas pastas normais de src/output/gerador e
+roda o mergePDF sobre a planilha inteira.
+"""
+from __future__ import annotations
+
+import hashlib
+import os
+import re
+import shutil
+from pathlib import Path
+from typing import Optional, Tuple
+
+RAIZ_SHARDS = Path(__file__).resolve().parents[3] / "src" / "output" / "shards"
+
+# Pastas de documentos de cada shard que entram no merge
+PASTAS_DOCUMENTOS = ('bo', 'cnh', 'crlv', 'contract', 'document')
+
+_PADRAO_PASTA = re.compile(r"^shard_(\d+)_de_(\d+)$")
+
+
+def ler_shard(valor: str) -> Tuple[int, int]:
+    """'2/4' -> (2, 4); os shards vão de 1 a n. Lança ValueError para valores inválidos."""
+    try:
+        indice, total = (int(parte) for parte in str(valor).split('/'))
+    except ValueError:
+        raise ValueError(f"Shard inválido: {valor!r} (use i/n, por exemplo 1/4)")
+    if total < 1 or not 1 <= indice <= total:
+        raise ValueError(f"Shard inválido: {valor!r} (i deve estar entre 1 e n)")
+    return indice, total
+
+
+def shard_ativo() -> Optional[Tuple[int, int]]:
+    """(i, n) do shard desta execução (variável 'shard'), ou None fora do modo shard."""
+    valor = os.getenv('shard')
+    return ler_shard(valor) if valor else None
+
+
+def shard_da_chave(chave: str, total: int) -> int:
+    """Shard (1..total) de uma chave; igual em qualquer processo ou host."""
+    digest = hashlib.sha1(str(chave).encode('utf-8')).hexdigest()
+    return int(digest[:8], 16) % total + 1
+
+
+def raiz_shards() -> Path:
+    return Path(os.getenv('shardsPath') or RAIZ_SHARDS).resolve()
+
+
+def pasta_shard(indice: int, total: int) -> Path:
+    return raiz_shards() / f"shard_{indice}_de_{total}"
+
+
+def configurar_shard(indice: int, total: int) -> Path:
+    """
+    Aponta as pastas de saída, o ledger e o manifesto para a pasta do shard.
+    Deve rodar antes de carregar o .env e de importar as etapas (que leem essas variáveis no import).
+    """
+    raiz = pasta_shard(indice, total)
+    gerador = raiz / "gerador"
+    os.environ['shard'] = f"{indice}/{total}"
+    os.environ['geradorPath'] = str(gerador)
+    os.environ['boOutputPath'] = str(gerador / "bo")
+    os.environ['saida'] = str(gerador / "cnh")
+    os.environ['CONTRACT_PATH'] = str(gerador / "contract")
+    os.environ['CRLV_PATH'] = str(gerador / "crlv")
+    os.environ['ledgerPath'] = str(raiz / "ledger.sqlite3")
+    os.environ['manifestoPath'] = str(raiz / "manifesto.json")
+    os.environ['rejeitadasPath'] = str(raiz / "rejeitadas.csv")
+    return raiz
+
+
+def filtrar_shard(df, indice: int, total: int):
+    """Linhas da planilha que pertencem ao shard; linhas sem chave ficam no shard 1 (onde são reportadas)."""
+    from src.main.pipeline.incremental import chaves_das_linhas
+
+    mascara = [
+        (shard_da_chave(chave, total) if chave else 1) == indice
+        for chave in chaves_das_linhas(df)
+    ]
+    return df[mascara].reset_index(drop=True)
+
+
+def preparar_shard(df=None):
+    """No modo shard, instala só as linhas deste shard como a planilha da execução."""
+    from src.utils.fileUtils import carregar_colunas, instalar_planilha
+    from src.utils.ocorrencia import COLUNAS_EXECUCAO
+
+    shard = shard_ativo()
+    if shard is None:
+        return None
+    if df is None:
+        df = carregar_colunas(COLUNAS_EXECUCAO)
+    indice, total = shard
+    fatia = filtrar_shard(df, indice, total)
+    print(f"🧩 Shard {indice}/{total}: {len(fatia)} de {len(df)} linhas -> {pasta_shard(indice, total)}")
+    instalar_planilha(fatia)
+    return fatia
+
+
+def encontrar_shards() -> dict:
+    """{n: [i, ...]} das pastas shard_<i>_de_<n> encontradas na raiz dos shards."""
+    encontrados = {}
+    raiz = raiz_shards()
+    if not raiz.exists():
+        return encontrados
+    with os.scandir(raiz) as entradas:
+        for entrada in entradas:
+            casamento = _PADRAO_PASTA.match(entrada.name)
+            if entrada.is_dir() and casamento:
+                indice, total = int(casamento.group(1)), int(casamento.group(2))
+                encontrados.setdefault(total, []).append(indice)
+    return {total: sorted(indices) for total, indices in encontrados.items()}
+
+
+def unir_shards(total: int, destino) -> dict:
+    """
+    Copia os PDFs dos shards 1..total para as pastas de documentos em `destino` (limpas antes).
+    Retorna {pasta: quantidade de PDFs copiados}. Lança ValueError quando falta algum shard.
+    """
+    faltando = [i for i in range(1, total + 1) if not pasta_shard(i, total).is_dir()]
+    if faltando:
+        raise ValueError(f"Shards ausentes em {raiz_shards()}: {faltando} de {total}")
+
+    destino = Path(destino)
+    copiados = {}
+    for nome in PASTAS_DOCUMENTOS:
+        pasta_destino = destino / nome
+        if pasta_destino.exists():
+            shutil.rmtree(pasta_destino)
+        pasta_destino.mkdir(parents=True, exist_ok=True)
+        copiados[nome] = 0
+        for indice in range(1, total + 1):
+            origem = pasta_shard(indice, total) / "gerador" / nome
+            if not origem.is_dir():
+                continue
+            for pdf in origem.glob("*.pdf"):
+                alvo = pasta_destino / pdf.name
+                # o mesmo BO (placa_vehicleId) pode ter sido baixado por mais de um shard
+                if alvo.exists() and alvo.stat().st_size == pdf.stat().st_size:
+                    continue
+                shutil.copy2(pdf, alvo)
+                copiados[nome] += 1
+    return copiados
+
+
+def reconciliar(total: Optional[int] = None) -> bool:
+    """
+    Junta as saídas de todos os shards e roda o mergePDF sobre a planilha inteira.
+    Sem `total`, usa o único conjunto shard_*_de_<n> encontrado. Retorna False se não foi possível.
+    """
+    if total is None:
+        encontrados = encontrar_shards()
+        if len(encontrados) != 1:
+            print(f"❌ Informe o número de shards: conjuntos encontrados em {raiz_shards()}: {sorted(encontrados) or 'nenhum'}")
+            return False
+        total = next(iter(encontrados))
+
+    from src.main.geracao.gerador import mergePDF
+
+    try:
+        copiados = unir_shards(total, mergePDF.BASE_PATH)
+    except ValueError as e:
+        print(f"❌ {e}")
+        return False
+    print(f"🧩 Reconciliando {total} shards em {mergePDF.BASE_PATH}: {copiados}")
+    mergePDF.merge_pdfs()
+    return True
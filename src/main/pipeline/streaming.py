@@ -0,0 +1,270 @@
+"""Modo streaming: monta cada dossiê PLACA_USERID de ponta a ponta.
+
+No modo em lotes cada etapa percorre a planilha inteira antes da próxima
+começar, e o primeiro dossiê só aparece em 'done' no fim da execução. Aqui
+cada chave busca CNH, CRLV, contrato e BO, gera o documento e é mesclada
+assim que o seu conjunto obrigatório (get_documentos_obrigatorios) fica
+pronto. O número de dossiês em andamento ao mesmo tempo é limitado.
+"""
+from __future__ import annotations
+
+import itertools
+import os
+import threading
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Optional
+
+from src.utils.ledger import chave_documento, ja_concluido, manter_pastas, registrar_documento
+
+# Dossiês em andamento ao mesmo tempo quando nada é informado
+EM_VOO_PADRAO = 4
+
+# Um mesmo BO (veículo, tipo) não pode ser baixado por duas threads ao mesmo tempo (arquivo temporário comum)
+_bo_locks: Dict[tuple, threading.Lock] = {}
+_bo_locks_guard = threading.Lock()
+
+
+def _lock_do_bo(vehicle_id, bo_type) -> threading.Lock:
+    with _bo_locks_guard:
+        return _bo_locks.setdefault((str(vehicle_id), str(bo_type)), threading.Lock())
+
+
+def _com_retentativas(descricao, funcao, *args, **kwargs):
+    """Chama funcao até ela não retornar False (maxRetries tentativas, backoff entre elas)."""
+    from src.settings.config import config
+
+    tentativas = max(int(config.maxRetries), 1)
+    resultado = False
+    for tentativa in range(1, tentativas + 1):
+        resultado = funcao(*args, **kwargs)
+        if resultado is not False or tentativa == tentativas:
+            break
+        print(f"  🔁 {descricao}: tentativa {tentativa + 1}/{tentativas}")
+        time.sleep(config.backoff)
+    if resultado == "TOKEN_EXPIRED":
+        print(f"  🔐 {descricao}: token recusado mesmo depois de renovado")
+    return resultado
+
+
+def _se_existir(caminho) -> Optional[Path]:
+    from src.main.geracao.gerador.mergePDF import is_valid_pdf
+
+    caminho = Path(caminho)
+    return caminho if is_valid_pdf(caminho) else None
+
+
+def _documento(chave, tipo_doc, caminho, buscar) -> Optional[Path]:
+    """Reaproveita o documento já concluído (retomada) ou o busca e registra no ledger."""
+    if not ja_concluido(chave, tipo_doc):
+        buscar()
+        registrar_documento(chave, tipo_doc, caminho)
+    return _se_existir(caminho)
+
+
+def chaves_unicas(linhas, rejeitadas: Optional[list] = None):
+    """
+    Gera (chave PLACA_USERID, Ocorrencia) a partir de pares (índice, linha), na ordem da planilha:
+    só a primeira linha de cada chave e, no modo --shard, só as chaves do shard.
+    Cada linha é normalizada uma vez aqui; as etapas do dossiê usam a Ocorrencia.
+    Linhas reprovadas na validação prévia (validacao.motivo_rejeicao) não geram dossiê e,
+    com `rejeitadas`, são acrescentadas a essa lista com o motivo.
+    """
+    from src.main.pipeline.shards import shard_ativo, shard_da_chave
+    from src.main.pipeline.validacao import regras_por_tipo, motivo_rejeicao, validacao_ativa
+    from src.utils.ocorrencia import ocorrencia_da_linha
+
+    shard = shard_ativo()
+    regras = regras_por_tipo() if validacao_ativa() else None
+    vistas = set()
+    for idx, row in linhas:
+        ocorrencia = ocorrencia_da_linha(row, idx)
+        chave = ocorrencia.chave
+        # linhas sem chave ficam no shard 1, como em shards.filtrar_shard
+        if shard and (shard_da_chave(chave, shard[1]) if chave else 1) != shard[0]:
+            continue
+        motivo = motivo_rejeicao(ocorrencia, regras=regras) if regras else None
+        if motivo:
+            print(f"🧹 Linha {idx} rejeitada: {motivo}")
+            if rejeitadas is not None:
+                rejeitadas.append({'motivo': motivo, **row.to_dict()})
+            continue
+        if not chave:
+            print(f"⏭️  Linha {idx} ignorada: {ocorrencia.fonte}")
+            continue
+        if chave in vistas:
+            print(f"🔁 Linha {idx} duplicada para {chave}, ignorada")
+            continue
+        vistas.add(chave)
+        yield chave, ocorrencia
+
+
+def linhas_por_chave(df):
+    """Agrupa a planilha por chave PLACA_USERID (primeira linha de cada chave), na ordem da planilha."""
+    return dict(chaves_unicas(df.iterrows()))
+
+
+def preparar_pastas() -> None:
+    """Limpa as pastas de saída de todas as etapas, como no modo em lotes (na retomada e no modo incremental apenas as cria)."""
+    from src.main.geracao.coletas import bo_download, driverLicense, rentalDocument, vehicleDocument
+    from src.main.geracao.gerador import generatePDF, mergePDF
+
+    if manter_pastas():
+        for pasta in (bo_download.OUTPUT_DIR, driverLicense.OUTPUT_DIR, rentalDocument.contract_path,
+                      vehicleDocument.CRLV_PATH, generatePDF.saidaPath, mergePDF.DONE_PATH):
+            os.makedirs(pasta, exist_ok=True)
+        return
+
+    bo_download.limpar_pasta()
+    driverLicense.limpar_pasta()
+    rentalDocument.limpar_pasta_contract()
+    vehicleDocument.limpar_pasta_crlv(vehicleDocument.CRLV_PATH)
+    generatePDF.limpar_pasta_document()
+    mergePDF.limpar_pasta_done()
+
+
+def processar_dossie(chave, ocorrencia, session, data_hora) -> bool:
+    """
+    Busca os documentos de uma chave, gera o documento e mescla o dossiê.
+    Retorna True quando o dossiê completo foi mesclado; incompletos são copiados para INCOMPLETOS_<data_hora>.
+    """
+    from src.main.geracao.coletas import bo_download, driverLicense, rentalDocument, vehicleDocument
+    from src.main.geracao.gerador import generatePDF, mergePDF
+    from src.main.pipeline.planner import bo_da_ocorrencia
+
+    tipo = ocorrencia.tipo
+    if tipo is None:
+        print(f"⚠️  Tipo de documento não encontrado para: {chave}")
+        return False
+
+    placa, user_id = ocorrencia.placa, ocorrencia.user_id
+    vehicle_id, rental_id = ocorrencia.vehicle_id, ocorrencia.rental_id
+    obrigatorios = mergePDF.get_documentos_obrigatorios(tipo)
+
+    print(f"🚚 [{chave}] Iniciando dossiê - Tipo {tipo}: {obrigatorios}")
+    documentos = {}
+
+    chave_usuario = ocorrencia.chave_usuario
+
+    if "CNH" in obrigatorios and user_id:
+        documentos["CNH"] = _documento(
+            chave_usuario, 'CNH', Path(driverLicense.OUTPUT_DIR) / f"{chave_usuario}.pdf",
+            lambda: _com_retentativas(f"[{chave}] CNH", driverLicense.process_driver_license, user_id, placa),
+        )
+
+    if "CRLV" in obrigatorios and vehicle_id:
+        chave_crlv = chave_usuario if user_id else chave_documento(placa)
+        documentos["CRLV"] = _documento(
+            chave_crlv, 'CRLV', Path(vehicleDocument.CRLV_PATH) / f"{chave_crlv}.pdf",
+            lambda: _com_retentativas(f"[{chave}] CRLV", vehicleDocument.processVehicle, vehicle_id, placa, user_id,
+                                      session=session, crlv_path=vehicleDocument.CRLV_PATH),
+        )
+
+    if "CONTRATO" in obrigatorios and user_id and rental_id:
+        documentos["CONTRATO"] = _documento(
+            chave_usuario, 'CONTRATO', Path(rentalDocument.contract_path) / f"{chave_usuario}.pdf",
+            lambda: _com_retentativas(f"[{chave}] Contrato", rentalDocument.processRental, user_id, rental_id, placa,
+                                      session=session),
+        )
+
+    bo_type = bo_da_ocorrencia(tipo)
+    if bo_type and vehicle_id:
+        def buscar_bo():
+            with _lock_do_bo(vehicle_id, bo_type):
+                _com_retentativas(f"[{chave}] BO", bo_download.process_bo, vehicle_id, bo_type, placa)
+
+        documentos["BO"] = _documento(
+            chave_documento(placa, vehicle_id), 'BO', bo_download.caminho_bo(placa, vehicle_id, bo_type), buscar_bo,
+        )
+
+    def gerar_documento():
+        try:
+            generatePDF.gerar_documento_linha(ocorrencia)
+        except Exception as e:
+            print(f"❌ [{chave}] Erro ao gerar documento: {e}")
+
+    documentos["DOCUMENTO_GERADO"] = _documento(
+        chave_usuario, 'DOCUMENTO_GERADO', Path(generatePDF.saidaPath) / f"{chave_usuario}.pdf", gerar_documento,
+    )
+
+    documentos = {doc: caminho for doc, caminho in documentos.items() if caminho}
+    faltantes = [doc for doc in obrigatorios if doc not in documentos]
+
+    if faltantes:
+        print(f"⚠️  [{chave}] Conjunto incompleto. Faltando: {faltantes}")
+        if documentos:
+            mergePDF.copiar_incompleto(chave, documentos, mergePDF.DONE_PATH / f"INCOMPLETOS_{data_hora}")
+        return False
+
+    if ja_concluido(chave, 'DOSSIE'):
+        return True
+
+    pasta_tipo = mergePDF.DONE_PATH / f"{tipo}_{data_hora}"
+    pasta_tipo.mkdir(parents=True, exist_ok=True)
+    ordem = mergePDF.get_ordem_documentos(documentos, tipo)
+    caminho = mergePDF.mesclar_dossie(chave, tipo, ordem, pasta_tipo, data_hora)
+    registrar_documento(chave, 'DOSSIE', caminho)
+    print(f"✅ [{chave}] Dossiê pronto: {caminho}")
+    return True
+
+
+def executar_streaming(max_em_voo: Optional[int] = None, df=None) -> Dict[str, bool]:
+    """
+    Processa a planilha dossiê a dossiê, com no máximo max_em_voo chaves em andamento.
+    Sem df as linhas são lidas aos poucos (iterar_linhas): o primeiro dossiê começa enquanto
+    o resto da planilha ainda está sendo lido.
+    Retorna {chave: True (mesclado) | False (incompleto/erro)}; ValueError quando a planilha não abre.
+    """
+    from src.settings.auth import get_auth
+    from src.main.pipeline.validacao import resumo_rejeitadas, salvar_rejeitadas, validacao_ativa
+    from src.settings.http import get_session
+    from src.utils.fileUtils import iterar_linhas
+
+    max_em_voo = max(int(max_em_voo or os.getenv('streamingEmVoo') or EM_VOO_PADRAO), 1)
+
+    if not get_auth().get_token():
+        print("Falha ao obter token. Abortando...")
+        return {}
+
+    rejeitadas = []
+    fonte = df.iterrows() if df is not None else iterar_linhas()
+    # abre a planilha (primeira linha) antes de limpar as pastas: entrada inválida dá ValueError sem apagar nada
+    primeira = next(fonte, None)
+    linhas = chaves_unicas(itertools.chain([primeira] if primeira is not None else [], fonte), rejeitadas)
+    print(f"🚀 Modo streaming: até {max_em_voo} dossiês em andamento")
+
+    preparar_pastas()
+    session = get_session()
+    data_hora = datetime.now().strftime("%Y%m%d_%H%M%S")
+
+    resultados: Dict[str, bool] = {}
+    vagas = threading.BoundedSemaphore(max_em_voo)
+
+    def tarefa(chave, ocorrencia):
+        try:
+            resultados[chave] = bool(processar_dossie(chave, ocorrencia, session, data_hora))
+        except Exception as e:
+            print(f"❌ [{chave}] Erro inesperado: {e}")
+            traceback.print_exc()
+            resultados[chave] = False
+        finally:
+            vagas.release()
+
+    with ThreadPoolExecutor(max_workers=max_em_voo) as executor:
+        for chave, ocorrencia in linhas:
+            # só lê a próxima chave quando há vaga: no máximo max_em_voo dossiês em memória/andamento
+            vagas.acquire()
+            executor.submit(tarefa, chave, ocorrencia)
+
+    if validacao_ativa():
+        caminho = salvar_rejeitadas(rejeitadas)
+        if caminho:
+            print(f"🧹 {len(rejeitadas)} linhas rejeitadas na validação: {resumo_rejeitadas(r['motivo'] for r in rejeitadas)}")
+            print(f"   Relatório: {caminho}")
+
+    completos = sum(1 for ok in resultados.values() if ok)
+    print(f"\n🎉 Streaming concluído: {completos} dossiês mesclados, {len(resultados) - completos} incompletos")
+    return resultados
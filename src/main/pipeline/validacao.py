@@ -0,0 +1,177 @@
+"""Validação prévia da planilha, antes de qualquer chamada de rede.
+
+Linhas que nunca vão dar certo (sem placa, tipo de ocorrência desconhecido,
+sem o id que os documentos obrigatórios do tipo exigem, coordenadas
+malformadas) só apareceriam dentro dos coletores, gastando maxRetries
+tentativas e o backoff de cada uma. Aqui elas são classificadas coluna a
+coluna, gravadas num relatório de rejeitadas (CSV) e retiradas da planilha
+da execução, então o plano e as etapas nem chegam a vê-las.
+"""
+from __future__ import annotations
+
+import os
+import re
+from collections import Counter
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from src.utils.ocorrencia import VAZIOS, normalizar_ids, normalizar_placas, normalizar_tipos
+
+REJEITADAS_PADRAO = Path(__file__).resolve().parents[3] / "src" / "output" / "rejeitadas.csv"
+
+# Colunas com 'lat, lon' que o documento gerado converte em endereço (Geoapify)
+COLUNAS_COORDENADAS = ('dataOccurenceAddress', 'dataTrackingGeolocation')
+
+# Só números, sinais e separadores: o valor pretende ser uma coordenada (texto livre é endereço)
+_PARECE_COORDENADA = re.compile(r'[\d\s.,;+\-]*\d[\d\s.,;+\-]*')
+_COORDENADA = re.compile(r'\s*([+-]?\d+(?:\.\d+)?)\s*,\s*([+-]?\d+(?:\.\d+)?)\s*')
+
+
+def validacao_ativa() -> bool:
+    """Validação prévia ligada (padrão); desligue com validarPlanilha=0."""
+    return os.getenv('validarPlanilha', '1').strip().lower() not in ('0', 'false', 'nao', 'não', 'n', 'no')
+
+
+def regras_por_tipo() -> Tuple[set, set, set]:
+    """(tipos conhecidos, tipos que exigem userId, tipos que exigem rentalId), pelas regras do merge."""
+    from src.main.geracao.gerador.mergePDF import TIPO_DOCUMENTO_MAP, get_documentos_obrigatorios
+
+    conhecidos = set(TIPO_DOCUMENTO_MAP)
+    obrigatorios = {tipo: get_documentos_obrigatorios(tipo) for tipo in conhecidos}
+    com_usuario = {t for t, docs in obrigatorios.items() if 'CNH' in docs or 'CONTRATO' in docs}
+    com_locacao = {t for t, docs in obrigatorios.items() if 'CONTRATO' in docs}
+    return conhecidos, com_usuario, com_locacao
+
+
+def coordenada_invalida(valor) -> bool:
+    """True para um valor numérico que não forma 'lat, lon' dentro dos limites; vazio e endereço em texto passam."""
+    if valor is None or (isinstance(valor, float) and np.isnan(valor)):
+        return False
+    texto = str(valor).strip()
+    if texto in VAZIOS or not _PARECE_COORDENADA.fullmatch(texto):
+        return False
+    casamento = _COORDENADA.fullmatch(texto)
+    if not casamento:
+        return True
+    lat, lon = float(casamento.group(1)), float(casamento.group(2))
+    return not (abs(lat) <= 90 and abs(lon) <= 180)
+
+
+def coordenadas_invalidas(serie) -> pd.Series:
+    """coordenada_invalida aplicada à coluna inteira de uma vez."""
+    texto = serie.astype('string').str.strip().fillna('')
+    parece = ~texto.isin(VAZIOS) & texto.str.fullmatch(_PARECE_COORDENADA.pattern).fillna(False)
+    partes = texto.str.extract(f"^{_COORDENADA.pattern}$")
+    lat = pd.to_numeric(partes[0], errors='coerce')
+    lon = pd.to_numeric(partes[1], errors='coerce')
+    valida = ((lat.abs() <= 90) & (lon.abs() <= 180)).fillna(False)
+    return (parece & ~valida).fillna(False).astype(bool)
+
+
+def motivo_rejeicao(ocorrencia, row=None, regras=None) -> Optional[str]:
+    """Motivo para rejeitar uma linha já normalizada (modo streaming), ou None quando ela é válida."""
+    conhecidos, com_usuario, com_locacao = regras or regras_por_tipo()
+    if not ocorrencia.placa:
+        return 'sem placa'
+    if ocorrencia.tipo not in conhecidos:
+        return 'tipo de ocorrência desconhecido'
+    if not ocorrencia.vehicle_id:
+        return 'sem vehicleId'
+    if ocorrencia.tipo in com_usuario and not ocorrencia.user_id:
+        return 'sem userId'
+    if ocorrencia.tipo in com_locacao and not ocorrencia.rental_id:
+        return 'sem rentalId'
+    row = ocorrencia.linha if row is None else row
+    if row is not None:
+        for coluna in COLUNAS_COORDENADAS:
+            if coordenada_invalida(row.get(coluna)):
+                return f'coordenadas inválidas em {coluna}'
+    return None
+
+
+def _coluna(df, nome) -> pd.Series:
+    return df[nome] if nome in df.columns else pd.Series([None] * len(df), index=df.index, dtype=object)
+
+
+def motivos_rejeicao(df) -> List[Optional[str]]:
+    """Motivo de rejeição de cada linha (None para as válidas), calculado por coluna sobre a planilha inteira."""
+    conhecidos, com_usuario, com_locacao = regras_por_tipo()
+    tipos = pd.Series(normalizar_tipos(_coluna(df, 'dataOccurrenceType')), index=df.index, dtype=object)
+
+    # a primeira regra que falha dá o motivo, como em motivo_rejeicao
+    condicoes = [
+        (normalizar_placas(_coluna(df, 'dataVehiclePlate')) == '', 'sem placa'),
+        (~tipos.isin(conhecidos), 'tipo de ocorrência desconhecido'),
+        (normalizar_ids(_coluna(df, 'dataVehicleId')) == '', 'sem vehicleId'),
+        (tipos.isin(com_usuario) & (normalizar_ids(_coluna(df, 'dataUserId')) == ''), 'sem userId'),
+        (tipos.isin(com_locacao) & (normalizar_ids(_coluna(df, 'dataUserRentalId')) == ''), 'sem rentalId'),
+    ]
+    condicoes += [
+        (coordenadas_invalidas(df[coluna]), f'coordenadas inválidas em {coluna}')
+        for coluna in COLUNAS_COORDENADAS if coluna in df.columns
+    ]
+    motivos = np.select([c.to_numpy(dtype=bool) for c, _ in condicoes], [m for _, m in condicoes], default='')
+    return [m or None for m in motivos.tolist()]
+
+
+def validar(df) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """(linhas válidas, linhas rejeitadas com a coluna 'motivo' na frente)."""
+    motivos = pd.Series(motivos_rejeicao(df), index=df.index, dtype=object)
+    rejeitar = motivos.notna().to_numpy()
+    rejeitadas = df[rejeitar].copy()
+    rejeitadas.insert(0, 'motivo', motivos[rejeitar])
+    return df[~rejeitar].reset_index(drop=True), rejeitadas
+
+
+def caminho_rejeitadas() -> Path:
+    return Path(os.getenv('rejeitadasPath') or REJEITADAS_PADRAO)
+
+
+def salvar_rejeitadas(rejeitadas, caminho=None) -> Optional[Path]:
+    """
+    Grava o relatório (CSV) das linhas rejeitadas; sem rejeitadas, remove o relatório de uma execução anterior.
+    `rejeitadas` é um DataFrame ou uma lista de dicts com 'motivo'. Retorna o caminho gravado, ou None.
+    """
+    caminho = Path(caminho or caminho_rejeitadas())
+    if not isinstance(rejeitadas, pd.DataFrame):
+        rejeitadas = pd.DataFrame(list(rejeitadas))
+    if rejeitadas.empty:
+        caminho.unlink(missing_ok=True)
+        return None
+    caminho.parent.mkdir(parents=True, exist_ok=True)
+    tmp = caminho.with_suffix('.tmp')
+    # utf-8-sig: o Excel abre o CSV com os acentos certos
+    rejeitadas.to_csv(tmp, index=False, encoding='utf-8-sig')
+    tmp.replace(caminho)
+    return caminho
+
+
+def resumo_rejeitadas(motivos) -> Dict[str, int]:
+    return dict(Counter(motivos).most_common())
+
+
+def preparar_validacao(df=None) -> Dict[str, int]:
+    """
+    Valida a planilha da execução (ou df), grava o relatório de rejeitadas e instala só as linhas
+    válidas como a planilha desta execução. Retorna {motivo: quantidade de linhas rejeitadas}.
+    """
+    from src.utils.fileUtils import carregar_colunas, instalar_planilha
+    from src.utils.ocorrencia import COLUNAS_EXECUCAO
+
+    if not validacao_ativa():
+        return {}
+    if df is None:
+        df = carregar_colunas(COLUNAS_EXECUCAO)
+    validas, rejeitadas = validar(df)
+    contagem = resumo_rejeitadas(rejeitadas['motivo'])
+    caminho = salvar_rejeitadas(rejeitadas)
+    if contagem:
+        print(f"🧹 Validação: {len(rejeitadas)} de {len(df)} linhas rejeitadas antes da coleta: {contagem}")
+        print(f"   Relatório: {caminho}")
+        instalar_planilha(validas)
+    else:
+        print(f"🧹 Validação: {len(df)} linhas válidas")
+    return contagem
@@ -0,0 +1,129 @@
+"""Modo contínuo (--vigiar): processa as planilhas que chegam numa pasta.
+
+A pasta é varrida a cada intervalo; uma planilha (.xlsx, .csv, .jsonl, .parquet) só é
+processado quando o tamanho e a data de modificação ficam iguais entre duas
+varreduras (exportação terminada). Cada arquivo roda como uma execução
+incremental no mesmo processo, aproveitando o estado já aquecido: módulos
+importados, token, sessão HTTP com conexões abertas e caches. Depois ele vai
+para processados/ (ou falhas/) dentro da própria pasta.
+"""
+from __future__ import annotations
+
+import os
+import shutil
+import signal
+import threading
+import time
+import traceback
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, Optional, Tuple
+
+INTERVALO_PADRAO = 5.0
+
+
+def arquivos_prontos(pasta, vistos: Dict[str, Tuple[int, int]]) -> list:
+    """
+    Arquivos de entrada cujo tamanho e mtime não mudaram desde a varredura anterior.
+    `vistos` guarda a assinatura de cada arquivo entre as chamadas.
+    """
+    from src.utils.fileUtils import extensoes_entrada
+
+    extensoes = extensoes_entrada()
+    prontos = []
+    atuais = {}
+    with os.scandir(pasta) as entradas:
+        for entrada in entradas:
+            # ~$arquivo.xlsx é o lock do Excel; ocultos costumam ser temporários de cópia
+            if not entrada.is_file() or entrada.name.startswith(('~$', '.')):
+                continue
+            if os.path.splitext(entrada.name)[1].lower() not in extensoes:
+                continue
+            stat = entrada.stat()
+            assinatura = (stat.st_size, stat.st_mtime_ns)
+            atuais[entrada.path] = assinatura
+            if stat.st_size > 0 and vistos.get(entrada.path) == assinatura:
+                prontos.append((stat.st_mtime_ns, entrada.path))
+    vistos.clear()
+    vistos.update(atuais)
+    return [caminho for _, caminho in sorted(prontos)]
+
+
+def _arquivar(caminho, pasta_destino) -> Path:
+    pasta_destino = Path(pasta_destino)
+    pasta_destino.mkdir(parents=True, exist_ok=True)
+    destino = pasta_destino / f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{Path(caminho).name}"
+    shutil.move(str(caminho), str(destino))
+    return destino
+
+
+def processar_arquivo(caminho, executar: Callable[[], int]) -> int:
+    """Roda uma execução sobre `caminho` e o arquiva. Retorna o código de saída da execução."""
+    from src.utils.fileUtils import esquecer_planilha, instalar_planilha
+
+    print(f"\n📥 Nova planilha: {caminho}")
+    os.environ['excel'] = str(caminho)
+    # a execução anterior pode ter deixado instalado o seu subconjunto de linhas (modo incremental)
+    instalar_planilha(None)
+    inicio = time.perf_counter()
+    try:
+        codigo = executar()
+    except Exception as e:
+        print(f"❌ Erro inesperado ao processar {caminho}: {e}")
+        traceback.print_exc()
+        codigo = 1
+    finally:
+        instalar_planilha(None)
+        esquecer_planilha(caminho)
+
+    pasta = Path(caminho).parent
+    try:
+        destino = _arquivar(caminho, pasta / ("processados" if codigo == 0 else "falhas"))
+        print(f"📦 {Path(caminho).name} -> {destino} ({time.perf_counter() - inicio:.1f}s, código {codigo})")
+    except OSError as e:
+        print(f"⚠️  Não foi possível arquivar {caminho}: {e}")
+    return codigo
+
+
+def vigiar(pasta, executar: Callable[[], int], intervalo: Optional[float] = None,
+           parar: Optional[threading.Event] = None) -> int:
+    """
+    Vigia `pasta` até Ctrl+C, SIGTERM (ou até `parar` ser sinalizado), chamando executar() para
+    cada planilha nova. Um arquivo em andamento termina antes de encerrar. Retorna 0 ao encerrar.
+    """
+    from src.utils.fileUtils import extensoes_entrada
+
+    if intervalo is None:
+        intervalo = float(os.getenv('vigiarIntervalo') or INTERVALO_PADRAO)
+    pasta = Path(pasta)
+    pasta.mkdir(parents=True, exist_ok=True)
+    parar = parar or threading.Event()
+    vistos: Dict[str, Tuple[int, int]] = {}
+    # arquivos que não puderam ser movidos não são processados de novo enquanto não mudarem
+    tratados = set()
+
+    sigterm_anterior = None
+    if threading.current_thread() is threading.main_thread():
+        # serviço (systemd, docker stop): termina o arquivo atual e sai
+        sigterm_anterior = signal.signal(signal.SIGTERM, lambda *_: parar.set())
+
+    print(f"👀 Vigiando {pasta} ({', '.join(extensoes_entrada())}) a cada {intervalo:g}s. Ctrl+C para encerrar.")
+    try:
+        while not parar.is_set():
+            for caminho in arquivos_prontos(pasta, vistos):
+                if (caminho, vistos.get(caminho)) in tratados:
+                    continue
+                assinatura = vistos.get(caminho)
+                processar_arquivo(caminho, executar)
+                if os.path.exists(caminho):
+                    tratados.add((caminho, assinatura))
+                if parar.is_set():
+                    break
+            parar.wait(intervalo)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if sigterm_anterior is not None:
+            signal.signal(signal.SIGTERM, sigterm_anterior)
+    print("\n👋 Modo contínuo encerrado.")
+    return 0
@@ -1,45 +1,145 @@
+import hashlib
+import json
+import os
+import threading
 import time
+from contextlib import contextmanager
+from pathlib import Path
 from typing import Optional
 import requests
 
 from .config import config
-from .http import create_session, request_with_timeout
+from .http import get_session, request_with_timeout
+
+# Token em disco, compartilhado por todos os processos do host (subprocessos, shards, workers); tokenCache=0 desliga
+CACHE_TOKEN_PADRAO = Path(__file__).resolve().parents[2] / "src" / "output" / "cache" / "token"
+
+
+# Segundos antes do vencimento em que a thread de renovação busca o próximo token (tokenRenovarAntes)
+MARGEM_RENOVACAO_PADRAO = 60.0
+# Sem validade conhecida a thread só confere de tempos em tempos; entre tentativas que falharam, espera um pouco
+ESPERA_SEM_VALIDADE = 60.0
+ESPERA_MINIMA = 5.0
+
+# Quanto um processo espera pelo lock do cache em disco (o dono pode estar no meio do login) e o intervalo
+# entre as tentativas; passado o prazo, faz o login sem o cache
+ESPERA_LOCK = 120.0
+INTERVALO_LOCK = 0.1
+
+_DESLIGADO = ('0', 'false', 'nao', 'não', 'n', 'no')
+
+
+def _cache_ativo() -> bool:
+    return os.getenv('tokenCache', '1').strip().lower() not in _DESLIGADO
+
+
+def _renovacao_ativa() -> bool:
+    return os.getenv('tokenRenovacao', '1').strip().lower() not in _DESLIGADO
+
+
+def _tentar_travar(arquivo) -> bool:
+    """Uma tentativa, sem bloquear, de pegar o lock exclusivo de `arquivo`."""
+    try:
+        if os.name == 'nt':
+            import msvcrt
+
+            arquivo.seek(0)
+            msvcrt.locking(arquivo.fileno(), msvcrt.LK_NBLCK, 1)
+        else:
+            import fcntl
+
+            fcntl.flock(arquivo.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        return False
+    return True
+
+
+def _destravar(arquivo) -> None:
+    if os.name == 'nt':
+        import msvcrt
+
+        arquivo.seek(0)
+        msvcrt.locking(arquivo.fileno(), msvcrt.LK_UNLCK, 1)
+    else:
+        import fcntl
+
+        fcntl.flock(arquivo.fileno(), fcntl.LOCK_UN)
+
+
+@contextmanager
+def _travado(caminho: Path, espera: Optional[float] = None):
+    """
+    Lock exclusivo entre processos no arquivo `caminho` (fcntl no Linux/macOS, msvcrt no Windows).
+    Tenta a cada INTERVALO_LOCK; TimeoutError se não conseguir em `espera` segundos (padrão: ESPERA_LOCK).
+    """
+    espera = ESPERA_LOCK if espera is None else espera
+    caminho.parent.mkdir(parents=True, exist_ok=True)
+    with open(caminho, 'a+b') as arquivo:
+        prazo = time.monotonic() + espera
+        while not _tentar_travar(arquivo):
+            if time.monotonic() >= prazo:
+                raise TimeoutError(f"lock {caminho} ocupado há mais de {espera:.0f}s")
+            time.sleep(INTERVALO_LOCK)
+        try:
+            yield
+        finally:
+            _destravar(arquivo)
 
 
 class Auth:
-    """Autenticador que gerencia token com cache e renovação automática."""
+    """
+    Autenticador que gerencia token com cache e renovação automática.
+    O token e a sua validade também ficam num arquivo por conta (tokenCachePath), protegido por lock:
+    os outros processos do host reaproveitam o mesmo token e só um deles faz o login quando ele vence.
+    Com iniciar_renovacao, uma thread renova o token antes de vencer (refresh_token do SSO quando houver),
+    então quem chama get_token não espera pelo login.
+    """
 
     def __init__(self):
         self._token: Optional[str] = None
         self._expiry: Optional[float] = None
-        self.session = create_session(retries=2, backoff_factor=0.2)
+        self._obtido_em: Optional[float] = None
+        self._refresh: Optional[str] = None
+        self._refresh_expiry: Optional[float] = None
+        self._lock = threading.Lock()
+        self._renovador: Optional[threading.Thread] = None
+        self._parar = threading.Event()
+        self.session = get_session()
 
     def refresh_token(self) -> bool:
-        """Obtém novo token de autenticação e atualiza expiry se disponível."""
-        auth_url = config.auth_url
+        """Obtém novo token: pelo refresh_token do SSO enquanto ele vale, senão com usuário e senha."""
+        if self._refresh and not (self._refresh_expiry and time.time() > self._refresh_expiry):
+            if self._pedir_token({'client_id': config.client_id, 'grant_type': 'refresh_token',
+                                  'refresh_token': self._refresh}):
+                return True
+            print("[AUTH] ⚠️ refresh_token recusado, fazendo login com usuário e senha")
+            self._refresh, self._refresh_expiry = None, None
+
         email = config.email
         password = config.password
-        client_id = config.client_id
-        grant_type = config.grant_type
 
         if not email or not password:
             print("[AUTH] ❌ email ou password não definidos no config")
             return False
 
+        return self._pedir_token({
+            'client_id': config.client_id,
+            'grant_type': config.grant_type,
+            'username': email,
+            'password': password
+        })
+
+    def _pedir_token(self, data: dict) -> bool:
+        """POST no SSO com o grant de `data`; adota o token, a validade e o refresh_token da resposta."""
         headers = {
             "Accept": "*/*",
             "Content-Type": "application/x-www-form-urlencoded"
         }
-        data = {
-            'client_id': client_id,
-            'grant_type': grant_type,
-            'username': email,
-            'password': password
-        }
 
         try:
-            print("[AUTH] 🔐 Obtendo token...")
-            resp = request_with_timeout(self.session, 'POST', auth_url, data=data, headers=headers, timeout=10)
+            print("[AUTH] 🔐 Obtendo token..." if data['grant_type'] != 'refresh_token'
+                  else "[AUTH] 🔐 Renovando token com refresh_token...")
+            resp = request_with_timeout(self.session, 'POST', config.auth_url, data=data, headers=headers, timeout=10)
             resp.raise_for_status()
             json_resp = resp.json()
             token = json_resp.get('access_token')
@@ -47,12 +147,15 @@ class Auth:
                 print(f"[AUTH] ❌ Token não encontrado na resposta: {json_resp}")
                 return False
 
-            self._token = token
+            agora = time.time()
             expires_in = json_resp.get('expires_in')
-            if expires_in:
-                self._expiry = time.time() + int(expires_in) - 30  # renova 30s antes
-            else:
-                self._expiry = None
+            refresh_expires_in = json_resp.get('refresh_expires_in')
+            # refresh_expires_in 0 (offline token) = sem validade
+            self._refresh = json_resp.get('refresh_token') or None
+            self._refresh_expiry = agora + int(refresh_expires_in) - 30 if self._refresh and refresh_expires_in else None
+            self._expiry = agora + int(expires_in) - 30 if expires_in else None  # renova 30s antes
+            self._obtido_em = agora
+            self._token = token
 
             print(f"[AUTH] ✅ Token obtido (primeiros 20 chars): {self._token[:20]}...")
             return True
@@ -67,15 +170,157 @@ class Auth:
             print(f"[AUTH] ❌ Erro ao obter token: {e}")
             return False
 
+    def _valido(self, margem: float = 0) -> bool:
+        return self._token is not None and not (self._expiry and time.time() > self._expiry - margem)
+
+    def _caminho_cache(self) -> Path:
+        """Arquivo do token desta conta (URL do SSO, client e usuário); o nome não expõe o usuário."""
+        conta = hashlib.sha1(f"{config.auth_url}|{config.client_id}|{config.email}".encode('utf-8')).hexdigest()[:16]
+        return Path(os.getenv('tokenCachePath') or CACHE_TOKEN_PADRAO) / f"token_{conta}.json"
+
+    def _ler_cache(self, caminho: Path, rejeitado: Optional[str] = None, margem: float = 0) -> bool:
+        """Adota o token do arquivo quando ele vale por mais `margem` segundos e não é o `rejeitado`."""
+        try:
+            dados = json.loads(caminho.read_text(encoding='utf-8'))
+            token, expiry = dados['access_token'], float(dados['expira_em'])
+        except (OSError, ValueError, KeyError, TypeError):
+            return False
+        if not token or token == rejeitado or time.time() > expiry - margem:
+            # o refresh_token de outro processo ainda serve para renovar sem a senha
+            if dados.get('refresh_token') and not self._refresh:
+                self._refresh, self._refresh_expiry = dados['refresh_token'], dados.get('refresh_expira_em')
+            return False
+        self._refresh, self._refresh_expiry = dados.get('refresh_token'), dados.get('refresh_expira_em')
+        self._obtido_em = dados.get('obtido_em')
+        self._expiry = expiry
+        self._token = token
+        return True
+
+    def _gravar_cache(self, caminho: Path) -> None:
+        """Grava o token (só quando a validade é conhecida), legível apenas pelo usuário, de forma atômica."""
+        if not self._expiry:
+            return
+        tmp = caminho.with_name(f"{caminho.name}.{os.getpid()}.tmp")
+        dados = {'access_token': self._token, 'expira_em': self._expiry, 'obtido_em': self._obtido_em,
+                 'refresh_token': self._refresh, 'refresh_expira_em': self._refresh_expiry}
+        try:
+            fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            with os.fdopen(fd, 'w', encoding='utf-8') as arquivo:
+                json.dump(dados, arquivo)
+            os.replace(tmp, caminho)
+        except OSError as e:
+            print(f"[AUTH] ⚠️ Token não gravado no cache em disco: {e}")
+
+    def token_em_cache(self) -> Optional[str]:
+        """Token atual se ainda for válido, sem lock nem login (None quando precisa renovar)."""
+        # enquanto a thread de renovação busca o próximo, o token atual ainda vale
+        token = self._token
+        return token if token is not None and self._valido() else None
+
     def get_token(self) -> Optional[str]:
-        """Retorna token válido, renovando quando necessário."""
-        if self._token is None or (self._expiry and time.time() > self._expiry):
+        """Retorna token válido, renovando quando necessário (um login por vez entre os processos do host)."""
+        token = self.token_em_cache()
+        if token is not None:
+            return token
+        with self._lock:
+            if self._valido():
+                return self._token
+            return self._obter()
+
+    def renovar(self, rejeitado: Optional[str]) -> Optional[str]:
+        """
+        Token novo depois que a API recusou `rejeitado` (401). Um login só para todas as threads e processos
+        que levaram o 401 juntos: quem chega depois recebe o token que o primeiro já obteve.
+        """
+        with self._lock:
+            if self._token and self._token != rejeitado and self._valido():
+                return self._token
+            self._token, self._expiry = None, None
+            return self._obter(rejeitado)
+
+    def _obter(self, rejeitado: Optional[str] = None, margem: float = 0) -> Optional[str]:
+        """Lê o token do cache em disco ou faz o login; chamado com self._lock."""
+        if not _cache_ativo():
             print("[AUTH] ⚠️ Token ausente ou expirado. Renovando...")
-            ok = self.refresh_token()
-            if not ok:
-                return None
+            return self._token if self.refresh_token() else None
+
+        caminho = self._caminho_cache()
+        # com o lock, quem chegar enquanto outro processo faz o login espera e lê o token dele
+        try:
+            with _travado(caminho.with_suffix('.lock')):
+                if self._ler_cache(caminho, rejeitado, margem):
+                    return self._token
+                print("[AUTH] ⚠️ Token ausente ou expirado. Renovando...")
+                if not self.refresh_token():
+                    return None
+                self._gravar_cache(caminho)
+        except TimeoutError as e:
+            # o dono do lock travou: login próprio, sem o cache em disco
+            print(f"[AUTH] ⚠️ {e}; renovando sem o cache em disco...")
+            return self._token if self.refresh_token() else None
         return self._token
 
+    def _margem(self) -> float:
+        """Quanto antes de vencer a thread renova o token (tokenRenovarAntes), no máximo metade da validade."""
+        try:
+            margem = float(os.getenv('tokenRenovarAntes') or MARGEM_RENOVACAO_PADRAO)
+        except ValueError:
+            margem = MARGEM_RENOVACAO_PADRAO
+        if self._expiry and self._obtido_em:
+            margem = min(margem, (self._expiry - self._obtido_em) / 2)
+        return max(margem, 0.0)
+
+    def _renovar_antes_de_vencer(self) -> None:
+        while True:
+            if self._expiry:
+                espera = self._expiry - self._margem() - time.time()
+            else:
+                espera = ESPERA_SEM_VALIDADE
+            if self._parar.wait(max(espera, ESPERA_MINIMA)):
+                return
+            if not self._token or self._valido(self._margem()):
+                continue
+            with self._lock:
+                margem = self._margem()
+                if self._token and not self._valido(margem):
+                    print("[AUTH] 🔄 Renovando o token antes de vencer...")
+                    # outro processo pode já ter renovado: o cache em disco vale se passar da margem
+                    self._obter(margem=margem)
+
+    def iniciar_renovacao(self) -> None:
+        """Inicia (uma vez) a thread que renova o token antes de vencer; daemon, termina com o processo."""
+        with self._lock:
+            if self._renovador is not None and self._renovador.is_alive():
+                return
+            self._parar.clear()
+            self._renovador = threading.Thread(target=self._renovar_antes_de_vencer, name='auth-renovacao',
+                                               daemon=True)
+            self._renovador.start()
+
+    def parar_renovacao(self) -> None:
+        self._parar.set()
+        if self._renovador is not None:
+            self._renovador.join(timeout=5)
+            self._renovador = None
+
     def __str__(self):
         token = self.get_token()
-        return token or ""
\ No newline at end of file
+        return token or ""
+
+
+_shared_auth: Optional[Auth] = None
+_shared_lock = threading.Lock()
+
+
+def get_auth() -> Auth:
+    """
+    Retorna a instância de Auth compartilhada pelo processo (um token para todas as etapas),
+    com a renovação em segundo plano ligada (desligue com tokenRenovacao=0).
+    """
+    global _shared_auth
+    with _shared_lock:
+        if _shared_auth is None:
+            _shared_auth = Auth()
+            if _renovacao_ativa():
+                _shared_auth.iniciar_renovacao()
+        return _shared_auth
@@ -1,21 +1,122 @@
 from __future__ import annotations
+import os
+import threading
 import requests
 from requests.adapters import HTTPAdapter
+from urllib.parse import urlparse
 from urllib3.util.retry import Retry
-from typing import Optional
+from typing import Dict, Optional
 
+# Conexões mantidas abertas (keep-alive) por host, por grupo de hosts; httpPool<Grupo> no .env muda cada um
+# (httpPoolSso, httpPoolBackend, httpPoolPayments, httpPoolUserManagement, httpPoolS3, httpPoolGeoapify, httpPoolOutros)
+POOLS_PADRAO: Dict[str, int] = {
+    'sso': 4,
+    'backend': 32,
+    'payments': 16,
+    'user-management': 16,
+    's3': 32,
+    'geoapify': 8,
+    'outros': 10,
+}
 
-def create_session(retries: int = 3, backoff_factor: float = 0.3, status_forcelist=(500, 502, 504), timeout: Optional[int] = None) -> requests.Session:
-    """Cria uma sessão requests com política de retry configurada.
+# Hosts diferentes guardados por grupo (os PDFs do S3 vêm de vários buckets)
+HOSTS_POR_GRUPO = 10
+
+
+def _host(url: Optional[str]) -> str:
+    return (urlparse(url).hostname or '').lower() if url else ''
+
+
+def grupo_do_host(host: str) -> str:
+    """Grupo de pool de um host: os do .env (auth_url, backendUrl, paymentsUrl, OPERATION_URL) e os conhecidos."""
+    from .config import config
+
+    host = (host or '').lower()
+    configurados = {
+        _host(config.auth_url): 'sso',
+        _host(config.backendUrl): 'backend',
+        _host(os.getenv('OPERATION_URL')): 'backend',
+        _host(config.paymentsUrl): 'payments',
+    }
+    configurados.pop('', None)
+    if host in configurados:
+        return configurados[host]
+    if host.startswith('sso.'):
+        return 'sso'
+    if host.startswith('user-management.'):
+        return 'user-management'
+    if host.startswith('payments') or '.payments' in host:
+        return 'payments'
+    if host.endswith('backend.mottu.cloud'):
+        return 'backend'
+    if host.endswith('.amazonaws.com'):
+        return 's3'
+    if host.endswith('geoapify.com'):
+        return 'geoapify'
+    return 'outros'
+
+
+def pools_configurados() -> Dict[str, int]:
+    """POOLS_PADRAO com os valores de httpPool<Grupo> do ambiente."""
+    pools = dict(POOLS_PADRAO)
+    for grupo in pools:
+        nome = 'httpPool' + ''.join(parte.capitalize() for parte in grupo.split('-'))
+        try:
+            pools[grupo] = max(int(os.getenv(nome) or pools[grupo]), 1)
+        except ValueError:
+            print(f"⚠️ {nome} inválido, usando {pools[grupo]}")
+    return pools
+
+
+class AdaptadorPorHost(HTTPAdapter):
+    """
+    Adapter que encaminha cada requisição para o HTTPAdapter do grupo do host (grupo_do_host),
+    cada um com o seu pool de conexões: o SSO, o backend, o S3 etc. não disputam as mesmas conexões.
+    """
+
+    def __init__(self, max_retries=None, pools: Optional[Dict[str, int]] = None):
+        super().__init__(max_retries=max_retries)
+        self.pools = dict(pools or pools_configurados())
+        self._adaptadores: Dict[str, HTTPAdapter] = {}
+        self._grupos: Dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    def adaptador(self, url: str) -> HTTPAdapter:
+        host = _host(url)
+        with self._lock:
+            grupo = self._grupos.get(host)
+            if grupo is None:
+                grupo = self._grupos[host] = grupo_do_host(host)
+            if grupo not in self._adaptadores:
+                tamanho = self.pools.get(grupo, POOLS_PADRAO['outros'])
+                self._adaptadores[grupo] = HTTPAdapter(pool_connections=HOSTS_POR_GRUPO, pool_maxsize=tamanho,
+                                                       max_retries=self.max_retries)
+            return self._adaptadores[grupo]
+
+    def send(self, request, **kwargs):
+        return self.adaptador(request.url).send(request, **kwargs)
+
+    def close(self):
+        with self._lock:
+            adaptadores, self._adaptadores = list(self._adaptadores.values()), {}
+        for adaptador in adaptadores:
+            adaptador.close()
+        super().close()
+
+
+def create_session(retries: int = 3, backoff_factor: float = 0.3, status_forcelist=(500, 502, 504), timeout: Optional[int] = None,
+                   pools: Optional[Dict[str, int]] = None) -> requests.Session:
+    """Cria uma sessão requests com política de retry configurada e um pool de conexões por grupo de hosts.
 
     - retries: número de tentativas
     - backoff_factor: fator exponencial
     - status_forcelist: códigos que disparam retry
     - timeout: tempo padrão (não aplicado automaticamente; usar `.request` wrapper se necessário)
+    - pools: {grupo: conexões por host}; padrão pools_configurados()
     """
     session = requests.Session()
     retry = Retry(total=retries, read=retries, connect=retries, backoff_factor=backoff_factor, status_forcelist=status_forcelist, raise_on_status=False)
-    adapter = HTTPAdapter(max_retries=retry)
+    adapter = AdaptadorPorHost(max_retries=retry, pools=pools)
     session.mount("https://", adapter)
     session.mount("http://", adapter)
     # attach default timeout info for convenience
@@ -27,3 +128,48 @@ def request_with_timeout(session: requests.Session, method: str, url: str, timeo
     """Convenience wrapper to use session with a default timeout if provided."""
     to = timeout if timeout is not None else getattr(session, "request_timeout", None) or 30
     return session.request(method, url, timeout=to, **kwargs)
+
+
+_shared_session: Optional[requests.Session] = None
+_shared_lock = threading.Lock()
+
+
+def get_session() -> requests.Session:
+    """
+    Retorna a sessão compartilhada pelo processo, reaproveitando os pools de conexões entre etapas.
+    Todas as chamadas HTTP (SSO, APIs e downloads das URLs pré-assinadas) devem passar por ela.
+    """
+    global _shared_session
+    with _shared_lock:
+        if _shared_session is None:
+            _shared_session = create_session(retries=2, backoff_factor=0.2)
+        return _shared_session
+
+
+def request_autenticado(session: requests.Session, method: str, url: str, timeout: Optional[int] = None,
+                        auth=None, **kwargs):
+    """
+    request_with_timeout com o token do Auth no header Authorization. Num 401 o token é renovado
+    (Auth.renovar: um login só, mesmo com várias threads recebendo 401 juntas) e a requisição é
+    repetida uma vez; se ainda assim vier 401, a resposta volta para quem chamou.
+    """
+    if auth is None:
+        from .auth import get_auth
+
+        auth = get_auth()
+
+    headers = dict(kwargs.pop('headers', None) or {})
+    token = auth.get_token()
+    if token:
+        headers['Authorization'] = f"Bearer {token}"
+    resp = request_with_timeout(session, method, url, timeout=timeout, headers=headers, **kwargs)
+    if resp.status_code != 401:
+        return resp
+
+    novo = auth.renovar(token)
+    if not novo or novo == token:
+        return resp
+    print("[AUTH] 🔁 401 recebido: token renovado, repetindo a requisição")
+    resp.close()
+    headers['Authorization'] = f"Bearer {novo}"
+    return request_with_timeout(session, method, url, timeout=timeout, headers=headers, **kwargs)
@@ -0,0 +1,214 @@
+"""Camada HTTP assíncrona (httpx), espelho de http.py.
+
+create_async_session / request_with_timeout_async / request_autenticado_async fazem o mesmo que
+create_session / request_with_timeout / request_autenticado, com a mesma política de retry do
+urllib3 (erros de conexão sempre; erros de leitura e status de status_forcelist só nos métodos
+idempotentes; backoff_factor * 2^(n-1) a partir da segunda tentativa) e um pool por grupo de hosts
+(httpPool<Grupo>). Num único event loop dá para manter centenas de consultas e downloads de URLs
+pré-assinadas em andamento ao mesmo tempo, sem uma thread por requisição; quem chama limita a
+concorrência (asyncio.Semaphore), como o streamingEmVoo faz com as threads.
+
+httpx é dependência opcional (pip install httpx); só este módulo a usa.
+"""
+from __future__ import annotations
+
+import asyncio
+import os
+import time
+from contextlib import asynccontextmanager
+from email.utils import parsedate_to_datetime
+from pathlib import Path
+from typing import Dict, Optional
+
+from urllib3.util.retry import Retry
+
+from .http import POOLS_PADRAO, _host, grupo_do_host, pools_configurados
+
+# Os mesmos padrões do urllib3 Retry usado em create_session
+METODOS_IDEMPOTENTES = Retry.DEFAULT_ALLOWED_METHODS
+STATUS_RETRY_AFTER = Retry.RETRY_AFTER_STATUS_CODES
+BACKOFF_MAXIMO = Retry.DEFAULT_BACKOFF_MAX
+
+# Conexões ociosas ficam abertas por este tempo (segundos) para a próxima requisição ao mesmo host
+KEEPALIVE_SEGUNDOS = 30.0
+
+
+def _httpx():
+    """httpx, ou RuntimeError explicando como instalar (dependência opcional, só para a camada assíncrona)."""
+    try:
+        import httpx
+    except ImportError:
+        raise RuntimeError("A camada HTTP assíncrona requer o pacote httpx (pip install httpx)") from None
+    return httpx
+
+
+def espera_retry(backoff_factor: float, erros: int) -> float:
+    """Segundos antes da próxima tentativa depois de `erros` falhas seguidas (mesma fórmula do urllib3 Retry)."""
+    if erros <= 1:
+        return 0.0
+    return float(max(0, min(BACKOFF_MAXIMO, backoff_factor * (2 ** (erros - 1)))))
+
+
+def _retry_after(resp) -> Optional[float]:
+    """Retry-After (segundos ou data HTTP) das respostas em que o urllib3 o respeita."""
+    valor = resp.headers.get('Retry-After')
+    if resp.status_code not in STATUS_RETRY_AFTER or not valor:
+        return None
+    try:
+        return max(float(valor), 0.0)
+    except ValueError:
+        pass
+    try:
+        return max(parsedate_to_datetime(valor).timestamp() - time.time(), 0.0)
+    except (TypeError, ValueError):
+        return None
+
+
+class ClienteAssincrono:
+    """
+    Um httpx.AsyncClient por grupo de hosts (grupo_do_host), cada um com o seu pool de conexões
+    mantidas abertas, e a política de retry de create_session. Use com `async with` ou feche com aclose().
+    """
+
+    def __init__(self, retries: int = 3, backoff_factor: float = 0.3, status_forcelist=(500, 502, 504),
+                 timeout: Optional[int] = None, pools: Optional[Dict[str, int]] = None):
+        self.retries = retries
+        self.backoff_factor = backoff_factor
+        self.status_forcelist = frozenset(status_forcelist or ())
+        self.request_timeout = timeout
+        self.pools = dict(pools or pools_configurados())
+        self._clientes: Dict[str, object] = {}
+
+    def cliente(self, url: str):
+        """AsyncClient do grupo do host de `url` (criado na primeira requisição, já dentro do event loop)."""
+        grupo = grupo_do_host(_host(url))
+        if grupo not in self._clientes:
+            httpx = _httpx()
+            tamanho = self.pools.get(grupo, POOLS_PADRAO['outros'])
+            # como o pool_block=False do urllib3: sem teto de conexões, mas só `tamanho` ficam abertas
+            limites = httpx.Limits(max_connections=None, max_keepalive_connections=tamanho,
+                                   keepalive_expiry=KEEPALIVE_SEGUNDOS)
+            self._clientes[grupo] = httpx.AsyncClient(limits=limites, follow_redirects=True)
+        return self._clientes[grupo]
+
+    async def aclose(self) -> None:
+        clientes, self._clientes = list(self._clientes.values()), {}
+        for cliente in clientes:
+            await cliente.aclose()
+
+    async def __aenter__(self) -> "ClienteAssincrono":
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        await self.aclose()
+
+
+def create_async_session(retries: int = 3, backoff_factor: float = 0.3, status_forcelist=(500, 502, 504),
+                         timeout: Optional[int] = None, pools: Optional[Dict[str, int]] = None) -> ClienteAssincrono:
+    """Cria o cliente assíncrono com a política de retry e os pools de create_session."""
+    return ClienteAssincrono(retries=retries, backoff_factor=backoff_factor, status_forcelist=status_forcelist,
+                             timeout=timeout, pools=pools)
+
+
+async def _enviar(sessao: ClienteAssincrono, method: str, url: str, timeout: Optional[int], **kwargs):
+    """Envia com retentativas e devolve a resposta ainda sem ler o corpo (stream)."""
+    httpx = _httpx()
+    cliente = sessao.cliente(url)
+    to = timeout if timeout is not None else sessao.request_timeout or 30
+    idempotente = method.upper() in METODOS_IDEMPOTENTES
+    erros = 0
+    while True:
+        try:
+            resp = await cliente.send(cliente.build_request(method, url, timeout=to, **kwargs), stream=True)
+        except (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout):
+            # a requisição nem saiu: o urllib3 repete em qualquer método
+            if erros >= sessao.retries:
+                raise
+        except (httpx.ReadError, httpx.ReadTimeout, httpx.RemoteProtocolError):
+            if not idempotente or erros >= sessao.retries:
+                raise
+        else:
+            if resp.status_code not in sessao.status_forcelist or not idempotente or erros >= sessao.retries:
+                # raise_on_status=False: esgotadas as tentativas, volta a última resposta
+                return resp
+            espera = _retry_after(resp)
+            await resp.aclose()
+            erros += 1
+            await asyncio.sleep(espera if espera is not None else espera_retry(sessao.backoff_factor, erros))
+            continue
+        erros += 1
+        await asyncio.sleep(espera_retry(sessao.backoff_factor, erros))
+
+
+async def request_with_timeout_async(sessao: ClienteAssincrono, method: str, url: str,
+                                     timeout: Optional[int] = None, **kwargs):
+    """Como request_with_timeout: resposta com o corpo já lido (conexão devolvida ao pool)."""
+    resp = await _enviar(sessao, method, url, timeout, **kwargs)
+    try:
+        await resp.aread()
+    finally:
+        await resp.aclose()
+    return resp
+
+
+@asynccontextmanager
+async def stream_with_timeout_async(sessao: ClienteAssincrono, method: str, url: str,
+                                    timeout: Optional[int] = None, **kwargs):
+    """
+    Resposta em streaming (o equivalente a stream=True): leia com `async for parte in resp.aiter_bytes()`.
+    As retentativas valem até a resposta chegar; a conexão volta ao pool ao sair do bloco.
+    """
+    resp = await _enviar(sessao, method, url, timeout, **kwargs)
+    try:
+        yield resp
+    finally:
+        await resp.aclose()
+
+
+async def baixar_async(sessao: ClienteAssincrono, url: str, destino, timeout: Optional[int] = 60,
+                       tamanho_bloco: int = 65536, **kwargs) -> Optional[Path]:
+    """Baixa `url` (ex.: URL pré-assinada do S3) para `destino` em blocos; None se o status não for 200."""
+    destino = Path(destino)
+    async with stream_with_timeout_async(sessao, 'GET', url, timeout=timeout, **kwargs) as resp:
+        if resp.status_code != 200:
+            print(f"  ❌ Falha ao baixar {url}: {resp.status_code}")
+            return None
+        destino.parent.mkdir(parents=True, exist_ok=True)
+        tmp = destino.with_name(f"{destino.name}.{os.getpid()}.{id(resp)}.tmp")
+        try:
+            with open(tmp, 'wb') as arquivo:
+                async for parte in resp.aiter_bytes(tamanho_bloco):
+                    arquivo.write(parte)
+            os.replace(tmp, destino)
+        finally:
+            if tmp.exists():
+                tmp.unlink()
+    return destino
+
+
+async def request_autenticado_async(sessao: ClienteAssincrono, method: str, url: str,
+                                    timeout: Optional[int] = None, auth=None, **kwargs):
+    """
+    Como request_autenticado: token do Auth no header e, num 401, Auth.renovar e uma nova tentativa.
+    O Auth é síncrono; o login, quando precisa acontecer, roda numa thread e não trava o event loop.
+    """
+    if auth is None:
+        from .auth import get_auth
+
+        auth = get_auth()
+
+    headers = dict(kwargs.pop('headers', None) or {})
+    # token em memória sai direto; só o login/renovação vai para uma thread
+    token = auth.token_em_cache() or await asyncio.to_thread(auth.get_token)
+    if token:
+        headers['Authorization'] = f"Bearer {token}"
+    resp = await request_with_timeout_async(sessao, method, url, timeout=timeout, headers=headers, **kwargs)
+    if resp.status_code != 401:
+        return resp
+
+    novo = await asyncio.to_thread(auth.renovar, token)
+    if not novo or novo == token:
+        return resp
+    print("[AUTH] 🔁 401 recebido: token renovado, repetindo a requisição")
+    headers['Authorization'] = f"Bearer {novo}"
+    return await request_with_timeout_async(sessao, method, url, timeout=timeout, headers=headers, **kwargs)
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Benchmark: leitores da planilha .xlsx (tempo de parse e pico de memória por engine).
+
+Monta um .xlsx com o formato real da exportação (as colunas e linhas de
+src/utils/Relatório BOs.xlsx repetidas até --linhas, padrão 50.000) ou usa
+--planilha, e mede cada leitor num processo separado, para que o pico de
+memória de um não contamine o outro:
+  - openpyxl: pd.read_excel com o engine padrão
+  - calamine: pd.read_excel(engine='calamine'), quando python-calamine está instalado
+  - openpyxl read-only: iterar_linhas, a leitura linha a linha do modo streaming
+
+Uso: python src/tests/benchmark_leitores.py [--linhas 50000] [--planilha arquivo.xlsx]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+project_root = Path(__file__).resolve().parents[2]
+if str(project_root) not in sys.path:
+    sys.path.insert(0, str(project_root))
+
+AMOSTRA = project_root / "src" / "utils" / "Relatório BOs.xlsx"
+
+
+def pico_memoria_mb():
+    """Pico de memória residente do processo (MB); None onde não há como medir (Windows)."""
+    # no Linux, VmHWM é do próprio processo; ru_maxrss herda o pico do pai através do fork/exec
+    try:
+        with open('/proc/self/status') as status:
+            for linha in status:
+                if linha.startswith('VmHWM:'):
+                    return int(linha.split()[1]) / 1024
+    except OSError:
+        pass
+    try:
+        import resource
+    except ImportError:
+        return None
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss vem em KB no Linux e em bytes no macOS
+    return pico / (1024 * 1024) if sys.platform == 'darwin' else pico / 1024
+
+
+def planilha_real(linhas, destino):
+    import pandas as pd
+
+    amostra = pd.read_excel(AMOSTRA)
+    repeticoes = -(-linhas // len(amostra))
+    df = pd.concat([amostra] * repeticoes, ignore_index=True).head(linhas)
+    df.to_excel(destino, index=False)
+    return len(df), len(df.columns)
+
+
+def medir_leitor(leitor, caminho):
+    """Roda no processo filho: lê a planilha com o leitor e devolve tempo, pico de memória e linhas."""
+    import pandas as pd
+    from src.utils.fileUtils import iterar_linhas
+
+    os.environ['planilhaCache'] = '0'
+    antes = pico_memoria_mb()
+    inicio = time.perf_counter()
+    if leitor == 'streaming':
+        linhas = sum(1 for _ in iterar_linhas(caminho))
+    else:
+        linhas = len(pd.read_excel(caminho, engine=leitor))
+    segundos = time.perf_counter() - inicio
+    depois = pico_memoria_mb()
+    memoria = None if antes is None else depois - antes
+    return {'segundos': segundos, 'memoria_mb': memoria, 'linhas': linhas}
+
+
+def leitores():
+    from src.utils.fileUtils import _calamine_disponivel
+
+    disponiveis = [('openpyxl', 'openpyxl')]
+    if _calamine_disponivel():
+        disponiveis.append(('calamine', 'calamine'))
+    else:
+        print("ℹ️  python-calamine não instalado (pip install python-calamine): engine calamine fora da comparação")
+    disponiveis.append(('openpyxl read-only', 'streaming'))
+    return disponiveis
+
+
+def main():
+    parser = argparse.ArgumentParser(description="tempo e memória dos leitores de .xlsx")
+    parser.add_argument('--linhas', type=int, default=50000)
+    parser.add_argument('--planilha', help="usa esta planilha em vez de gerar uma")
+    parser.add_argument('--filho', nargs=2, metavar=('LEITOR', 'PLANILHA'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.filho:
+        print(json.dumps(medir_leitor(*args.filho)))
+        return 0
+
+    with tempfile.TemporaryDirectory() as pasta:
+        caminho = args.planilha
+        if not caminho:
+            caminho = os.path.join(pasta, "planilha.xlsx")
+            linhas, colunas = planilha_real(args.linhas, caminho)
+            print(f"📊 Planilha com o formato da exportação: {linhas} linhas x {colunas} colunas")
+        print(f"📄 {caminho} ({os.path.getsize(caminho) / (1024 * 1024):.1f} MB)\n")
+
+        print(f"{'leitor':<22}{'tempo':>10}{'pico de memória':>18}{'linhas':>10}")
+        for nome, leitor in leitores():
+            saida = subprocess.run([sys.executable, __file__, '--filho', leitor, caminho],
+                                   capture_output=True, text=True, cwd=project_root)
+            if saida.returncode != 0:
+                print(f"❌ {nome}: {saida.stderr.strip().splitlines()[-1] if saida.stderr.strip() else saida.returncode}")
+                continue
+            resultado = json.loads(saida.stdout.strip().splitlines()[-1])
+            memoria = "n/d" if resultado['memoria_mb'] is None else f"{resultado['memoria_mb']:.0f} MB"
+            print(f"{nome:<22}{resultado['segundos']:>9.2f}s{memoria:>18}{resultado['linhas']:>10}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Benchmark: laços com DataFrame.iterrows x operações por coluna.
+
+Gera uma planilha sintética (padrão 50.000 linhas, com as colunas da exportação,
+ids faltando e datas) e compara, conferindo que os resultados são iguais:
+  - chaves/registros: ocorrencia_da_linha em cada linha do iterrows x ocorrencias(df)
+  - fingerprints do incremental: fingerprint_linha por linha x fingerprints_das_linhas(df)
+  - linhas para o generatePDF: iterrows x df.to_dict('records')
+
+Uso: python src/tests/benchmark_vetorizacao.py [--linhas 50000]
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+project_root = Path(__file__).resolve().parents[2]
+if str(project_root) not in sys.path:
+    sys.path.insert(0, str(project_root))
+
+from src.main.pipeline.incremental import fingerprint_linha, fingerprints_das_linhas
+from src.utils.ocorrencia import ocorrencia_da_linha, ocorrencias
+
+
+def planilha_sintetica(linhas, semente=7):
+    rng = np.random.default_rng(semente)
+    user_ids = rng.integers(100000, 200000, linhas).astype(float)
+    user_ids[rng.random(linhas) < 0.02] = np.nan  # sem userId: cai nas alternativas
+    return pd.DataFrame({
+        'dataOccurrenceType': rng.integers(1, 13, linhas),
+        'dataVehicleId': rng.integers(1000, 90000, linhas).astype(str),
+        'dataNameUser': [f"Usuario {i}" for i in range(linhas)],
+        'dataVehiclePlate': [f" abc{i % 10000:04d}" for i in range(linhas)],
+        'dataTrackingDate': pd.Timestamp('2025-01-01') + pd.to_timedelta(rng.integers(0, 10**7, linhas), unit='s'),
+        'dataTrackingGeolocation': [f"-23.5{i % 1000:03d}, -46.6{i % 997:03d}" for i in range(linhas)],
+        'dataBranchAddress': ["Rua Exemplo, 100 - São Paulo"] * linhas,
+        'dataOccurenceDate': (pd.Timestamp('2025-01-01') + pd.to_timedelta(rng.integers(0, 10**7, linhas), unit='s')).astype(str),
+        'dataUserRentalId': np.where(rng.random(linhas) < 0.5, '-', rng.integers(1, 10**6, linhas).astype(str)),
+        'dataUserId': user_ids,
+        'dataVehicleChassis': [f"9C2KC{i:012d}" for i in range(linhas)],
+    })
+
+
+def medir(funcao):
+    inicio = time.perf_counter()
+    resultado = funcao()
+    return time.perf_counter() - inicio, resultado
+
+
+def main():
+    parser = argparse.ArgumentParser(description="iterrows x operações por coluna")
+    parser.add_argument('--linhas', type=int, default=50000)
+    args = parser.parse_args()
+
+    df = planilha_sintetica(args.linhas)
+    print(f"📊 Planilha sintética: {len(df)} linhas x {len(df.columns)} colunas\n")
+
+    casos = [
+        ("chaves/registros",
+         lambda: [(o.chave, o.placa, o.user_id, o.tipo) for o in (ocorrencia_da_linha(row) for _, row in df.iterrows())],
+         lambda: [(o.chave, o.placa, o.user_id, o.tipo) for o in ocorrencias(df)]),
+        ("fingerprints",
+         lambda: [fingerprint_linha(row) for _, row in df.iterrows()],
+         lambda: fingerprints_das_linhas(df)),
+        ("linhas do generatePDF",
+         lambda: [row['dataVehiclePlate'] for _, row in df.iterrows()],
+         lambda: [row['dataVehiclePlate'] for row in df.to_dict('records')]),
+    ]
+
+    print(f"{'caso':<24}{'iterrows':>12}{'por coluna':>14}{'ganho':>9}")
+    for nome, por_linha, por_coluna in casos:
+        t_linha, esperado = medir(por_linha)
+        t_coluna, obtido = medir(por_coluna)
+        if obtido != esperado:
+            print(f"❌ {nome}: resultados diferentes")
+            return 1
+        print(f"{nome:<24}{t_linha:>11.2f}s{t_coluna:>13.2f}s{t_linha / t_coluna:>8.1f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
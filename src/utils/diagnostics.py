@@ -3,7 +3,7 @@ import requests
 
 from src.settings.auth import Auth
 from src.settings.config import config
-from src.settings.http import create_session, request_with_timeout
+from src.settings.http import get_session, request_with_timeout
 
 
 def test_authentication():
@@ -38,7 +38,7 @@ def test_api_endpoints(token):
         'Authorization': f'Bearer {token}'
     }
 
-    session = create_session(retries=2, backoff_factor=0.2)
+    session = get_session()
 
     for name, url in endpoints.items():
         if not url:
@@ -82,7 +82,7 @@ def test_html_to_pdf_api(token):
         'Authorization': f'Bearer {token}'
     }
 
-    session = create_session(retries=2, backoff_factor=0.2)
+    session = get_session()
 
     try:
         response = request_with_timeout(session, 'POST', url, headers=headers, data=json.dumps(test_payload), timeout=30)
@@ -11,14 +11,14 @@ import subprocess
 import tempfile
 from docx2pdf import convert
 
-from src.settings.auth import Auth
+from src.settings.auth import get_auth
 from src.settings.config import config
 
 imageProcessUrl = config.imageProcessUrl
 fileToolsUrl = config.fileToolsUrl
 maxRetries = config.maxRetries
 docxPath = os.environ.get('docx')  # optional and not in config
-token = Auth()
+token = get_auth()
 
 def convertDocxToPdf(docx_file):
     if not os.path.exists(docx_file):
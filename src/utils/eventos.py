@@ -0,0 +1,183 @@
+"""Eventos estruturados de progresso das etapas.
+
+Cada documento registrado no ledger e cada início/fim de etapa viram um
+evento {tipo, etapa, chave, status, duracao_s, bytes}. No mesmo processo os
+eventos vão para uma fila; numa etapa em subprocess (variável eventosPipe=1)
+saem no stdout como linhas com o prefixo PREFIXO, lidas ao vivo pelo
+orquestrador. O ConsumidorEventos grava tudo em JSONL e mostra a barra de
+progresso com documentos por segundo e ETA.
+"""
+from __future__ import annotations
+
+import json
+import os
+import queue
+import sys
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Optional
+
+EVENTOS_PADRAO = Path(__file__).resolve().parents[2] / "src" / "output" / "eventos"
+
+PREFIXO = "@@evento "
+
+# Sem terminal (cron), a linha de progresso é impressa a cada INTERVALO_LOG segundos
+INTERVALO_LOG = 10.0
+
+_fila: Optional[queue.Queue] = None
+_relogio = threading.local()
+
+
+def _agora() -> str:
+    return datetime.now().isoformat(timespec='milliseconds')
+
+
+def publicar(evento: dict) -> None:
+    """Entrega um evento já montado: stdout (etapa em subprocess) ou fila do consumidor ativo."""
+    if os.getenv('eventosPipe') == '1':
+        sys.stdout.write(PREFIXO + json.dumps(evento, ensure_ascii=False) + "\n")
+        sys.stdout.flush()
+        return
+    fila = _fila
+    if fila is not None:
+        fila.put(evento)
+
+
+def emitir(tipo, etapa, chave=None, status='ok', duracao=None, bytes=None, **extra) -> dict:
+    evento = {
+        'ts': _agora(), 'tipo': tipo, 'etapa': etapa, 'chave': chave, 'status': status,
+        'duracao_s': round(duracao, 3) if duracao is not None else None, 'bytes': bytes,
+    }
+    evento.update(extra)
+    publicar(evento)
+    return evento
+
+
+def marcar_inicio() -> None:
+    """Zera o relógio desta thread: o próximo documento mede a partir daqui."""
+    _relogio.marca = time.perf_counter()
+
+
+def emitir_etapa(etapa, status, duracao=None) -> dict:
+    if status == 'inicio':
+        marcar_inicio()
+    return emitir('etapa', etapa, status=status, duracao=duracao)
+
+
+def emitir_documento(chave, tipo_doc, ok, caminho=None, erro=None) -> dict:
+    """
+    Evento de um documento registrado. A duração é o tempo desde o documento anterior desta
+    thread (ou o início da etapa): os coletores processam um item por vez em cada thread.
+    """
+    agora = time.perf_counter()
+    anterior = getattr(_relogio, 'marca', None)
+    _relogio.marca = agora
+    tamanho = None
+    if ok and caminho:
+        try:
+            tamanho = os.path.getsize(caminho)
+        except OSError:
+            pass
+    extra = {'erro': erro} if erro else {}
+    return emitir('documento', tipo_doc, chave=chave, status='ok' if ok else 'falha',
+                  duracao=agora - anterior if anterior is not None else None, bytes=tamanho, **extra)
+
+
+def ler_evento(linha: str) -> Optional[dict]:
+    """Evento contido em uma linha de saída de subprocess, ou None para linhas comuns."""
+    if not linha.startswith(PREFIXO):
+        return None
+    try:
+        return json.loads(linha[len(PREFIXO):])
+    except ValueError:
+        return None
+
+
+def linha_progresso(feitos, total, decorrido, falhas=0, largura=30) -> str:
+    """'[#####-----] 50/100 docs | 2.5 docs/s | ETA 00:20' (sem total, só contagem e taxa)."""
+    taxa = feitos / decorrido if decorrido > 0 else 0.0
+    partes = []
+    if total:
+        cheio = min(int(largura * feitos / total), largura)
+        partes.append(f"[{'#' * cheio}{'-' * (largura - cheio)}] {feitos}/{total} docs")
+    else:
+        partes.append(f"{feitos} docs")
+    if falhas:
+        partes.append(f"{falhas} falhas")
+    partes.append(f"{taxa:.1f} docs/s")
+    if total and taxa > 0:
+        restante = max(total - feitos, 0) / taxa
+        minutos, segundos = divmod(int(restante), 60)
+        partes.append(f"ETA {minutos:02d}:{segundos:02d}")
+    return " | ".join(partes)
+
+
+class ConsumidorEventos:
+    """Lê a fila de eventos numa thread: grava o JSONL e atualiza a barra de progresso."""
+
+    def __init__(self, caminho=None, total=None, progresso=True, saida=None):
+        if caminho is None:
+            caminho = os.getenv('eventosPath') or (
+                EVENTOS_PADRAO / f"eventos_{datetime.now().strftime('%Y%m%d_%H%M%S')}.jsonl"
+            )
+        self.caminho = Path(caminho)
+        self.total = total
+        self.progresso = progresso
+        self.saida = saida or sys.stderr
+        self.feitos = 0
+        self.falhas = 0
+        self.bytes = 0
+        self.fila: queue.Queue = queue.Queue()
+        self._inicio = time.perf_counter()
+        self._ultimo_log = 0.0
+        self._thread = threading.Thread(target=self._consumir, name="eventos", daemon=True)
+
+    def iniciar(self) -> "ConsumidorEventos":
+        global _fila
+        self.caminho.parent.mkdir(parents=True, exist_ok=True)
+        self._arquivo = open(self.caminho, 'a', encoding='utf-8', buffering=1)
+        _fila = self.fila
+        self._thread.start()
+        return self
+
+    def parar(self) -> None:
+        global _fila
+        if _fila is self.fila:
+            _fila = None
+        self.fila.put(None)
+        self._thread.join()
+        self._arquivo.close()
+        if self.progresso:
+            self._mostrar(final=True)
+
+    def _consumir(self) -> None:
+        while True:
+            try:
+                evento = self.fila.get(timeout=0.5)
+            except queue.Empty:
+                if self.progresso:
+                    self._mostrar()
+                continue
+            if evento is None:
+                break
+            self._arquivo.write(json.dumps(evento, ensure_ascii=False) + "\n")
+            if evento.get('tipo') == 'documento':
+                self.feitos += 1
+                self.falhas += evento.get('status') == 'falha'
+                self.bytes += evento.get('bytes') or 0
+                if self.progresso:
+                    self._mostrar()
+
+    def _mostrar(self, final=False) -> None:
+        agora = time.perf_counter()
+        linha = linha_progresso(self.feitos, self.total, agora - self._inicio, self.falhas)
+        interativo = getattr(self.saida, 'isatty', lambda: False)()
+        if interativo:
+            self.saida.write("\r📶 " + linha + ("\n" if final else ""))
+            self.saida.flush()
+        elif final or agora - self._ultimo_log >= INTERVALO_LOG:
+            self._ultimo_log = agora
+            self.saida.write("📶 " + linha + "\n")
+            self.saida.flush()
@@ -1,6 +1,20 @@
+import glob
+import hashlib
+import importlib.util
 import os
+import threading
 import pandas as pd
 
+# Cache de planilhas já lidas neste processo: (caminho, mtime, tamanho, aba) -> DataFrame
+_workbook_cache = {}
+_workbook_lock = threading.Lock()
+
+# Planilha instalada pelo pipeline para a execução atual (ex.: só as linhas novas no modo incremental)
+_planilha_instalada = None
+
+# Cópias já lidas (pickle) entre execuções; desligue com planilhaCache=0
+CACHE_PLANILHAS_PADRAO = os.path.join('src', 'output', 'cache', 'planilhas')
+
 def _project_root_from_utils():
     # src/utils -> subir dois níveis para chegar na raiz do projeto
     return os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
@@ -13,37 +27,469 @@ def resolve_excel_path(env_excel_value):
         path = os.path.abspath(os.path.join(_project_root_from_utils(), path))
     return path
 
-def searchExcel(column_name, excelPath=None):
+# excelPage com este valor lê todas as abas de cada pasta de trabalho
+TODAS_AS_ABAS = '*'
+
+# Coluna com a fonte (arquivo:aba) de cada linha quando a execução junta várias planilhas
+COLUNA_ORIGEM = 'origem'
+
+def _sheet_from_env():
+    """Aba definida em 'excelPage' (nome, índice ou '*' para todas); 0 quando não definida."""
+    excel_page_env = os.getenv('excelPage')
+    if excel_page_env is None:
+        return 0
+    try:
+        return int(excel_page_env)
+    except Exception:
+        return excel_page_env
+
+def instalar_planilha(df):
     """
-    Lê a planilha definida em .env (variável 'excel') e retorna a lista da coluna.
-    Se excelPath for fornecido, usa-o (aceita relativo ao projeto).
+    Faz read_workbook/searchExcel devolverem df (em vez de ler o arquivo) nesta execução.
+    Usado pelo pipeline para rodar as etapas sobre um subconjunto da planilha; None desfaz.
     """
-    # evita import circular de dotenv aqui - espera-se que .env já esteja carregado
+    global _planilha_instalada
+    _planilha_instalada = df
+
+def _pasta_sidecar():
+    """Pasta das cópias em disco das planilhas, ou None quando o cache em disco está desligado."""
+    if os.getenv('planilhaCache', '1').strip().lower() in ('0', 'false', 'nao', 'não', 'n', 'no'):
+        return None
+    pasta = os.getenv('planilhaCachePath') or os.path.join(_project_root_from_utils(), CACHE_PLANILHAS_PADRAO)
+    return os.path.abspath(pasta)
+
+def _prefixo_sidecar(excelPath):
+    return hashlib.sha1(excelPath.encode('utf-8')).hexdigest()[:16]
+
+def _caminho_sidecar(pasta, key):
+    """
+    Arquivo da cópia de key = (caminho, mtime, tamanho, aba[, colunas]): o nome traz a versão
+    do arquivo (mtime/tamanho) e a variante lida (aba/colunas), então muda sozinho quando a planilha muda.
+    """
+    return os.path.join(pasta, f"{_prefixo_versao(key)}{_hash_curto(key[3:])}.pkl")
+
+def _hash_curto(valor):
+    return hashlib.sha1(repr(valor).encode('utf-8')).hexdigest()[:12]
+
+def _prefixo_versao(key):
+    return f"{_prefixo_sidecar(key[0])}_{_hash_curto(key[1:3])}_"
+
+def _ler_sidecar(key):
+    pasta = _pasta_sidecar()
+    if pasta is None:
+        return None
+    caminho = _caminho_sidecar(pasta, key)
+    if not os.path.exists(caminho):
+        return None
+    try:
+        return pd.read_pickle(caminho)
+    except Exception as e:
+        print(f"⚠️  Cache da planilha ignorado ({caminho}): {e}")
+        return None
+
+def _gravar_sidecar(key, df):
+    """Grava a cópia da planilha (atômica) e remove as cópias de versões antigas do mesmo arquivo."""
+    pasta = _pasta_sidecar()
+    if pasta is None:
+        return
+    caminho = _caminho_sidecar(pasta, key)
+    try:
+        os.makedirs(pasta, exist_ok=True)
+        tmp = f"{caminho}.{os.getpid()}.tmp"
+        df.to_pickle(tmp)
+        os.replace(tmp, caminho)
+        versao_atual = os.path.join(pasta, _prefixo_versao(key))
+        for antigo in glob.glob(os.path.join(pasta, f"{_prefixo_sidecar(key[0])}_*.pkl")):
+            if not antigo.startswith(versao_atual):
+                os.remove(antigo)
+    except Exception as e:
+        print(f"⚠️  Cache da planilha não gravado: {e}")
+
+def esquecer_planilha(excelPath):
+    """Remove do cache (memória e disco) as leituras de excelPath (ex.: arquivo já processado no modo --vigiar)."""
+    excelPath = resolve_excel_path(str(excelPath))
+    with _workbook_lock:
+        for key in [k for k in _workbook_cache if k[0] == excelPath]:
+            del _workbook_cache[key]
+    pasta = _pasta_sidecar()
+    if pasta:
+        for antigo in glob.glob(os.path.join(pasta, f"{_prefixo_sidecar(excelPath)}_*.pkl")):
+            try:
+                os.remove(antigo)
+            except OSError:
+                pass
+
+def _ler_arquivo(excelPath, sheet_arg, usecols=None):
+    """Lê a planilha inteira com o leitor do formato do arquivo (ver FORMATOS_ENTRADA)."""
+    return _formato(excelPath)[0](excelPath, sheet_arg, usecols)
+
+def _chave_arquivo(excelPath, sheet_name):
+    """(caminho, mtime, tamanho, aba) da planilha; sem excelPath usa 'excel'/'excelPath', sem sheet_name 'excelPage'."""
     if not excelPath:
-        excelPath = os.getenv('excel')
+        excelPath = os.getenv('excel') or os.getenv('excelPath')
 
     excelPath = resolve_excel_path(excelPath)
     if not excelPath or not os.path.exists(excelPath):
         raise ValueError(f"Caminho do arquivo Excel inválido ou não encontrado: {excelPath}")
 
-    excel_page_env = os.getenv('excelPage')
-    if excel_page_env is None:
-        sheet_arg = 0
-    else:
-        try:
-            sheet_arg = int(excel_page_env)
-        except Exception:
-            sheet_arg = excel_page_env
+    sheet_arg = _sheet_from_env() if sheet_name is None else sheet_name
+    stat = os.stat(excelPath)
+    return (excelPath, stat.st_mtime_ns, stat.st_size, sheet_arg)
+
+def read_workbook(excelPath=None, sheet_name=None):
+    """
+    Lê a planilha uma única vez por processo e devolve o DataFrame.
+    Sem excelPath usa a variável 'excel' (ou 'excelPath') do .env; sem sheet_name usa 'excelPage'.
+    Leituras seguintes do mesmo arquivo (mesmo mtime/tamanho e aba) reaproveitam o resultado,
+    então todas as etapas de uma execução compartilham um único parse. O resultado também é
+    gravado em disco (src/output/cache/planilhas, ou planilhaCachePath) e as execuções seguintes
+    o carregam sem abrir a planilha enquanto o arquivo não mudar.
+    Com uma planilha instalada (instalar_planilha) ela é devolvida no lugar do arquivo.
+    """
+    if _planilha_instalada is not None:
+        return _planilha_instalada.copy(deep=False)
+    if _varias_fontes(excelPath, sheet_name):
+        return _ler_fontes(excelPath, sheet_name)
+
+    key = _chave_arquivo(excelPath, sheet_name)
+
+    with _workbook_lock:
+        df = _workbook_cache.get(key)
+        if df is None:
+            df = _ler_sidecar(key)
+            if df is None:
+                df = _ler_arquivo(key[0], key[3])
+                _gravar_sidecar(key, df)
+            _workbook_cache[key] = df
+    # cópia rasa: quem atribuir colunas não altera o DataFrame compartilhado
+    return df.copy(deep=False)
 
+# Tipos compactos de carregar_colunas
+COLUNAS_ID = ('dataUserId', 'dataVehicleId', 'dataUserRentalId', 'dataBranchId', 'dataOccurrenceId')
+COLUNAS_CATEGORICAS = ('dataOccurrenceType', 'dataVehiclePlate')
+
+def _ids_compactos(serie):
+    """Ids como Int64 ('-' e vazios viram <NA>); a coluna fica como está se tiver valores não numéricos."""
+    if pd.api.types.is_integer_dtype(serie.dtype):
+        return serie
+    texto = serie.astype('string').str.strip()
+    presentes = serie.notna() & ~texto.isin(['', '-'])
+    numeros = pd.to_numeric(serie.where(presentes), errors='coerce')
+    if numeros[presentes].isna().any() or (numeros.dropna() % 1 != 0).any():
+        return serie
+    return numeros.astype('Int64')
+
+def compactar_tipos(df):
+    """Ids em Int64 e placa/tipo de ocorrência como categoria (cópia rasa; df não é alterado)."""
+    df = df.copy(deep=False)
+    for coluna in COLUNAS_ID:
+        if coluna in df.columns:
+            df[coluna] = _ids_compactos(df[coluna])
+    for coluna in COLUNAS_CATEGORICAS:
+        if coluna in df.columns and not isinstance(df[coluna].dtype, pd.CategoricalDtype):
+            df[coluna] = df[coluna].astype('category')
+    return df
+
+def carregar_colunas(colunas, excelPath=None, sheet_name=None):
+    """
+    Lê de uma só vez as colunas pedidas, sem materializar as demais (usecols), com tipos
+    compactos: ids como Int64 e dataOccurrenceType/dataVehiclePlate como categoria.
+    Colunas que não existem na planilha ficam de fora do resultado. Usa 'excel', 'excelPage',
+    a planilha instalada e os caches em memória/disco como read_workbook.
+    """
+    colunas = tuple(dict.fromkeys(colunas))
+    if _planilha_instalada is not None:
+        return compactar_tipos(_planilha_instalada[[c for c in colunas if c in _planilha_instalada.columns]])
+    if _varias_fontes(excelPath, sheet_name):
+        # a deduplicação entre as fontes precisa das colunas da chave: parte da junção completa
+        df = _ler_fontes(excelPath, sheet_name)
+        return compactar_tipos(df[[c for c in colunas if c in df.columns]])
+
+    key_arquivo = _chave_arquivo(excelPath, sheet_name)
+    key = key_arquivo + (colunas,)
+
+    completo = None
+    with _workbook_lock:
+        df = _workbook_cache.get(key)
+        if df is None:
+            completo = _workbook_cache.get(key_arquivo)
+            if completo is None:
+                # colunas já lidas nesta execução que incluem as pedidas (ex.: a pré-carga do runner)
+                completo = next((lido for chave, lido in _workbook_cache.items()
+                                 if chave[:-1] == key_arquivo and len(chave) == len(key)
+                                 and set(colunas) <= set(chave[-1])), None)
+            if completo is None:
+                df = _ler_sidecar(key)
+                if df is None:
+                    df = _ler_arquivo(key_arquivo[0], key_arquivo[3], usecols=lambda c: c in colunas)
+                    df = compactar_tipos(df[[c for c in colunas if c in df.columns]])
+                    _gravar_sidecar(key, df)
+                _workbook_cache[key] = df
+    if completo is not None:
+        # a planilha (ou um conjunto maior de colunas) já foi lida nesta execução: só recorta,
+        # sem guardar o recorte no cache (seria mais uma cópia ao lado da leitura maior)
+        return compactar_tipos(completo[[c for c in colunas if c in completo.columns]])
+    return df.copy(deep=False)
+
+def _valor_da_celula(valor):
+    """Normaliza uma célula lida linha a linha: texto sem espaços nas pontas, vazio -> None, 10.0 -> 10."""
+    if isinstance(valor, str):
+        valor = valor.strip()
+        return valor or None
+    if isinstance(valor, float) and valor.is_integer():
+        return int(valor)
+    return valor
+
+def _calamine_disponivel():
+    """python-calamine instalado e pandas com o engine 'calamine' (2.2+)."""
+    versao = tuple(int(p) for p in pd.__version__.split('.')[:2] if p.isdigit())
+    return versao >= (2, 2) and importlib.util.find_spec('python_calamine') is not None
+
+def engine_excel():
+    """
+    Engine do read_excel: 'excelEngine' do .env (calamine, openpyxl, ...) ou, em 'auto'/não definido,
+    calamine quando instalado (bem mais rápido) e senão o padrão do pandas (openpyxl para .xlsx).
+    """
+    escolhida = os.getenv('excelEngine', '').strip().lower()
+    if escolhida == 'calamine' and not _calamine_disponivel():
+        print("⚠️  excelEngine=calamine, mas python-calamine não está instalado (pip install python-calamine); usando openpyxl")
+        return None
+    if escolhida and escolhida != 'auto':
+        return escolhida
+    return 'calamine' if _calamine_disponivel() else None
+
+def _ler_excel(excelPath, sheet_arg, usecols=None):
+    engine = engine_excel()
     try:
-        df = pd.read_excel(excelPath, sheet_name=sheet_arg)
-    except ValueError as e:
+        return pd.read_excel(excelPath, sheet_name=sheet_arg, usecols=usecols, engine=engine)
+    except ValueError:
         # se a sheet nomeada não existir, tentar a primeira aba (índice 0)
-        try:
-            df = pd.read_excel(excelPath, sheet_name=0)
-        except Exception:
-            raise
+        return pd.read_excel(excelPath, sheet_name=0, usecols=usecols, engine=engine)
+
+def _registros_excel(excelPath, sheet_arg):
+    """
+    Linhas da aba como dicts, lidas em modo read-only do openpyxl (uma linha por vez em memória).
+    Aqui não se usa o calamine: ele carrega a aba inteira antes da primeira linha.
+    """
+    from openpyxl import load_workbook
+
+    wb = load_workbook(excelPath, read_only=True, data_only=True)
+    try:
+        if isinstance(sheet_arg, int):
+            ws = wb.worksheets[sheet_arg] if sheet_arg < len(wb.worksheets) else wb.worksheets[0]
+        else:
+            # se a sheet nomeada não existir, usa a primeira aba (como read_workbook)
+            ws = wb[sheet_arg] if sheet_arg in wb.sheetnames else wb.worksheets[0]
+        linhas = ws.iter_rows(values_only=True)
+        cabecalho = next(linhas, None)
+        if cabecalho is None:
+            return
+        nomes = [str(c).strip() if c is not None else f"Unnamed: {i}" for i, c in enumerate(cabecalho)]
+        for valores in linhas:
+            if all(v is None for v in valores):
+                continue
+            yield dict(zip(nomes, valores))
+    finally:
+        wb.close()
+
+def _ler_csv(excelPath, sheet_arg=None, usecols=None):
+    return pd.read_csv(excelPath, usecols=usecols)
+
+def _registros_csv(excelPath, sheet_arg=None):
+    import csv
+
+    with open(excelPath, newline='', encoding='utf-8-sig') as f:
+        yield from csv.DictReader(f)
+
+def _ler_jsonl(excelPath, sheet_arg=None, usecols=None):
+    df = pd.read_json(excelPath, lines=True)
+    return df[[c for c in df.columns if usecols(c)]] if usecols else df
+
+def _registros_jsonl(excelPath, sheet_arg=None):
+    import json
+
+    with open(excelPath, encoding='utf-8') as f:
+        for linha in f:
+            if linha.strip():
+                yield json.loads(linha)
+
+def _pyarrow_parquet():
+    """pyarrow.parquet, ou ValueError explicando como instalar (dependência opcional, só para .parquet)."""
+    try:
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ValueError("Leitura de .parquet requer o pacote pyarrow (pip install pyarrow)")
+    return pq
+
+def _ler_parquet(excelPath, sheet_arg=None, usecols=None):
+    pq = _pyarrow_parquet()
+    colunas = None
+    if usecols:
+        # só as colunas pedidas saem do arquivo (formato colunar)
+        colunas = [c for c in pq.read_schema(excelPath).names if usecols(c)]
+    return pq.read_table(excelPath, columns=colunas).to_pandas()
+
+def _registros_parquet(excelPath, sheet_arg=None):
+    arquivo = _pyarrow_parquet().ParquetFile(excelPath)
+    try:
+        for lote in arquivo.iter_batches(batch_size=1024):
+            yield from lote.to_pylist()
+    finally:
+        arquivo.close()
+
+# Formatos de entrada por extensão: (leitura inteira em DataFrame, leitura linha a linha em dicts).
+# Extensões fora da tabela (.xlsx, .xls, .xlsm) são lidas como Excel.
+FORMATOS_ENTRADA = {
+    '.csv': (_ler_csv, _registros_csv),
+    '.jsonl': (_ler_jsonl, _registros_jsonl),
+    '.parquet': (_ler_parquet, _registros_parquet),
+}
+
+def registrar_formato(extensao, ler, registros):
+    """
+    Adiciona (ou substitui) o leitor de uma extensão. ler(caminho, aba, usecols) devolve o DataFrame;
+    registros(caminho, aba) gera um dict por linha.
+    """
+    FORMATOS_ENTRADA[extensao.lower()] = (ler, registros)
+
+def _formato(excelPath):
+    return FORMATOS_ENTRADA.get(os.path.splitext(excelPath)[1].lower(), (_ler_excel, _registros_excel))
+
+def extensoes_entrada():
+    """Extensões aceitas como planilha de entrada."""
+    return ('.xlsx', '.xls', '.xlsm') + tuple(FORMATOS_ENTRADA)
+
+def iterar_linhas(excelPath=None, sheet_name=None):
+    """
+    Gera (índice, linha) como df.iterrows(), mas lendo a planilha aos poucos: cada linha (pd.Series)
+    sai assim que é lida, então quem consome começa a trabalhar na primeira enquanto o resto do
+    arquivo ainda está sendo lido, e a memória não cresce com o tamanho da exportação.
+    Usa a planilha instalada ou a já carregada em memória quando houver; os valores são normalizados
+    por _valor_da_celula.
+    """
+    if _planilha_instalada is not None:
+        yield from _planilha_instalada.iterrows()
+        return
+    if _varias_fontes(excelPath, sheet_name):
+        # fonte após fonte; a chave repetida entre elas é descartada por quem consome (streaming.chaves_unicas)
+        indice = 0
+        for caminho, aba in fontes_entrada(excelPath, sheet_name):
+            origem = _nome_fonte(caminho, aba)
+            for _, row in iterar_linhas(caminho, aba):
+                row[COLUNA_ORIGEM] = origem
+                yield indice, row
+                indice += 1
+        return
+
+    key = _chave_arquivo(excelPath, sheet_name)
+    with _workbook_lock:
+        completo = _workbook_cache.get(key)
+    if completo is not None:
+        yield from completo.iterrows()
+        return
+
+    excelPath, sheet_arg = key[0], key[3]
+    registros = _formato(excelPath)[1](excelPath, sheet_arg)
+    for indice, registro in enumerate(registros):
+        yield indice, pd.Series({coluna: _valor_da_celula(v) for coluna, v in registro.items()}, dtype=object)
+
+
+def _caminho_entrada(excelPath):
+    return resolve_excel_path(excelPath or os.getenv('excel') or os.getenv('excelPath'))
+
+def _varias_fontes(excelPath, sheet_name):
+    """True quando a entrada é uma pasta de planilhas ou todas as abas ('*') de uma pasta de trabalho."""
+    caminho = _caminho_entrada(excelPath)
+    sheet_arg = _sheet_from_env() if sheet_name is None else sheet_name
+    return bool(caminho) and (os.path.isdir(caminho) or sheet_arg == TODAS_AS_ABAS)
+
+def _abas(excelPath, sheet_arg):
+    """Abas a ler do arquivo: com '*', todas as da pasta de trabalho Excel (CSV, JSONL e Parquet têm uma só)."""
+    if sheet_arg != TODAS_AS_ABAS:
+        return [sheet_arg]
+    if _formato(excelPath)[0] is not _ler_excel:
+        return [0]
+    with pd.ExcelFile(excelPath, engine=engine_excel()) as livro:
+        return list(livro.sheet_names)
+
+def fontes_entrada(excelPath=None, sheet_name=None):
+    """
+    [(arquivo, aba)] que a execução lê. 'excel' pode ser um arquivo ou uma pasta: da pasta entram todas as
+    planilhas de entrada (extensoes_entrada), da exportação mais recente para a mais antiga. excelPage='*'
+    lê todas as abas de cada pasta de trabalho. Lança ValueError quando não há o que ler.
+    """
+    caminho = _caminho_entrada(excelPath)
+    sheet_arg = _sheet_from_env() if sheet_name is None else sheet_name
+    if caminho and os.path.isdir(caminho):
+        extensoes = extensoes_entrada()
+        with os.scandir(caminho) as entradas:
+            # ~$arquivo.xlsx é o lock do Excel; ocultos costumam ser temporários de cópia
+            arquivos = [
+                (entrada.stat().st_mtime_ns, entrada.name, entrada.path) for entrada in entradas
+                if entrada.is_file() and not entrada.name.startswith(('~$', '.'))
+                and os.path.splitext(entrada.name)[1].lower() in extensoes
+            ]
+        if not arquivos:
+            raise ValueError(f"Nenhuma planilha de entrada ({', '.join(extensoes)}) em {caminho}")
+        caminhos = [path for _, _, path in sorted(arquivos, key=lambda a: (-a[0], a[1]))]
+    elif caminho and os.path.exists(caminho):
+        caminhos = [caminho]
+    else:
+        raise ValueError(f"Caminho do arquivo Excel inválido ou não encontrado: {caminho}")
+    return [(path, aba) for path in caminhos for aba in _abas(path, sheet_arg)]
+
+def _nome_fonte(caminho, aba):
+    return f"{os.path.basename(caminho)}:{aba}"
+
+def deduplicar_fontes(partes):
+    """
+    Junta os DataFrames das fontes, na ordem. Uma chave PLACA_USERID que já apareceu numa fonte anterior
+    é descartada nas seguintes (exportações regionais que se sobrepõem); dentro de uma mesma fonte as
+    linhas ficam como estão. Retorna (DataFrame, quantidade de linhas descartadas).
+    """
+    from src.utils.ocorrencia import chaves
+
+    vistas = set()
+    mantidas = []
+    descartadas = 0
+    for parte in partes:
+        chaves_parte = chaves(parte)
+        mascara = [not (chave and chave in vistas) for chave in chaves_parte]
+        descartadas += mascara.count(False)
+        vistas.update(chave for chave in chaves_parte if chave)
+        mantidas.append(parte[mascara])
+    if not mantidas:
+        return pd.DataFrame(), 0
+    return pd.concat(mantidas, ignore_index=True), descartadas
+
+def _ler_fontes(excelPath, sheet_name):
+    """Todas as fontes juntas e sem chaves repetidas entre elas; cada fonte usa os caches de read_workbook."""
+    fontes = fontes_entrada(excelPath, sheet_name)
+    key = ('fontes',) + tuple(_chave_arquivo(caminho, aba) for caminho, aba in fontes)
+    with _workbook_lock:
+        df = _workbook_cache.get(key)
+    if df is None:
+        partes = []
+        for caminho, aba in fontes:
+            parte = read_workbook(caminho, aba)
+            parte[COLUNA_ORIGEM] = _nome_fonte(caminho, aba)
+            partes.append(parte)
+        df, descartadas = deduplicar_fontes(partes)
+        print(f"📚 {len(fontes)} fontes: {len(df)} linhas, {descartadas} com chave repetida entre fontes descartadas")
+        with _workbook_lock:
+            df = _workbook_cache.setdefault(key, df)
+    return df.copy(deep=False)
+
+def searchExcel(column_name, excelPath=None):
+    """
+    Lê a planilha definida em .env (variável 'excel') e retorna a lista da coluna.
+    Se excelPath for fornecido, usa-o (aceita relativo ao projeto).
+    Para várias colunas prefira carregar_colunas, que lê todas de uma vez e só as pedidas.
+    """
+    # evita import circular de dotenv aqui - espera-se que .env já esteja carregado
+    df = read_workbook(excelPath)
     if column_name not in df.columns:
         return []
-    # limpa valores NaN e converte para string
-    return [x for x in df[column_name].fillna('').tolist()]
\ No newline at end of file
+    # limpa valores NaN e converte para string; object antes do fillna: a planilha instalada
+    # pode ter os tipos compactos de carregar_colunas (Int64 e categoria não aceitam '')
+    return [x for x in df[column_name].astype(object).fillna('').tolist()]
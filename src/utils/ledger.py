@@ -0,0 +1,231 @@
+"""Registro (ledger) de documentos já produzidos, por chave e tipo de documento.
+
+Cada etapa grava aqui o status, o caminho, o tamanho e o checksum do arquivo de
+cada (chave, tipo). Com a retomada ativa (`python main.py --retomar` ou
+`retomar=1` no .env) as pastas de saída não são limpas e tudo o que já foi
+concluído é pulado, então uma execução interrompida continua de onde parou.
+"""
+from __future__ import annotations
+
+import hashlib
+import os
+import sqlite3
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Optional
+
+from src.utils.ocorrencia import normalizar_id, normalizar_placa
+
+LEDGER_PADRAO = Path(__file__).resolve().parents[2] / "src" / "output" / "ledger.sqlite3"
+
+STATUS_OK = "ok"
+STATUS_FALHA = "falha"
+
+
+def _env_ativo(nome) -> bool:
+    return os.getenv(nome, '').strip().lower() in ('1', 'true', 'sim', 's', 'yes')
+
+
+def retomada_ativa() -> bool:
+    """True quando a execução deve retomar a anterior (não limpa pastas e pula o que já foi feito)."""
+    return _env_ativo('retomar')
+
+
+def incremental_ativo() -> bool:
+    """True no modo incremental (só as linhas novas/alteradas da planilha são processadas)."""
+    return _env_ativo('incremental')
+
+
+def manter_pastas() -> bool:
+    """As pastas de saída são mantidas (não limpas) na retomada e no modo incremental."""
+    return retomada_ativa() or incremental_ativo()
+
+
+def checksum_arquivo(caminho) -> str:
+    h = hashlib.sha256()
+    with open(caminho, 'rb') as f:
+        for bloco in iter(lambda: f.read(1024 * 1024), b''):
+            h.update(bloco)
+    return h.hexdigest()
+
+
+class Ledger:
+    """Ledger em SQLite; seguro para várias threads (e processos, via lock do próprio SQLite)."""
+
+    def __init__(self, caminho=None):
+        self.caminho = Path(caminho or os.getenv('ledgerPath') or LEDGER_PADRAO)
+        self.caminho.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.caminho), timeout=30, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS documentos (
+                    chave TEXT NOT NULL,
+                    tipo_doc TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    caminho TEXT,
+                    tamanho INTEGER,
+                    checksum TEXT,
+                    erro TEXT,
+                    atualizado_em TEXT NOT NULL,
+                    PRIMARY KEY (chave, tipo_doc)
+                )
+                """
+            )
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS fingerprints (
+                    chave TEXT PRIMARY KEY,
+                    fingerprint TEXT NOT NULL,
+                    atualizado_em TEXT NOT NULL
+                )
+                """
+            )
+
+    def registrar(self, chave, tipo_doc, caminho=None, erro=None) -> bool:
+        """
+        Grava o resultado de (chave, tipo_doc). Com um arquivo existente e não vazio o status é 'ok'
+        (com tamanho e checksum); caso contrário 'falha'. Retorna True quando ficou 'ok'.
+        """
+        tamanho = checksum = None
+        status = STATUS_FALHA
+        if caminho and os.path.isfile(caminho) and os.path.getsize(caminho) > 0:
+            tamanho = os.path.getsize(caminho)
+            checksum = checksum_arquivo(caminho)
+            status = STATUS_OK
+        elif caminho and not erro:
+            erro = "arquivo não gerado"
+
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO documentos VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (str(chave), str(tipo_doc), status, str(caminho) if caminho else None,
+                 tamanho, checksum, erro, datetime.now().isoformat(timespec='seconds')),
+            )
+        return status == STATUS_OK
+
+    def concluido(self, chave, tipo_doc) -> Optional[str]:
+        """
+        Caminho do documento se (chave, tipo_doc) terminou com sucesso e o arquivo continua
+        no disco com o mesmo tamanho; None caso contrário.
+        """
+        with self._lock:
+            linha = self._conn.execute(
+                "SELECT status, caminho, tamanho FROM documentos WHERE chave = ? AND tipo_doc = ?",
+                (str(chave), str(tipo_doc)),
+            ).fetchone()
+        if not linha or linha[0] != STATUS_OK or not linha[1]:
+            return None
+        status, caminho, tamanho = linha
+        try:
+            if os.path.getsize(caminho) != tamanho:
+                return None
+        except OSError:
+            return None
+        return caminho
+
+    def documentos_ok(self) -> dict:
+        """{(chave, tipo_doc): (caminho, tamanho)} de todos os documentos concluídos, numa única consulta."""
+        with self._lock:
+            linhas = self._conn.execute(
+                "SELECT chave, tipo_doc, caminho, tamanho FROM documentos WHERE status = ?", (STATUS_OK,)
+            ).fetchall()
+        return {(chave, tipo_doc): (caminho, tamanho) for chave, tipo_doc, caminho, tamanho in linhas}
+
+    def esquecer(self, chave, tipo_doc) -> None:
+        """Remove o registro de (chave, tipo_doc), que volta a ser processado."""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "DELETE FROM documentos WHERE chave = ? AND tipo_doc = ?", (str(chave), str(tipo_doc))
+            )
+
+    def fingerprints(self) -> dict:
+        """{chave: fingerprint} das linhas concluídas em execuções anteriores."""
+        with self._lock:
+            return dict(self._conn.execute("SELECT chave, fingerprint FROM fingerprints").fetchall())
+
+    def salvar_fingerprints(self, fingerprints: dict) -> None:
+        agora = datetime.now().isoformat(timespec='seconds')
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO fingerprints VALUES (?, ?, ?)",
+                [(str(chave), fp, agora) for chave, fp in fingerprints.items()],
+            )
+
+    def resumo(self) -> dict:
+        """{tipo_doc: {status: quantidade}}"""
+        with self._lock:
+            linhas = self._conn.execute(
+                "SELECT tipo_doc, status, COUNT(*) FROM documentos GROUP BY tipo_doc, status"
+            ).fetchall()
+        resumo = {}
+        for tipo_doc, status, quantidade in linhas:
+            resumo.setdefault(tipo_doc, {})[status] = quantidade
+        return resumo
+
+    def desde(self, inicio) -> dict:
+        """{tipo_doc: {'ok': n, 'falha': n, 'bytes': soma}} dos registros gravados a partir de `inicio` (ISO)."""
+        with self._lock:
+            linhas = self._conn.execute(
+                "SELECT tipo_doc, status, COUNT(*), COALESCE(SUM(tamanho), 0) FROM documentos "
+                "WHERE atualizado_em >= ? GROUP BY tipo_doc, status",
+                (str(inicio),),
+            ).fetchall()
+        contagem = {}
+        for tipo_doc, status, quantidade, tamanho in linhas:
+            dados = contagem.setdefault(tipo_doc, {STATUS_OK: 0, STATUS_FALHA: 0, 'bytes': 0})
+            dados[status] = quantidade
+            dados['bytes'] += tamanho
+        return contagem
+
+    def fechar(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+_shared_ledger: Optional[Ledger] = None
+_shared_lock = threading.Lock()
+
+
+def get_ledger() -> Ledger:
+    """Retorna o ledger compartilhado pelo processo."""
+    global _shared_ledger
+    with _shared_lock:
+        if _shared_ledger is None:
+            _shared_ledger = Ledger()
+        return _shared_ledger
+
+
+def ja_concluido(chave, tipo_doc) -> bool:
+    """Na retomada, True (e avisa) quando (chave, tipo_doc) já foi concluído numa execução anterior."""
+    if not retomada_ativa():
+        return False
+    caminho = get_ledger().concluido(chave, tipo_doc)
+    if caminho:
+        print(f"⏭️  {tipo_doc} {chave} já concluído: {caminho}")
+        return True
+    return False
+
+
+def registrar_documento(chave, tipo_doc, caminho=None, erro=None) -> bool:
+    """Registra o resultado no ledger compartilhado e emite o evento de progresso; falhas do ledger não interrompem a etapa."""
+    from src.utils.eventos import emitir_documento
+
+    try:
+        ok = get_ledger().registrar(chave, tipo_doc, caminho, erro)
+    except Exception as e:
+        print(f"⚠️  Falha ao registrar {tipo_doc} {chave} no ledger: {e}")
+        ok = False
+    emitir_documento(chave, tipo_doc, ok, caminho, erro)
+    return ok
+
+
+def chave_documento(placa, identificador=None) -> str:
+    """Chave PLACA_ID usada nos nomes dos arquivos ('abc1234', 10.0 -> 'ABC1234_10'); só a placa sem id."""
+    placa = normalizar_placa(placa)
+    if identificador is None:
+        return placa
+    return f"{placa}_{normalizar_id(identificador)}"
@@ -0,0 +1,234 @@
+"""Registro canônico de uma linha da planilha (ocorrência).
+
+Placa, ids e tipo de ocorrência são normalizados uma única vez, coluna a
+coluna sobre a planilha inteira, e as etapas (plano, streaming, documento
+gerado, merge, incremental, shards) leem o mesmo Ocorrencia em vez de limpar
+de novo cada linha do pandas. Assim a chave PLACA_USERID é idêntica em todas.
+"""
+from __future__ import annotations
+
+import re
+from typing import List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+# Textos que a planilha usa para "sem valor"
+VAZIOS = ('', '-', 'None', 'NaN', 'nan', 'NaT', '<NA>')
+
+_DIGITOS = re.compile(r'(\d{3,})')
+
+# Colunas de que a chave, o tipo e as regras do plano dependem
+COLUNAS_OCORRENCIA = ('dataVehiclePlate', 'dataUserId', 'dataVehicleId', 'dataUserRentalId', 'dataOccurrenceType')
+# Todas as colunas que as etapas leem da planilha (as de cima mais as do documento gerado);
+# o pipeline carrega só estas com carregar_colunas e as demais nunca são lidas
+COLUNAS_EXECUCAO = COLUNAS_OCORRENCIA + (
+    'dataOccurenceDate', 'dataOccurenceAddress', 'dataTrackingDate', 'dataTrackingGeolocation',
+    'dataVehicleModel', 'dataVehicleChassis', 'dataOccurrenceBranchDriverName', 'dataNameUser',
+    'dataBranchId', 'dataBranchIdName', 'dataBranchAddress',
+)
+
+
+def _ausente(valor) -> bool:
+    if valor is None:
+        return True
+    try:
+        return bool(pd.isna(valor))
+    except (TypeError, ValueError):
+        return False
+
+
+def normalizar_id(valor) -> str:
+    """'123.0' e 123 -> '123'; texto não numérico fica como está; vazio para valores ausentes."""
+    if _ausente(valor):
+        return ''
+    s = str(valor).strip()
+    if s in VAZIOS:
+        return ''
+    try:
+        return str(int(float(s)))
+    except (ValueError, OverflowError):
+        return s
+
+
+def normalizar_placa(valor) -> str:
+    """' abc1234' -> 'ABC1234'; vazio para valores ausentes."""
+    if _ausente(valor):
+        return ''
+    s = str(valor).strip().upper()
+    return '' if s in ('', '-', 'NONE', 'NAN', 'NAT', '<NA>') else s
+
+
+def normalizar_tipo(valor) -> Optional[int]:
+    """Tipo de ocorrência como int ('1', 1.0 -> 1); None quando ausente ou inválido."""
+    if _ausente(valor):
+        return None
+    try:
+        f = float(str(valor).strip())
+    except (ValueError, OverflowError):
+        return None
+    return int(f) if f.is_integer() else None
+
+
+def _texto(serie) -> pd.Series:
+    """Coluna como texto sem espaços nas pontas, com '' para os vazios."""
+    s = serie.astype('string').str.strip()
+    return s.where(~s.isin(VAZIOS), '').fillna('')
+
+
+def _numerica(serie) -> bool:
+    return pd.api.types.is_numeric_dtype(serie) and not pd.api.types.is_bool_dtype(serie)
+
+
+def normalizar_ids(serie) -> pd.Series:
+    """normalizar_id aplicado à coluna inteira de uma vez."""
+    if _numerica(serie):
+        # colunas numéricas (como o Excel costuma entregar os ids) não passam por texto
+        valores = serie.to_numpy(dtype='float64', na_value=np.nan)
+        texto = np.full(len(valores), '', dtype=object)
+        finitos = np.isfinite(valores)
+        texto[finitos] = [str(int(f)) for f in valores[finitos].tolist()]
+        infinitos = np.isinf(valores)
+        texto[infinitos] = [str(f) for f in valores[infinitos].tolist()]
+        return pd.Series(texto, index=serie.index, dtype=object)
+    s = _texto(serie)
+    numeros = pd.to_numeric(s.where(s != '', None), errors='coerce')
+    # como int(float(s)): qualquer número finito vira inteiro
+    finitos = numeros.notna() & (numeros.abs() < float('inf'))
+    if finitos.any():
+        s = s.copy()
+        s[finitos] = numeros[finitos].map(lambda f: str(int(f)))
+    return s.astype(object)
+
+
+def normalizar_placas(serie) -> pd.Series:
+    """normalizar_placa aplicado à coluna inteira de uma vez."""
+    s = _texto(serie).str.upper()
+    return s.where(~s.isin(('NONE', 'NAN', 'NAT', '<NA>')), '').astype(object)
+
+
+def normalizar_tipos(serie) -> list:
+    """normalizar_tipo aplicado à coluna inteira de uma vez (lista de int ou None)."""
+    if _numerica(serie):
+        numeros = pd.Series(serie.to_numpy(dtype='float64', na_value=np.nan))
+    else:
+        numeros = pd.to_numeric(_texto(serie).replace('', None), errors='coerce')
+    inteiros = numeros.notna() & (numeros % 1 == 0)
+    return [int(f) if ok else None for f, ok in zip(numeros.tolist(), inteiros.tolist())]
+
+
+def digitos_da_linha(valores) -> Optional[str]:
+    """Primeira sequência de 3+ dígitos nas células da linha (último recurso para o userId)."""
+    casamento = _DIGITOS.search(' '.join(str(v) for v in valores if not _ausente(v)))
+    return casamento.group(0) if casamento else None
+
+
+def digitos_das_linhas(df) -> list:
+    """digitos_da_linha de cada linha: as células são unidas coluna a coluna e extraídas com str.extract."""
+    texto = None
+    for coluna in df.columns:
+        parte = df[coluna].astype('string').fillna('')
+        texto = parte if texto is None else texto.str.cat(parte, sep=' ')
+    if texto is None:
+        return [None] * len(df)
+    return [d if isinstance(d, str) else None for d in texto.str.extract(_DIGITOS.pattern, expand=False).tolist()]
+
+
+def chave_de_ocorrencia(placa, user_id, alternativas=(), digitos=None) -> Tuple[Optional[str], str]:
+    """
+    Chave PLACA_USERID a partir de campos já normalizados.
+    Sem userId usa as alternativas [(coluna, id)], na ordem de preferência, e por último os `digitos`
+    encontrados na linha. Retorna (chave, fonte) ou (None, motivo).
+    """
+    usuario, fonte = user_id, 'dataUserId'
+    if not usuario:
+        for coluna, valor in alternativas:
+            if valor:
+                usuario, fonte = valor, coluna
+                break
+    if not usuario and digitos:
+        usuario, fonte = digitos, 'regex'
+    if not usuario:
+        return None, 'userId ausente'
+    if not placa:
+        return None, f"placa ausente. user='{usuario}' (fonte: {fonte})"
+    return f"{placa}_{usuario}", fonte
+
+
+class Ocorrencia:
+    """
+    Uma linha da planilha já normalizada. `linha` guarda a linha original (pd.Series) quando
+    ela foi lida linha a linha, para as etapas que precisam dos outros campos (documento gerado).
+    """
+
+    __slots__ = ('indice', 'placa', 'user_id', 'vehicle_id', 'rental_id', 'tipo', 'chave', 'fonte', 'linha')
+
+    def __init__(self, indice, placa, user_id, vehicle_id, rental_id, tipo, chave, fonte, linha=None):
+        self.indice = indice
+        self.placa = placa
+        self.user_id = user_id
+        self.vehicle_id = vehicle_id
+        self.rental_id = rental_id
+        self.tipo = tipo
+        self.chave = chave
+        self.fonte = fonte
+        self.linha = linha
+
+    @property
+    def chave_usuario(self) -> str:
+        """PLACA_USERID dos documentos do usuário (CNH, contrato, documento gerado), como chave_documento."""
+        return f"{self.placa}_{self.user_id}"
+
+    def __repr__(self) -> str:
+        return (f"Ocorrencia({self.indice!r}, placa={self.placa!r}, user_id={self.user_id!r}, "
+                f"vehicle_id={self.vehicle_id!r}, rental_id={self.rental_id!r}, tipo={self.tipo!r}, chave={self.chave!r})")
+
+
+def ocorrencia_da_linha(row, indice=None) -> Ocorrencia:
+    """Normaliza uma linha avulsa (modo streaming, que lê a planilha linha a linha)."""
+    placa = normalizar_placa(row.get('dataVehiclePlate'))
+    user_id = normalizar_id(row.get('dataUserId'))
+    vehicle_id = normalizar_id(row.get('dataVehicleId'))
+    rental_id = normalizar_id(row.get('dataUserRentalId'))
+    alternativas = (('dataUserRentalId', rental_id), ('dataVehicleId', vehicle_id))
+    digitos = None if user_id or rental_id or vehicle_id else digitos_da_linha(row.values)
+    chave, fonte = chave_de_ocorrencia(placa, user_id, alternativas, digitos)
+    return Ocorrencia(indice, placa, user_id, vehicle_id, rental_id,
+                      normalizar_tipo(row.get('dataOccurrenceType')), chave, fonte, linha=row)
+
+
+def _coluna(df, nome) -> pd.Series:
+    return df[nome] if nome in df.columns else pd.Series([None] * len(df), index=df.index, dtype=object)
+
+
+def ocorrencias(df) -> List[Ocorrencia]:
+    """Ocorrencia de cada linha do DataFrame, na ordem; a normalização roda por coluna, não por linha."""
+    placas = normalizar_placas(_coluna(df, 'dataVehiclePlate')).tolist()
+    users = normalizar_ids(_coluna(df, 'dataUserId')).tolist()
+    vehicles = normalizar_ids(_coluna(df, 'dataVehicleId')).tolist()
+    rentals = normalizar_ids(_coluna(df, 'dataUserRentalId')).tolist()
+    tipos = normalizar_tipos(_coluna(df, 'dataOccurrenceType'))
+
+    # dígitos de qualquer célula só para as linhas sem nenhum id
+    sem_id = [not (u or v or r) for u, v, r in zip(users, vehicles, rentals)]
+    digitos = [None] * len(df)
+    if any(sem_id):
+        posicoes = [p for p, falta in enumerate(sem_id) if falta]
+        for posicao, achados in zip(posicoes, digitos_das_linhas(df.iloc[posicoes])):
+            digitos[posicao] = achados
+
+    registros = []
+    for posicao, indice in enumerate(df.index):
+        placa, user_id, vehicle_id, rental_id = placas[posicao], users[posicao], vehicles[posicao], rentals[posicao]
+        if user_id and placa:
+            chave, fonte = f"{placa}_{user_id}", 'dataUserId'
+        else:
+            alternativas = (('dataUserRentalId', rental_id), ('dataVehicleId', vehicle_id))
+            chave, fonte = chave_de_ocorrencia(placa, user_id, alternativas, digitos[posicao])
+        registros.append(Ocorrencia(indice, placa, user_id, vehicle_id, rental_id, tipos[posicao], chave, fonte))
+    return registros
+
+
+def chaves(df) -> list:
+    """Chave PLACA_USERID de cada linha (None quando a linha não tem chave), na ordem da planilha."""
+    return [ocorrencia.chave for ocorrencia in ocorrencias(df)]
@@ -0,0 +1,11 @@
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def _cache_de_planilhas_temporario(tmp_path, monkeypatch):
+    # as cópias em disco das planilhas lidas nos testes não vão para src/output
+    monkeypatch.setenv("planilhaCachePath", str(tmp_path / "cache_planilhas"))
+    # relatório de linhas rejeitadas na validação prévia
+    monkeypatch.setenv("rejeitadasPath", str(tmp_path / "rejeitadas.csv"))
+    # token do SSO em cache no disco
+    monkeypatch.setenv("tokenCachePath", str(tmp_path / "cache_token"))
@@ -0,0 +1,75 @@
+import pandas as pd
+
+from src.main.pipeline.auditoria import auditar, indexar_arvore, indexar_pasta
+from src.utils.ledger import Ledger
+
+
+def pastas(tmp_path):
+    nomes = {'CNH': 'cnh', 'CRLV': 'crlv', 'CONTRATO': 'contract', 'BO': 'bo', 'DOCUMENTO_GERADO': 'document',
+             'DOSSIE': 'done'}
+    caminhos = {tipo: tmp_path / nome for tipo, nome in nomes.items()}
+    for caminho in caminhos.values():
+        caminho.mkdir()
+    return caminhos
+
+
+def pdf(caminho, conteudo=b"%PDF-1.4 teste"):
+    caminho.parent.mkdir(parents=True, exist_ok=True)
+    caminho.write_bytes(conteudo)
+    return caminho
+
+
+def test_auditar_faltando_extras_e_divergentes(tmp_path, monkeypatch):
+    monkeypatch.delenv("validarPlanilha", raising=False)
+    p = pastas(tmp_path)
+    led = Ledger(tmp_path / "ledger.sqlite3")
+    df = pd.DataFrame({
+        "dataVehiclePlate": ["ABC1234", "DEF5555", "GHI7777"],
+        "dataUserId": [10, "-", 30],
+        "dataVehicleId": [100, 200, 300],
+        "dataUserRentalId": [500, None, None],
+        "dataOccurrenceType": [1, 12, 10],
+    })
+
+    # ABC1234_10 (tipo 1): completo e mesclado
+    for tipo in ('CNH', 'CRLV', 'CONTRATO', 'DOCUMENTO_GERADO'):
+        led.registrar("ABC1234_10", tipo, pdf(p[tipo] / "ABC1234_10.pdf"))
+    led.registrar("ABC1234_10", "DOSSIE", pdf(p['DOSSIE'] / "1_20250101_000000" / "1_ABC1234_20250101_000000.pdf"))
+
+    # DEF5555_200 (tipo 12, sem userId): CRLV só com a placa; documento gerado vazio
+    pdf(p['CRLV'] / "DEF5555.pdf")
+    pdf(p['DOCUMENTO_GERADO'] / "DEF5555_.pdf", b"")
+
+    # GHI7777_30 (tipo 10, leva BO): CNH regravada depois do ledger; falta o BO e o dossiê
+    led.registrar("GHI7777_30", "CNH", pdf(p['CNH'] / "GHI7777_30.pdf"))
+    pdf(p['CNH'] / "GHI7777_30.pdf", b"%PDF-1.4 outro conteudo")
+    pdf(p['CRLV'] / "GHI7777_30.pdf")
+    pdf(p['DOCUMENTO_GERADO'] / "GHI7777_30.pdf")
+
+    # sobras: PDF sem linha na planilha, cópia de incompletos (ignorada) e dossiê antigo
+    pdf(p['CNH'] / "ZZZ0000_99.pdf")
+    pdf(p['DOSSIE'] / "INCOMPLETOS_20250101_000000" / "GHI7777_30" / "CNH_GHI7777_30.pdf")
+    pdf(p['DOSSIE'] / "12_20240101_000000" / "12_XYZ_20240101_000000.pdf")
+
+    relatorio = auditar(df, pastas=p, ledger=led)
+
+    assert relatorio.chaves == 3
+    assert relatorio.faltando == {"DEF5555_200": ["DOSSIE"], "GHI7777_30": ["BO", "DOSSIE"]}
+    assert relatorio.divergentes["DEF5555_200"] == {"DOCUMENTO_GERADO": "DEF5555_.pdf vazio"}
+    assert "ledger registrou" in relatorio.divergentes["GHI7777_30"]["CNH"]
+    assert relatorio.extras["CNH"] == ["ZZZ0000_99.pdf"]
+    assert [caminho.endswith("12_XYZ_20240101_000000.pdf") for caminho in relatorio.extras["DOSSIE"]] == [True]
+    assert not relatorio.consistente()
+
+    salvo = relatorio.salvar(tmp_path / "auditoria.json")
+    assert '"consistente": false' in salvo.read_text(encoding="utf-8")
+
+
+def test_indices_de_pasta_ignoram_o_que_nao_e_pdf(tmp_path):
+    pdf(tmp_path / "a.pdf")
+    pdf(tmp_path / "b.PDF")
+    (tmp_path / "c.tmp").write_bytes(b"x")
+    pdf(tmp_path / "sub" / "d.pdf")
+    assert indexar_pasta(tmp_path) == {"a.pdf": 14, "b.PDF": 14}
+    assert len(indexar_arvore(tmp_path)) == 3
+    assert indexar_pasta(tmp_path / "nao_existe") == {}
@@ -14,4 +14,146 @@ def test_auth_missing_credentials(monkeypatch):
         assert token is None
     finally:
         config.email = old_email
-        config.password = old_password
\ No newline at end of file
+        config.password = old_password
+
+class _RespostaToken:
+    def __init__(self, token, expires_in=300):
+        self._dados = {"access_token": token, "expires_in": expires_in}
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return self._dados
+
+
+def _sso_falso(monkeypatch, atraso=0.0):
+    import time
+
+    from src.settings import auth
+
+    logins = []
+
+    def request_with_timeout(session, method, url, **kwargs):
+        time.sleep(atraso)
+        logins.append(url)
+        return _RespostaToken(f"token-{len(logins)}")
+
+    monkeypatch.setattr(auth, "request_with_timeout", request_with_timeout)
+    monkeypatch.setattr(config, "email", "usuario@exemplo.com")
+    monkeypatch.setattr(config, "password", "senha")
+    return logins
+
+
+def test_token_em_disco_compartilhado_entre_instancias(tmp_path, monkeypatch):
+    import json
+    import os
+    import time
+
+    logins = _sso_falso(monkeypatch)
+
+    # cada Auth faz o papel de um processo diferente no mesmo host
+    assert Auth().get_token() == "token-1"
+    assert Auth().get_token() == "token-1"
+    assert len(logins) == 1
+
+    arquivo = next((tmp_path / "cache_token").glob("token_*.json"))
+    assert "usuario" not in arquivo.name
+    if os.name != "nt":
+        assert arquivo.stat().st_mode & 0o077 == 0
+
+    # vencido no disco: o próximo processo faz o login e grava o novo
+    arquivo.write_text(json.dumps({"access_token": "token-1", "expira_em": time.time() - 1}), encoding="utf-8")
+    assert Auth().get_token() == "token-2"
+    assert len(logins) == 2
+
+    monkeypatch.setenv("tokenCache", "0")
+    assert Auth().get_token() == "token-3"
+
+
+def test_um_login_para_varios_processos_ao_mesmo_tempo(monkeypatch):
+    import threading
+
+    logins = _sso_falso(monkeypatch, atraso=0.2)
+    tokens = []
+
+    def processo():
+        tokens.append(Auth().get_token())
+
+    threads = [threading.Thread(target=processo) for _ in range(5)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len(logins) == 1
+    assert tokens == ["token-1"] * 5
+
+
+def test_lock_ocupado_desiste_no_prazo_e_login_segue_sem_o_cache(tmp_path, monkeypatch):
+    import pytest
+
+    from src.settings import auth
+
+    logins = _sso_falso(monkeypatch)
+    lock = tmp_path / "token.lock"
+    with auth._travado(lock):
+        with pytest.raises(TimeoutError):
+            with auth._travado(lock, espera=0.3):
+                pass
+
+        # o dono do lock travou: o login acontece mesmo assim, sem esperar para sempre
+        monkeypatch.setattr(auth, "ESPERA_LOCK", 0.3)
+        cliente = Auth()
+        monkeypatch.setattr(cliente, "_caminho_cache", lambda: tmp_path / "token.json")
+        assert cliente.get_token() == "token-1"
+    assert len(logins) == 1
+    with auth._travado(lock, espera=0.3):
+        pass
+
+
+def test_renovacao_em_segundo_plano_usa_o_refresh_token(monkeypatch):
+    import time
+
+    from src.settings import auth
+
+    pedidos = []
+
+    class Resposta(_RespostaToken):
+        def __init__(self, status, dados):
+            self.status, self._dados = status, dados
+
+        def raise_for_status(self):
+            if self.status != 200:
+                raise auth.requests.exceptions.HTTPError(f"{self.status}")
+
+    def request_with_timeout(session, method, url, data=None, **kwargs):
+        pedidos.append(dict(data))
+        if data.get("refresh_token") == "refresh-revogado":
+            return Resposta(400, {"error": "invalid_grant"})
+        n = len(pedidos)
+        refresh = "refresh-revogado" if n == 2 else f"refresh-{n}"
+        # 31s - 30s de folga: vale 1s, a thread renova na metade
+        return Resposta(200, {"access_token": f"token-{n}", "expires_in": 31, "refresh_token": refresh,
+                              "refresh_expires_in": 1800})
+
+    monkeypatch.setattr(auth, "request_with_timeout", request_with_timeout)
+    monkeypatch.setattr(auth, "ESPERA_MINIMA", 0.05)
+    monkeypatch.setattr(config, "email", "usuario@exemplo.com")
+    monkeypatch.setattr(config, "password", "senha")
+
+    a = Auth()
+    assert a.get_token() == "token-1"
+    a.iniciar_renovacao()
+    try:
+        prazo = time.time() + 5
+        while len(pedidos) < 4 and time.time() < prazo:
+            time.sleep(0.05)
+    finally:
+        a.parar_renovacao()
+
+    grants = [p["grant_type"] for p in pedidos[:4]]
+    # renova antes de vencer com o refresh_token; recusado, volta para usuário e senha
+    assert grants == ["password", "refresh_token", "refresh_token", "password"]
+    assert pedidos[1]["refresh_token"] == "refresh-1" and "password" not in pedidos[1]
+    assert a.get_token() in ("token-4", "token-5")
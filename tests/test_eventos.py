@@ -0,0 +1,38 @@
+import io
+import json
+
+from src.utils import eventos, ledger
+from src.utils.eventos import PREFIXO, ConsumidorEventos, ler_evento, linha_progresso
+from src.utils.ledger import Ledger, registrar_documento
+
+
+def test_linha_progresso_calcula_taxa_e_eta():
+    assert linha_progresso(50, 100, 20.0, largura=10) == "[#####-----] 50/100 docs | 2.5 docs/s | ETA 00:20"
+    assert linha_progresso(3, None, 1.5, falhas=1) == "3 docs | 1 falhas | 2.0 docs/s"
+
+
+def test_registrar_documento_publica_evento_no_jsonl(tmp_path, monkeypatch):
+    monkeypatch.setattr(ledger, "_shared_ledger", Ledger(tmp_path / "ledger.sqlite3"))
+    pdf = tmp_path / "ABC1234_10.pdf"
+    pdf.write_bytes(b"%PDF-1.4 abc")
+
+    consumidor = ConsumidorEventos(tmp_path / "eventos.jsonl", total=2, saida=io.StringIO()).iniciar()
+    eventos.emitir_etapa('cnh', 'inicio')
+    registrar_documento("ABC1234_10", "CNH", pdf)
+    registrar_documento("XYZ9876_20", "CNH", erro="timeout")
+    consumidor.parar()
+
+    linhas = [json.loads(l) for l in (tmp_path / "eventos.jsonl").read_text(encoding='utf-8').splitlines()]
+    assert [(e['tipo'], e['status']) for e in linhas] == [('etapa', 'inicio'), ('documento', 'ok'), ('documento', 'falha')]
+    assert linhas[1]['bytes'] == pdf.stat().st_size and linhas[1]['duracao_s'] is not None
+    assert (consumidor.feitos, consumidor.falhas) == (2, 1)
+    assert "2/2 docs" in consumidor.saida.getvalue()
+
+
+def test_evento_em_subprocess_sai_no_stdout(monkeypatch, capsys):
+    monkeypatch.setenv("eventosPipe", "1")
+    enviado = eventos.emitir('etapa', 'bo', status='inicio')
+    saida = capsys.readouterr().out
+    assert saida.startswith(PREFIXO)
+    assert ler_evento(saida) == enviado
+    assert ler_evento("linha comum\n") is None
@@ -0,0 +1,244 @@
+import importlib.util
+
+import pandas as pd
+import pytest
+
+from src.utils import fileUtils
+from src.utils.fileUtils import read_workbook, searchExcel
+
+
+def test_read_workbook_parses_once(tmp_path, monkeypatch):
+    p = tmp_path / "planilha.xlsx"
+    pd.DataFrame({"dataVehiclePlate": ["ABC1234"], "dataUserId": [10]}).to_excel(p, index=False)
+    monkeypatch.delenv("excelPage", raising=False)
+
+    calls = []
+    original = pd.read_excel
+
+    def counting_read_excel(*args, **kwargs):
+        calls.append(args)
+        return original(*args, **kwargs)
+
+    monkeypatch.setattr(fileUtils.pd, "read_excel", counting_read_excel)
+    read_workbook(str(p))
+    assert searchExcel("dataVehiclePlate", str(p)) == ["ABC1234"]
+    assert searchExcel("inexistente", str(p)) == []
+    assert len(calls) == 1
+
+
+def test_read_workbook_missing_file(tmp_path):
+    try:
+        read_workbook(str(tmp_path / "nao_existe.xlsx"))
+        assert False, "Expected ValueError for missing workbook"
+    except ValueError:
+        pass
+
+
+def test_instalar_planilha_substitui_arquivo(tmp_path):
+    p = tmp_path / "planilha.xlsx"
+    pd.DataFrame({"dataVehiclePlate": ["ABC1234", "XYZ9876"]}).to_excel(p, index=False)
+    fileUtils.instalar_planilha(pd.DataFrame({"dataVehiclePlate": ["XYZ9876"]}))
+    try:
+        assert searchExcel("dataVehiclePlate", str(p)) == ["XYZ9876"]
+    finally:
+        fileUtils.instalar_planilha(None)
+    assert searchExcel("dataVehiclePlate", str(p)) == ["ABC1234", "XYZ9876"]
+
+
+def test_search_excel_na_planilha_instalada_com_tipos_compactos():
+    df = pd.DataFrame({"dataVehiclePlate": ["ABC1234", None], "dataUserId": [10, None]})
+    fileUtils.instalar_planilha(fileUtils.compactar_tipos(df))
+    try:
+        assert searchExcel("dataUserId") == [10, ""]
+        assert searchExcel("dataVehiclePlate") == ["ABC1234", ""]
+    finally:
+        fileUtils.instalar_planilha(None)
+
+
+def test_read_workbook_reaproveita_copia_em_disco(tmp_path, monkeypatch):
+    p = tmp_path / "planilha.xlsx"
+    pd.DataFrame({"dataVehiclePlate": ["ABC1234"], "dataUserId": [10]}).to_excel(p, index=False)
+    monkeypatch.delenv("excelPage", raising=False)
+    read_workbook(str(p))
+
+    # nova execução: cache em memória vazio, a planilha não é aberta de novo
+    parses = []
+    original = fileUtils._ler_arquivo
+
+    def contando(*args):
+        parses.append(args)
+        return original(*args)
+
+    monkeypatch.setattr(fileUtils, "_workbook_cache", {})
+    monkeypatch.setattr(fileUtils, "_ler_arquivo", contando)
+    assert read_workbook(str(p))["dataVehiclePlate"].tolist() == ["ABC1234"]
+    assert parses == []
+    assert len(list((tmp_path / "cache_planilhas").glob("*.pkl"))) == 1
+
+    # arquivo alterado: nova leitura e a cópia antiga é substituída
+    pd.DataFrame({"dataVehiclePlate": ["XYZ9876", "ABC1234"], "dataUserId": [20, 10]}).to_excel(p, index=False)
+    assert read_workbook(str(p))["dataVehiclePlate"].tolist() == ["XYZ9876", "ABC1234"]
+    assert len(parses) == 1
+    assert len(list((tmp_path / "cache_planilhas").glob("*.pkl"))) == 1
+
+
+def test_carregar_colunas_le_so_as_pedidas_com_tipos_compactos(tmp_path, monkeypatch):
+    p = tmp_path / "planilha.xlsx"
+    pd.DataFrame({
+        "dataVehiclePlate": ["ABC1234", "XYZ9876", "ABC1234"],
+        "dataUserId": ["10", "-", "30"],
+        "dataOccurrenceType": [1, 10, 1],
+        "dataBranchAddress": ["Rua longa 1", "Rua longa 2", "Rua longa 3"],
+    }).to_excel(p, index=False)
+    monkeypatch.delenv("excelPage", raising=False)
+
+    df = fileUtils.carregar_colunas(["dataUserId", "dataVehiclePlate", "dataOccurrenceType", "inexistente"], str(p))
+    assert df.columns.tolist() == ["dataUserId", "dataVehiclePlate", "dataOccurrenceType"]
+    assert str(df["dataUserId"].dtype) == "Int64"
+    assert df["dataUserId"].isna().tolist() == [False, True, False]
+    assert isinstance(df["dataVehiclePlate"].dtype, pd.CategoricalDtype)
+    assert isinstance(df["dataOccurrenceType"].dtype, pd.CategoricalDtype)
+
+    # ids com texto não numérico ficam como estão
+    misturado = fileUtils.compactar_tipos(pd.DataFrame({"dataUserId": ["10", "abc"]}))
+    assert misturado["dataUserId"].tolist() == ["10", "abc"]
+
+
+def test_iterar_linhas_le_aos_poucos_e_normaliza(tmp_path, monkeypatch):
+    monkeypatch.delenv("excelPage", raising=False)
+    dados = pd.DataFrame({"dataVehiclePlate": [" ABC1234 ", "XYZ9876"], "dataUserId": [10.0, 20.0],
+                          "dataBranchAddress": ["Rua 1", ""]})
+    xlsx, csv = tmp_path / "planilha.xlsx", tmp_path / "planilha.csv"
+    dados.to_excel(xlsx, index=False)
+    dados.to_csv(csv, index=False)
+    jsonl = tmp_path / "planilha.jsonl"
+    dados.to_json(jsonl, orient="records", lines=True)
+
+    for caminho in (xlsx, csv, jsonl):
+        linhas = fileUtils.iterar_linhas(str(caminho))
+        indice, primeira = next(linhas)
+        assert indice == 0
+        assert primeira["dataVehiclePlate"] == "ABC1234"
+        if caminho != csv:  # no CSV tudo é texto
+            assert primeira["dataUserId"] == 10
+        resto = list(linhas)
+        assert [i for i, _ in resto] == [1]
+        assert resto[0][1]["dataBranchAddress"] is None
+
+    # com a planilha já carregada em memória não relê o arquivo
+    read_workbook(str(xlsx))
+    monkeypatch.setattr(fileUtils, "_registros_excel", None)
+    assert [row["dataVehiclePlate"].strip() for _, row in fileUtils.iterar_linhas(str(xlsx))] == ["ABC1234", "XYZ9876"]
+
+
+def test_formatos_de_entrada_dao_as_mesmas_ocorrencias(tmp_path, monkeypatch):
+    from src.utils.ocorrencia import ocorrencias
+
+    monkeypatch.delenv("excelPage", raising=False)
+    dados = pd.DataFrame({"dataVehiclePlate": ["abc1234", "XYZ9876"], "dataUserId": [10, None],
+                          "dataUserRentalId": ["-", "777"], "dataOccurrenceType": [1, 4]})
+    xlsx, csv, jsonl = tmp_path / "p.xlsx", tmp_path / "p.csv", tmp_path / "p.jsonl"
+    dados.to_excel(xlsx, index=False)
+    dados.to_csv(csv, index=False)
+    dados.to_json(jsonl, orient="records", lines=True)
+
+    esperado = [(o.chave, o.tipo) for o in ocorrencias(read_workbook(str(xlsx)))]
+    assert esperado == [("ABC1234_10", 1), ("XYZ9876_777", 4)]
+    for caminho in (csv, jsonl):
+        assert [(o.chave, o.tipo) for o in ocorrencias(read_workbook(str(caminho)))] == esperado
+
+
+def test_registrar_formato(tmp_path, monkeypatch):
+    p = tmp_path / "planilha.tsv"
+    p.write_text("dataVehiclePlate\tdataUserId\nABC1234\t10\n", encoding="utf-8")
+    monkeypatch.setitem(fileUtils.FORMATOS_ENTRADA, ".tsv", None)
+    fileUtils.registrar_formato(
+        ".TSV",
+        lambda caminho, aba, usecols=None: pd.read_csv(caminho, sep="\t", usecols=usecols),
+        lambda caminho, aba: iter([{"dataVehiclePlate": "ABC1234", "dataUserId": "10"}]),
+    )
+    assert ".tsv" in fileUtils.extensoes_entrada()
+    assert [row["dataUserId"] for _, row in fileUtils.iterar_linhas(str(p))] == ["10"]
+    assert searchExcel("dataVehiclePlate", str(p)) == ["ABC1234"]
+    assert fileUtils.carregar_colunas(["dataUserId"], str(p))["dataUserId"].tolist() == [10]
+
+
+@pytest.mark.skipif(importlib.util.find_spec("pyarrow") is None, reason="pyarrow não instalado")
+def test_parquet(tmp_path, monkeypatch):
+    monkeypatch.delenv("excelPage", raising=False)
+    p = tmp_path / "planilha.parquet"
+    pd.DataFrame({"dataVehiclePlate": ["ABC1234"], "dataUserId": [10], "extra": ["x"]}).to_parquet(p)
+    assert fileUtils.carregar_colunas(["dataVehiclePlate"], str(p)).columns.tolist() == ["dataVehiclePlate"]
+    assert [row["dataUserId"] for _, row in fileUtils.iterar_linhas(str(p))] == [10]
+
+
+@pytest.mark.skipif(importlib.util.find_spec("pyarrow") is not None, reason="pyarrow instalado")
+def test_parquet_sem_pyarrow(tmp_path):
+    p = tmp_path / "planilha.parquet"
+    p.write_bytes(b"PAR1")
+    with pytest.raises(ValueError, match="pyarrow"):
+        read_workbook(str(p))
+
+
+def test_engine_excel_automatico_e_forcado(tmp_path, monkeypatch):
+    monkeypatch.delenv("excelEngine", raising=False)
+    monkeypatch.setattr(fileUtils, "_calamine_disponivel", lambda: True)
+    assert fileUtils.engine_excel() == "calamine"
+    monkeypatch.setenv("excelEngine", "openpyxl")
+    assert fileUtils.engine_excel() == "openpyxl"
+
+    # calamine pedido mas não instalado: volta para o padrão do pandas
+    monkeypatch.setattr(fileUtils, "_calamine_disponivel", lambda: False)
+    monkeypatch.setenv("excelEngine", "calamine")
+    assert fileUtils.engine_excel() is None
+    monkeypatch.setenv("excelEngine", "auto")
+    assert fileUtils.engine_excel() is None
+
+    monkeypatch.delenv("excelPage", raising=False)
+    monkeypatch.setenv("excelEngine", "openpyxl")
+    engines = []
+    original = pd.read_excel
+    monkeypatch.setattr(fileUtils.pd, "read_excel", lambda *a, **k: engines.append(k.get("engine")) or original(*a, **k))
+    p = tmp_path / "planilha.xlsx"
+    pd.DataFrame({"dataVehiclePlate": ["ABC1234"]}).to_excel(p, index=False)
+    assert searchExcel("dataVehiclePlate", str(p)) == ["ABC1234"]
+    assert engines == ["openpyxl"]
+
+
+def test_pasta_e_todas_as_abas_juntam_as_fontes_sem_chaves_repetidas(tmp_path, monkeypatch):
+    import os
+
+    monkeypatch.delenv("excelPage", raising=False)
+    pasta = tmp_path / "exportacoes"
+    pasta.mkdir()
+    antiga = pasta / "sul.xlsx"
+    with pd.ExcelWriter(antiga) as livro:
+        pd.DataFrame({"dataVehiclePlate": ["AAA1111", "BBB2222"], "dataUserId": [1, 2]}).to_excel(livro, sheet_name="A", index=False)
+        pd.DataFrame({"dataVehiclePlate": ["CCC3333"], "dataUserId": [3]}).to_excel(livro, sheet_name="B", index=False)
+    recente = pasta / "sudeste.csv"
+    # a mesma chave duas vezes na mesma fonte continua; BBB2222_2 também está na exportação antiga
+    pd.DataFrame({"dataVehiclePlate": ["BBB2222", "DDD4444", "DDD4444"], "dataUserId": [2, 4, 4]}).to_csv(recente, index=False)
+    os.utime(antiga, ns=(1_000_000_000, 1_000_000_000))
+    (pasta / "~$sul.xlsx").write_bytes(b"lock")
+
+    assert [os.path.basename(c) for c, _ in fileUtils.fontes_entrada(str(pasta))] == ["sudeste.csv", "sul.xlsx"]
+
+    df = read_workbook(str(pasta))
+    assert df["dataVehiclePlate"].tolist() == ["BBB2222", "DDD4444", "DDD4444", "AAA1111"]
+    assert df["origem"].tolist() == ["sudeste.csv:0"] * 3 + ["sul.xlsx:0"]
+    assert fileUtils.carregar_colunas(["dataUserId"], str(pasta))["dataUserId"].tolist() == [2, 4, 4, 1]
+
+    # todas as abas: a aba B entra também
+    monkeypatch.setenv("excelPage", fileUtils.TODAS_AS_ABAS)
+    assert searchExcel("dataVehiclePlate", str(antiga)) == ["AAA1111", "BBB2222", "CCC3333"]
+    assert read_workbook(str(pasta))["dataVehiclePlate"].tolist() == ["BBB2222", "DDD4444", "DDD4444", "AAA1111", "CCC3333"]
+
+    # streaming: fonte após fonte, com a origem de cada linha
+    linhas = list(fileUtils.iterar_linhas(str(pasta)))
+    assert [i for i, _ in linhas] == list(range(6))
+    assert [row["origem"] for _, row in linhas][-3:] == ["sul.xlsx:A", "sul.xlsx:A", "sul.xlsx:B"]
+
+    vazia = tmp_path / "vazia"
+    vazia.mkdir()
+    with pytest.raises(ValueError, match="Nenhuma planilha"):
+        read_workbook(str(vazia))
@@ -15,4 +15,127 @@ def test_request_with_timeout_invalid_url():
     except requests.exceptions.RequestException:
         assert True
     except Exception:
-        assert False, 'Unexpected exception type'
\ No newline at end of file
+        assert False, 'Unexpected exception type'
+
+class _Resposta:
+    def __init__(self, status_code, dados=None):
+        self.status_code = status_code
+        self._dados = dados or {}
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return self._dados
+
+    def close(self):
+        pass
+
+
+class _ApiFalsa:
+    """Sessão que recusa (401) os tokens da lista e registra o token de cada requisição."""
+
+    def __init__(self, recusados):
+        self.recusados = recusados
+        self.tokens = []
+
+    def request(self, method, url, timeout=None, headers=None, **kwargs):
+        token = (headers or {}).get('Authorization', '').replace('Bearer ', '')
+        self.tokens.append(token)
+        return _Resposta(401 if token in self.recusados else 200)
+
+
+def test_401_renova_uma_vez_e_repete_a_requisicao(monkeypatch):
+    import threading
+    import time
+
+    from src.settings import auth as auth_mod
+    from src.settings.auth import Auth
+    from src.settings.config import config
+    from src.settings.http import request_autenticado
+
+    logins = []
+
+    def login(session, method, url, **kwargs):
+        time.sleep(0.1)
+        logins.append(url)
+        return _Resposta(200, {"access_token": f"token-{len(logins)}", "expires_in": 300})
+
+    monkeypatch.setattr(auth_mod, "request_with_timeout", login)
+    monkeypatch.setattr(config, "email", "usuario@exemplo.com")
+    monkeypatch.setattr(config, "password", "senha")
+
+    auth = Auth()
+    assert auth.get_token() == "token-1"
+
+    # a API passa a recusar o token-1 (revogado antes do vencimento): 50 workers recebem 401 juntos
+    api = _ApiFalsa({"token-1"})
+    status = []
+    threads = [threading.Thread(target=lambda: status.append(
+        request_autenticado(api, 'GET', 'http://api/x', auth=auth).status_code)) for _ in range(50)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert status == [200] * 50
+    assert len(logins) == 2
+    assert api.tokens.count("token-2") == 50
+
+    # recusado também depois de renovado: repete uma vez só e devolve o 401
+    api = _ApiFalsa({"token-2", "token-3"})
+    assert request_autenticado(api, 'GET', 'http://api/x', auth=auth).status_code == 401
+    assert api.tokens == ["token-2", "token-3"]
+
+
+def test_pool_por_grupo_de_hosts(monkeypatch):
+    from src.settings.http import AdaptadorPorHost, get_session, grupo_do_host
+
+    assert grupo_do_host("sso.mottu.cloud") == "sso"
+    assert grupo_do_host("operation-backend.mottu.cloud") == "backend"
+    assert grupo_do_host("user-management.mottu.cloud") == "user-management"
+    assert grupo_do_host("meu-bucket.s3.sa-east-1.amazonaws.com") == "s3"
+    assert grupo_do_host("api.geoapify.com") == "geoapify"
+    assert grupo_do_host("exemplo.com") == "outros"
+
+    monkeypatch.setenv("httpPoolUserManagement", "3")
+    s = create_session(retries=1)
+    adapter = s.get_adapter("https://user-management.mottu.cloud/v1/users")
+    assert isinstance(adapter, AdaptadorPorHost)
+    pool = adapter.adaptador("https://user-management.mottu.cloud/v1/users")
+    assert pool._pool_maxsize == 3
+    assert adapter.adaptador("https://api.geoapify.com/v1") is not pool
+    assert isinstance(get_session().get_adapter("https://api.geoapify.com/v1"), AdaptadorPorHost)
+
+
+def test_conexoes_reaproveitadas_entre_requisicoes():
+    import http.server
+    import threading
+
+    portas = set()
+
+    class Handler(http.server.BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self):
+            portas.add(self.client_address[1])
+            self.send_response(200)
+            self.send_header("Content-Length", "2")
+            self.end_headers()
+            self.wfile.write(b"ok")
+
+        def log_message(self, *args):
+            pass
+
+    servidor = http.server.ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    try:
+        s = create_session(retries=1)
+        url = f"http://127.0.0.1:{servidor.server_port}/x"
+        for _ in range(20):
+            with request_with_timeout(s, 'GET', url, timeout=5, stream=True) as r:
+                assert r.content == b"ok"
+        assert len(portas) == 1
+        s.close()
+    finally:
+        servidor.shutdown()
@@ -0,0 +1,158 @@
+import asyncio
+import http.server
+import importlib.util
+import threading
+
+import pytest
+from urllib3.exceptions import ConnectTimeoutError
+from urllib3.util.retry import Retry
+
+from src.settings.http_async import create_async_session, espera_retry
+
+sem_httpx = pytest.mark.skipif(importlib.util.find_spec("httpx") is None, reason="httpx não instalado")
+
+
+def test_espera_igual_a_do_urllib3():
+    retry = Retry(total=6, backoff_factor=0.3)
+    for erros in range(1, 7):
+        retry = retry.increment(method="GET", url="/x", error=ConnectTimeoutError())
+        assert espera_retry(0.3, erros) == retry.get_backoff_time()
+    assert espera_retry(100, 10) == Retry.DEFAULT_BACKOFF_MAX
+
+
+
+def test_token_em_cache_nao_vai_para_uma_thread(monkeypatch):
+    from src.settings import http_async
+
+    class _Auth:
+        token = None
+
+        def token_em_cache(self):
+            return self.token
+
+        def get_token(self):
+            self.token = "token-1"
+            return self.token
+
+    class _Resposta:
+        status_code = 200
+
+    cabecalhos = []
+
+    async def request_falso(sessao, method, url, timeout=None, headers=None, **kwargs):
+        cabecalhos.append(headers["Authorization"])
+        return _Resposta()
+
+    threads = []
+    original = asyncio.to_thread
+
+    async def contando(funcao, *args, **kwargs):
+        threads.append(funcao.__name__)
+        return await original(funcao, *args, **kwargs)
+
+    monkeypatch.setattr(http_async, "request_with_timeout_async", request_falso)
+    monkeypatch.setattr(asyncio, "to_thread", contando)
+
+    async def cenario():
+        auth = _Auth()
+        for i in range(3):
+            await http_async.request_autenticado_async(None, "GET", f"http://api/{i}", auth=auth)
+
+    asyncio.run(cenario())
+    # só o primeiro pedido (sem token em memória) faz o login numa thread
+    assert threads == ["get_token"]
+    assert cabecalhos == ["Bearer token-1"] * 3
+
+
+class _Servidor:
+    """API local: /instavel responde 502 nas duas primeiras vezes; /arquivo devolve 1 MB."""
+
+    def __init__(self):
+        self.pedidos = []
+        self.portas = set()
+        servidor = self
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def _responder(self, status, corpo=b"ok"):
+                servidor.pedidos.append((self.command, self.path))
+                servidor.portas.add(self.client_address[1])
+                self.send_response(status)
+                self.send_header("Content-Length", str(len(corpo)))
+                self.end_headers()
+                self.wfile.write(corpo)
+
+            def do_GET(self):
+                if self.path == "/instavel":
+                    falhas = sum(1 for pedido in servidor.pedidos if pedido == ("GET", "/instavel"))
+                    self._responder(502 if falhas < 2 else 200)
+                elif self.path == "/arquivo":
+                    self._responder(200, b"x" * (1 << 20))
+                else:
+                    self._responder(200)
+
+            def do_POST(self):
+                self.rfile.read(int(self.headers.get("Content-Length") or 0))
+                self._responder(502)
+
+            def log_message(self, *args):
+                pass
+
+        self.http = http.server.ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.http.server_port}"
+
+    def __enter__(self):
+        threading.Thread(target=self.http.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self.http.shutdown()
+
+
+@sem_httpx
+def test_retry_como_o_create_session():
+    from src.settings.http_async import request_with_timeout_async
+
+    async def cenario(url):
+        async with create_async_session(retries=3, backoff_factor=0) as sessao:
+            instavel = await request_with_timeout_async(sessao, "GET", f"{url}/instavel", timeout=5)
+            post = await request_with_timeout_async(sessao, "POST", f"{url}/x", timeout=5, content=b"{}")
+            return instavel, post
+
+    with _Servidor() as servidor:
+        instavel, post = asyncio.run(cenario(servidor.url))
+
+    assert instavel.status_code == 200 and instavel.text == "ok"
+    # POST não é idempotente: não repete o 502
+    assert post.status_code == 502
+    assert servidor.pedidos.count(("GET", "/instavel")) == 3
+    assert servidor.pedidos.count(("POST", "/x")) == 1
+
+
+@sem_httpx
+def test_centenas_de_requisicoes_e_downloads_num_event_loop(tmp_path):
+    from src.settings.http_async import baixar_async, request_with_timeout_async
+
+    async def cenario(url):
+        async with create_async_session(retries=1, pools={"outros": 8}) as sessao:
+            vagas = asyncio.Semaphore(8)
+
+            async def consulta(i):
+                async with vagas:
+                    return (await request_with_timeout_async(sessao, "GET", f"{url}/c/{i}", timeout=5)).status_code
+
+            status = await asyncio.gather(*(consulta(i) for i in range(200)))
+            arquivos = await asyncio.gather(*(baixar_async(sessao, f"{url}/arquivo", tmp_path / f"{i}.pdf")
+                                              for i in range(4)))
+            return status, arquivos
+
+    with _Servidor() as servidor:
+        status, arquivos = asyncio.run(cenario(servidor.url))
+        conexoes = len(servidor.portas)
+
+    assert status == [200] * 200
+    assert all(caminho.stat().st_size == 1 << 20 for caminho in arquivos)
+    assert not list(tmp_path.glob("*.tmp"))
+    # as conexões são reaproveitadas: bem menos que uma por requisição
+    assert conexoes <= 12
@@ -0,0 +1,75 @@
+import pandas as pd
+
+from src.main.pipeline import incremental
+from src.utils import ledger
+from src.utils.ledger import Ledger
+
+
+def _planilha(linhas):
+    return pd.DataFrame(linhas, columns=[
+        "dataVehiclePlate", "dataUserId", "dataUserRentalId", "dataVehicleId",
+        "dataOccurrenceType", "dataOccurenceDate", "dataTrackingDate",
+    ])
+
+
+def test_fingerprint_ignora_formatacao():
+    a = pd.Series({"dataVehiclePlate": "abc1234 ", "dataUserId": 10.0, "dataOccurrenceType": 1})
+    b = pd.Series({"dataVehiclePlate": "ABC1234", "dataUserId": "10", "dataOccurrenceType": "1"})
+    c = pd.Series({"dataVehiclePlate": "ABC1234", "dataUserId": "10", "dataOccurrenceType": "2"})
+    assert incremental.fingerprint_linha(a) == incremental.fingerprint_linha(b)
+    assert incremental.fingerprint_linha(a) != incremental.fingerprint_linha(c)
+
+
+def test_fingerprints_por_coluna_iguais_aos_por_linha():
+    # os fingerprints ficam gravados no ledger: a versão por coluna não pode mudar nenhum deles
+    df = _planilha([
+        ["abc1234 ", 10.0, None, "101", 1, pd.Timestamp("2025-01-01 10:00"), "2025-01-01 11:00"],
+        ["XYZ9876", "-", "22.5", 102, "3", None, "nan"],
+        [None, "abc", 1e20, float("nan"), 4.0, pd.Timestamp("2025-01-02 10:00:00.5"), ""],
+    ])
+    df["dataOccurenceDate"] = pd.to_datetime(df["dataOccurenceDate"])
+    esperados = [incremental.fingerprint_linha(row) for _, row in df.iterrows()]
+    assert incremental.fingerprints_das_linhas(df) == esperados
+    assert incremental.fingerprints_das_linhas(df.drop(columns=["dataTrackingDate"])) == [
+        incremental.fingerprint_linha(row) for _, row in df.drop(columns=["dataTrackingDate"]).iterrows()
+    ]
+
+    # colunas numéricas, como o Excel entrega
+    numerica = _planilha([["ABC1234", v, 1, 101, 1, None, None] for v in (10.0, float("nan"), 1e20, 10.5, float("inf"))])
+    numerica["dataUserId"] = numerica["dataUserId"].astype("float64")
+    numerica["dataVehicleId"] = numerica["dataVehicleId"].astype("Int64")
+    assert incremental.fingerprints_das_linhas(numerica) == [
+        incremental.fingerprint_linha(row) for _, row in numerica.iterrows()
+    ]
+
+
+def test_so_linhas_novas_ou_alteradas(tmp_path, monkeypatch):
+    led = Ledger(tmp_path / "ledger.sqlite3")
+    monkeypatch.setattr(ledger, "_shared_ledger", led)
+
+    ontem = _planilha([
+        ["AAA1111", 1, 11, 101, 1, "2025-01-01 10:00", "2025-01-01 11:00"],
+        ["BBB2222", 2, 22, 102, 3, "2025-01-02 10:00", "2025-01-02 11:00"],
+    ])
+    filtrado, pendentes = incremental.selecionar_alteradas(ontem, led)
+    assert len(filtrado) == 2
+
+    # só o dossiê AAA1111_1 foi concluído: BBB2222_2 continua pendente
+    pdf = tmp_path / "dossie.pdf"
+    pdf.write_bytes(b"%PDF-1.4")
+    led.registrar("AAA1111_1", "DOSSIE", pdf)
+    assert incremental.confirmar_incremental(pendentes) == 1
+
+    hoje = _planilha([
+        ["AAA1111", 1, 11, 101, 1, "2025-01-01 10:00", "2025-01-01 11:00"],
+        ["BBB2222", 2, 22, 102, 3, "2025-01-02 10:00", "2025-01-02 11:00"],
+        ["CCC3333", 3, 33, 103, 4, "2025-01-03 10:00", "2025-01-03 11:00"],
+    ])
+    filtrado, pendentes = incremental.selecionar_alteradas(hoje, led)
+    assert sorted(filtrado["dataVehiclePlate"]) == ["BBB2222", "CCC3333"]
+
+    # linha alterada volta a ser processada e o dossiê anterior é esquecido
+    hoje.loc[0, "dataUserRentalId"] = 99
+    filtrado, pendentes = incremental.selecionar_alteradas(hoje, led)
+    assert "AAA1111_1" in pendentes
+    assert led.concluido("AAA1111_1", "DOSSIE") is None
@@ -0,0 +1,42 @@
+from src.utils import ledger
+from src.utils.ledger import Ledger, chave_documento
+
+
+def test_registrar_e_concluido(tmp_path):
+    led = Ledger(tmp_path / "ledger.sqlite3")
+    pdf = tmp_path / "ABC1234_10.pdf"
+    pdf.write_bytes(b"%PDF-1.4 conteudo")
+
+    assert led.concluido("ABC1234_10", "CNH") is None
+    assert led.registrar("ABC1234_10", "CNH", pdf) is True
+    assert led.concluido("ABC1234_10", "CNH") == str(pdf)
+    assert led.concluido("ABC1234_10", "CRLV") is None
+
+    # arquivo alterado ou removido deixa de contar como concluído
+    pdf.write_bytes(b"%PDF-1.4 truncado e maior")
+    assert led.concluido("ABC1234_10", "CNH") is None
+    pdf.unlink()
+    assert led.concluido("ABC1234_10", "CNH") is None
+
+    assert led.registrar("XYZ9876_20", "CONTRATO", erro="timeout") is False
+    assert led.resumo() == {"CNH": {"ok": 1}, "CONTRATO": {"falha": 1}}
+    led.fechar()
+
+
+def test_ja_concluido_so_na_retomada(tmp_path, monkeypatch):
+    led = Ledger(tmp_path / "ledger.sqlite3")
+    monkeypatch.setattr(ledger, "_shared_ledger", led)
+    pdf = tmp_path / "ABC1234_10.pdf"
+    pdf.write_bytes(b"%PDF-1.4")
+    ledger.registrar_documento("ABC1234_10", "DOSSIE", pdf)
+
+    monkeypatch.delenv("retomar", raising=False)
+    assert ledger.ja_concluido("ABC1234_10", "DOSSIE") is False
+    monkeypatch.setenv("retomar", "1")
+    assert ledger.ja_concluido("ABC1234_10", "DOSSIE") is True
+
+
+def test_chave_documento():
+    assert chave_documento(" abc1234 ", 10.0) == "ABC1234_10"
+    assert chave_documento("ABC1234", "") == "ABC1234_"
+    assert chave_documento("ABC1234") == "ABC1234"
@@ -0,0 +1,141 @@
+import http.server
+import json
+import os
+import sqlite3
+import subprocess
+import sys
+import threading
+from pathlib import Path
+
+import pandas as pd
+
+from src.main.pipeline.relatorio import CODIGO_FALHA
+
+RAIZ = Path(__file__).resolve().parents[1]
+
+
+def test_incremental_com_subprocess_retorna_erro_de_configuracao(monkeypatch):
+    import main
+
+    monkeypatch.delenv("incremental", raising=False)
+    # troca o sys.stdout do processo; aqui a saída é a captura do pytest
+    monkeypatch.setattr(main, "setup_utf8_encoding", lambda: None)
+    assert main.main(["--incremental", "--subprocess"]) == 1
+    assert main.main(["--vigiar", "--subprocess"]) == 1
+
+
+def test_headless_sem_token_sai_com_falha(tmp_path):
+    # SSO inalcançável: todas as etapas abortam sem token, e o cron precisa ver isso no código de saída
+    env = dict(
+        os.environ,
+        email="x", password="y", auth_url="http://127.0.0.1:9/token",
+        backendUrl="http://127.0.0.1:9", paymentsUrl="http://127.0.0.1:9",
+        excel=str(RAIZ / "src" / "utils" / "Relatório BOs.xlsx"),
+        geradorPath=str(tmp_path / "gerador"), saida=str(tmp_path / "cnh"), boOutputPath=str(tmp_path / "bo"),
+        CRLV_PATH=str(tmp_path / "crlv"), CONTRACT_PATH=str(tmp_path / "contract"),
+        ledgerPath=str(tmp_path / "ledger.sqlite3"), manifestoPath=str(tmp_path / "manifesto.json"),
+        eventosPath=str(tmp_path / "eventos.jsonl"), relatorioPath=str(tmp_path / "relatorio.json"),
+        maxRetries="1", backoff="0", tokenRenovacao="0",
+    )
+    processo = subprocess.run([sys.executable, "main.py", "--headless", "--sem-progresso"], cwd=RAIZ, env=env,
+                              stdin=subprocess.DEVNULL, capture_output=True, text=True, timeout=300)
+
+    assert processo.returncode == CODIGO_FALHA, processo.stdout[-2000:]
+    relatorio = json.loads((tmp_path / "relatorio.json").read_text(encoding="utf-8"))
+    assert relatorio["codigo_saida"] == CODIGO_FALHA
+    assert relatorio["etapas"]["cnh"]["status"] == "falha"
+    assert relatorio["etapas"]["bo"]["status"] == "falha"
+
+
+class _ApiFalsa(http.server.BaseHTTPRequestHandler):
+    """SSO que sempre entrega o mesmo token; as subclasses definem as respostas da API (do_GET)."""
+
+    def _responder(self, status, corpo):
+        dados = json.dumps(corpo).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(dados)))
+        self.end_headers()
+        self.wfile.write(dados)
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        self._responder(200, {"access_token": "recusado", "expires_in": 300})
+
+    def log_message(self, *args):
+        pass
+
+
+class _ApiQueRecusa(_ApiFalsa):
+    def do_GET(self):
+        self._responder(401, {})
+
+
+class _ApiSemDocumentos(_ApiFalsa):
+    """Usuário 1 sem CNH e veículo 101 sem BO; os demais dão erro 500."""
+
+    def do_GET(self):
+        if self.path.startswith("/UsuarioCnh/BuscarUrlCnh/1?"):
+            self._responder(200, {"dataResult": None})
+        elif self.path == "/bo/101/3":
+            self._responder(404, {})
+        else:
+            self._responder(500, {})
+
+
+def _coletar_cnh_e_bo(tmp_path, api, **extra):
+    """Roda os coletores de CNH e BO (como scripts) contra a API falsa; devolve as linhas do ledger."""
+    planilha = tmp_path / "planilha.xlsx"
+    pd.DataFrame({
+        "dataVehiclePlate": ["AAA1111", "BBB2222", "CCC3333"],
+        "dataUserId": [1, 2, 3],
+        "dataVehicleId": [101, 102, 103],
+        "dataUserRentalId": [11, 22, 33],
+        "dataOccurrenceType": [10, 10, 10],
+    }).to_excel(planilha, index=False)
+    servidor = http.server.ThreadingHTTPServer(("127.0.0.1", 0), api)
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{servidor.server_port}"
+    env = dict(
+        os.environ,
+        email="x", password="y", auth_url=f"{url}/token", backendUrl=url, boUrlTemplate=url + "/bo/{}/{}",
+        excel=str(planilha), geradorPath=str(tmp_path / "gerador"), saida=str(tmp_path / "cnh"),
+        boOutputPath=str(tmp_path / "bo"), ledgerPath=str(tmp_path / "ledger.sqlite3"),
+        manifestoPath=str(tmp_path / "manifesto.json"), eventosPath=str(tmp_path / "eventos.jsonl"),
+        tokenRenovacao="0", **extra,
+    )
+    try:
+        for script in ("driverLicense.py", "bo_download.py"):
+            subprocess.run([sys.executable, str(RAIZ / "src" / "main" / "geracao" / "coletas" / script)], cwd=RAIZ,
+                           env=env, stdin=subprocess.DEVNULL, capture_output=True, text=True, timeout=120)
+    finally:
+        servidor.shutdown()
+
+    with sqlite3.connect(tmp_path / "ledger.sqlite3") as conn:
+        return conn.execute("SELECT chave, tipo_doc, status, erro FROM documentos ORDER BY tipo_doc, chave").fetchall()
+
+
+def test_token_recusado_registra_falha_e_segue_para_os_demais(tmp_path):
+    linhas = _coletar_cnh_e_bo(tmp_path, _ApiQueRecusa)
+    # o 401 persistente não interrompe o laço: cada item fica registrado como falha
+    assert [linha[1:] for linha in linhas] == [("BO", "falha", "token recusado mesmo depois de renovado")] * 3 + \
+        [("CNH", "falha", "token recusado mesmo depois de renovado")] * 3
+
+
+def test_retomada_nao_registra_arquivo_antigo_quando_a_coleta_falha(tmp_path):
+    # PDFs de uma execução anterior continuam nas pastas na retomada
+    for pasta, nomes in (("cnh", ("AAA1111_1.pdf", "BBB2222_2.pdf")), ("bo", ("AAA1111_101_BO_3.pdf", "BBB2222_102_BO_3.pdf"))):
+        (tmp_path / pasta).mkdir()
+        for nome in nomes:
+            (tmp_path / pasta / nome).write_bytes(b"%PDF-1.4 antigo")
+
+    linhas = _coletar_cnh_e_bo(tmp_path, _ApiSemDocumentos, retomar="1")
+
+    assert linhas == [
+        ("AAA1111_101", "BO", "falha", "BO não encontrado na API"),
+        ("BBB2222_102", "BO", "falha", "falha ao buscar ou baixar o BO"),
+        ("CCC3333_103", "BO", "falha", "falha ao buscar ou baixar o BO"),
+        ("AAA1111_1", "CNH", "falha", "CNH não encontrada na API"),
+        ("BBB2222_2", "CNH", "falha", "falha ao buscar ou baixar a CNH"),
+        ("CCC3333_3", "CNH", "falha", "falha ao buscar ou baixar a CNH"),
+    ]
@@ -0,0 +1,56 @@
+import pandas as pd
+
+from src.utils.ocorrencia import (
+    normalizar_id,
+    normalizar_ids,
+    normalizar_placa,
+    normalizar_placas,
+    normalizar_tipo,
+    normalizar_tipos,
+    ocorrencia_da_linha,
+    ocorrencias,
+)
+
+
+def test_normalizacao_por_coluna_igual_a_por_valor():
+    ids = [10.0, "10", " 20.0 ", None, float("nan"), "-", "abc", "1e3", "inf", "10.5", pd.NA]
+    assert normalizar_ids(pd.Series(ids, dtype=object)).tolist() == [normalizar_id(v) for v in ids]
+    assert normalizar_ids(pd.Series([10, None, 30], dtype="Int64")).tolist() == ["10", "", "30"]
+    numeros = [10.0, float("nan"), 1e20, 10.5, float("inf")]
+    assert normalizar_ids(pd.Series(numeros)).tolist() == [normalizar_id(v) for v in numeros]
+    assert normalizar_tipos(pd.Series([1.0, float("nan"), 2.5])) == [1, None, None]
+
+    placas = [" abc1234 ", None, "nan", "-", "XYZ9876"]
+    assert normalizar_placas(pd.Series(placas, dtype=object)).tolist() == [normalizar_placa(v) for v in placas]
+    assert normalizar_placa(" abc1234 ") == "ABC1234"
+
+    tipos = ["1", 4.0, "1.5", None, "x", 10]
+    assert normalizar_tipos(pd.Series(tipos, dtype=object)) == [normalizar_tipo(v) for v in tipos] == [1, 4, None, None, None, 10]
+
+
+def test_ocorrencias_chave_com_alternativas():
+    df = pd.DataFrame({
+        "dataVehiclePlate": ["abc1234", "XYZ9876", "DEF5555", None, "GHIJKLM"],
+        "dataUserId": [10.0, None, "-", 40, None],
+        "dataUserRentalId": [None, 777, None, None, None],
+        "dataVehicleId": [None, None, 888, None, None],
+        "dataOccurrenceType": [1, "4", 10, 1, None],
+        "dataBranchAddress": [None, None, None, None, "Rua 1234"],
+    })
+    registros = ocorrencias(df)
+
+    assert [r.chave for r in registros] == ["ABC1234_10", "XYZ9876_777", "DEF5555_888", None, "GHIJKLM_1234"]
+    assert [r.fonte for r in registros][:3] == ["dataUserId", "dataUserRentalId", "dataVehicleId"]
+    assert registros[3].fonte.startswith("placa ausente")
+    assert registros[4].fonte == "regex"
+    assert [r.tipo for r in registros] == [1, 4, 10, 1, None]
+    assert registros[0].chave_usuario == "ABC1234_10"
+
+    # a mesma linha lida avulsa (streaming) dá o mesmo registro
+    for (indice, row), registro in zip(df.iterrows(), registros):
+        avulsa = ocorrencia_da_linha(row, indice)
+        assert (avulsa.chave, avulsa.placa, avulsa.user_id, avulsa.tipo) == (
+            registro.chave, registro.placa, registro.user_id, registro.tipo)
+
+    # registro compacto: sem __dict__ por instância
+    assert not hasattr(registros[0], "__dict__")
@@ -0,0 +1,37 @@
+import pandas as pd
+
+from src.main.pipeline.planner import Plano, carregar_manifesto, gerar_plano, salvar_manifesto
+from src.utils.fileUtils import compactar_tipos
+
+
+def _planilha():
+    return pd.DataFrame({
+        "dataVehiclePlate": ["aaa1111", "AAA1111", "BBB2222", "CCC3333", "DDD4444", "EEE5555"],
+        "dataUserId": [1.0, 1, 2, 3, None, 5],
+        "dataUserRentalId": [11, 11, 22, 33, None, 55],
+        "dataVehicleId": [101, 101, 102, 103, 104, 105],
+        "dataOccurrenceType": [1, 1, 4, 10, 12, 11],
+    })
+
+
+def test_plano_aplica_regras_por_tipo_e_deduplica():
+    plano = gerar_plano(_planilha())
+    chaves = {tipo: [item.chave for item in plano.itens(tipo)] for tipo in ("CNH", "CRLV", "CONTRATO", "BO")}
+
+    # tipo 1 usa tudo (linha repetida só uma vez); 4 e 10 sem contrato; 11 e 12 só CRLV; BO só no tipo 10
+    assert chaves["CNH"] == ["AAA1111_1", "BBB2222_2", "CCC3333_3"]
+    assert chaves["CRLV"] == ["AAA1111_1", "BBB2222_2", "CCC3333_3", "DDD4444", "EEE5555_5"]
+    assert chaves["CONTRATO"] == ["AAA1111_1"]
+    assert chaves["BO"] == ["CCC3333_103"]
+    assert plano.itens("BO")[0].bo_type == "3"
+    assert plano.ignorados["duplicado"] == 3
+    # mesmo plano a partir das colunas compactas de carregar_colunas
+    assert gerar_plano(compactar_tipos(_planilha())).documentos == plano.documentos
+
+
+def test_manifesto_ida_e_volta(tmp_path):
+    plano = gerar_plano(_planilha())
+    caminho = salvar_manifesto(plano, tmp_path / "manifesto.json")
+    carregado = carregar_manifesto(caminho)
+    assert isinstance(carregado, Plano)
+    assert carregado.documentos == plano.documentos
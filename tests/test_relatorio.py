@@ -0,0 +1,68 @@
+import json
+
+from src.main.pipeline import relatorio as rel
+from src.main.pipeline.relatorio import CODIGO_FALHA, CODIGO_INTERROMPIDO, CODIGO_OK, RelatorioExecucao
+from src.main.pipeline.scheduler import executar_grafo
+from src.utils.ledger import Ledger
+
+
+def test_medir_repete_etapa_e_define_codigo_saida(tmp_path, monkeypatch):
+    monkeypatch.setattr(rel, "_documentos_desde", lambda inicio: {"CNH": {"ok": 2, "falha": 1, "bytes": 300}})
+    chamadas = []
+
+    def executar(etapa):
+        chamadas.append(etapa)
+        return etapa == 'cnh' and len(chamadas) >= 2
+
+    relatorio = RelatorioExecucao(modo='processo')
+    medidas = {k: relatorio.medir(k, k.upper(), executar, repeticoes=2) for k in ('cnh', 'mergePDF')}
+    resultados = executar_grafo({'cnh': (), 'mergePDF': ('cnh',)}, lambda k: medidas[k](k))
+    relatorio.finalizar(resultados)
+
+    dados = json.loads(relatorio.salvar(tmp_path / "r.json").read_text(encoding='utf-8'))
+    assert dados["etapas"]["cnh"]["status"] == "ok"
+    assert dados["etapas"]["cnh"]["repeticoes"] == 1
+    assert dados["etapas"]["cnh"]["bytes"] == 300
+    assert dados["etapas"]["mergePDF"]["tentativas"] == 3
+    assert dados["codigo_saida"] == CODIGO_FALHA
+
+    abortado = RelatorioExecucao(modo='processo')
+    medidas = {k: abortado.medir(k, k, lambda e: False) for k in ('a', 'b')}
+    abortado.finalizar(executar_grafo({'a': (), 'b': ('a',)}, lambda k: medidas[k](k), ao_falhar=lambda e: False))
+    assert abortado.codigo_saida() == CODIGO_INTERROMPIDO
+    assert RelatorioExecucao(modo='processo').codigo_saida() == CODIGO_OK
+
+
+def test_ledger_desde_conta_documentos_e_bytes(tmp_path):
+    led = Ledger(tmp_path / "ledger.sqlite3")
+    pdf = tmp_path / "ABC1234_10.pdf"
+    pdf.write_bytes(b"%PDF-1.4 abc")
+    led.registrar("ABC1234_10", "CNH", pdf)
+    led.registrar("XYZ9876_20", "CNH", erro="timeout")
+    assert led.desde("2000-01-01T00:00:00") == {"CNH": {"ok": 1, "falha": 1, "bytes": pdf.stat().st_size}}
+    assert led.desde("2999-01-01T00:00:00") == {}
+    led.fechar()
+
+
+def test_etapa_que_aborta_ou_so_tem_falhas_conta_como_falha(monkeypatch):
+    import types
+
+    from src.main.pipeline import runner
+
+    etapa = types.ModuleType("etapa_falsa")
+    etapa.processar_boletins = lambda: False
+    monkeypatch.setitem(__import__("sys").modules, "etapa_falsa", etapa)
+    monkeypatch.setitem(runner.ETAPAS, "falsa", runner.Etapa("falsa", "Falsa", "etapa_falsa", "processar_boletins"))
+    assert runner.executar_etapa("falsa") is False
+    etapa.processar_boletins = lambda: None
+    assert runner.executar_etapa("falsa") is True
+
+    # a etapa terminou, mas todos os documentos da execução falharam no ledger
+    monkeypatch.setattr(rel, "_documentos_desde", lambda inicio: {"CNH": {"ok": 0, "falha": 3, "bytes": 0},
+                                                                   "BO": {"ok": 1, "falha": 2, "bytes": 10}})
+    relatorio = RelatorioExecucao(modo='processo')
+    medidas = {k: relatorio.medir(k, k, lambda e: True) for k in ('cnh', 'bo')}
+    relatorio.finalizar(executar_grafo({'cnh': (), 'bo': ()}, lambda k: medidas[k](k)))
+    assert relatorio.etapas["cnh"].status == "falha"
+    assert relatorio.etapas["bo"].status == "ok"
+    assert relatorio.codigo_saida() == CODIGO_FALHA
@@ -0,0 +1,64 @@
+import pandas as pd
+
+from src.main.pipeline import runner
+from src.main.pipeline.incremental import CAMPOS_FINGERPRINT
+from src.main.pipeline.planner import COLUNAS_PLANO, preparar_plano
+from src.main.pipeline.validacao import COLUNAS_COORDENADAS, preparar_validacao
+from src.utils import fileUtils
+from src.utils.ocorrencia import COLUNAS_EXECUCAO, COLUNAS_OCORRENCIA
+
+
+class _AuthFalso:
+    def get_token(self):
+        return "token"
+
+
+def test_pipeline_nao_le_colunas_que_nenhuma_etapa_usa(tmp_path, monkeypatch):
+    import src.settings.auth as auth
+
+    p = tmp_path / "planilha.xlsx"
+    pd.DataFrame({
+        "dataVehiclePlate": ["ABC1234", None],
+        "dataUserId": [10, 20],
+        "dataVehicleId": [100, 200],
+        "dataUserRentalId": [1000, 2000],
+        "dataOccurrenceType": [1, 1],
+        "dataNameUser": ["Fulano", "Beltrano"],
+        "dataObservacoes": ["x" * 1000, "y" * 1000],
+    }).to_excel(p, index=False)
+    monkeypatch.setenv("excel", str(p))
+    monkeypatch.delenv("excelPage", raising=False)
+    monkeypatch.delenv("shard", raising=False)
+    monkeypatch.setenv("manifestoPath", str(tmp_path / "manifesto.json"))
+    monkeypatch.setenv("manifesto", "")
+    monkeypatch.setattr(auth, "get_auth", lambda: _AuthFalso())
+    monkeypatch.setattr(runner, "importar_etapas", lambda: None)
+
+    leituras = []
+    original = fileUtils._ler_arquivo
+
+    def registrando(caminho, aba, usecols=None):
+        leituras.append(usecols)
+        return original(caminho, aba, usecols)
+
+    monkeypatch.setattr(fileUtils, "_workbook_cache", {})
+    monkeypatch.setattr(fileUtils, "_ler_arquivo", registrando)
+    try:
+        assert runner.preparar_contexto()
+        # coleta/merge recortam da pré-carga (sem planilha instalada)
+        recortes = [fileUtils.carregar_colunas(COLUNAS_OCORRENCIA)]
+        # o recorte não vira mais uma cópia no cache, ao lado da pré-carga
+        assert len(fileUtils._workbook_cache) == 1
+        assert preparar_validacao() == {"sem placa": 1}
+        plano = preparar_plano()
+        recortes += [fileUtils.read_workbook(), fileUtils.carregar_colunas(COLUNAS_PLANO)]
+    finally:
+        fileUtils.instalar_planilha(None)
+
+    # uma única leitura do arquivo, já restrita às colunas das etapas
+    assert len(leituras) == 1 and leituras[0] is not None
+    assert leituras[0]("dataNameUser") and not leituras[0]("dataObservacoes")
+    assert all("dataObservacoes" not in df.columns for df in recortes)
+    assert [item.chave for item in plano.itens("CNH")] == ["ABC1234_10"]
+    # validação e incremental também só precisam de colunas já carregadas
+    assert set(CAMPOS_FINGERPRINT) | set(COLUNAS_COORDENADAS) | set(COLUNAS_PLANO) <= set(COLUNAS_EXECUCAO)
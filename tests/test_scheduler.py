@@ -0,0 +1,42 @@
+import threading
+import time
+
+from src.main.pipeline.scheduler import executar_grafo, ordem_topologica
+
+
+def test_ordem_topologica_detecta_ciclo():
+    assert ordem_topologica({'a': (), 'b': ('a',)}) == ['a', 'b']
+    try:
+        ordem_topologica({'a': ('b',), 'b': ('a',)})
+        assert False, 'Expected ValueError for cycle'
+    except ValueError:
+        pass
+
+
+def test_executar_grafo_paraleliza_independentes():
+    ativos = []
+    pico = []
+    lock = threading.Lock()
+    ordem = []
+
+    def executar(etapa):
+        with lock:
+            ativos.append(etapa)
+            pico.append(len(ativos))
+        time.sleep(0.05)
+        with lock:
+            ativos.remove(etapa)
+            ordem.append(etapa)
+        return etapa != 'b'
+
+    deps = {'a': (), 'b': (), 'c': (), 'merge': ('a', 'b', 'c')}
+    resultados = executar_grafo(deps, executar)
+    assert max(pico) == 3
+    assert ordem[-1] == 'merge'
+    assert resultados == {'a': True, 'b': False, 'c': True, 'merge': True}
+
+
+def test_executar_grafo_interrompe_quando_falha():
+    deps = {'a': (), 'merge': ('a',)}
+    resultados = executar_grafo(deps, lambda e: False, ao_falhar=lambda e: False)
+    assert resultados == {'a': False, 'merge': None}
@@ -0,0 +1,40 @@
+import pandas as pd
+import pytest
+
+from src.main.pipeline.shards import filtrar_shard, ler_shard, pasta_shard, unir_shards
+
+
+def test_ler_shard_valida_formato():
+    assert ler_shard("2/4") == (2, 4)
+    for invalido in ("0/4", "5/4", "1", "a/b"):
+        with pytest.raises(ValueError):
+            ler_shard(invalido)
+
+
+def test_shards_particionam_as_linhas_sem_sobreposicao():
+    df = pd.DataFrame({
+        "dataVehiclePlate": [f"ABC{i:04d}" for i in range(40)] + ["ABC0001"],
+        "dataUserId": list(range(40)) + [1],
+    })
+    fatias = [filtrar_shard(df, i, 3) for i in (1, 2, 3)]
+    assert sum(len(f) for f in fatias) == len(df)
+    chaves = [set(f["dataVehiclePlate"] + "_" + f["dataUserId"].astype(str)) for f in fatias]
+    assert not (chaves[0] & chaves[1]) and not (chaves[1] & chaves[2]) and not (chaves[0] & chaves[2])
+    # a mesma chave cai sempre no mesmo shard
+    assert any((f["dataVehiclePlate"] == "ABC0001").sum() == 2 for f in fatias)
+
+
+def test_unir_shards_copia_pdfs_e_exige_todos_os_shards(tmp_path, monkeypatch):
+    monkeypatch.setenv("shardsPath", str(tmp_path / "shards"))
+    for indice in (1, 2):
+        pasta = pasta_shard(indice, 2) / "gerador" / "cnh"
+        pasta.mkdir(parents=True)
+        (pasta / f"ABC000{indice}_{indice}.pdf").write_bytes(b"%PDF-1.4")
+    destino = tmp_path / "gerador"
+    (destino / "cnh").mkdir(parents=True)
+    (destino / "cnh" / "ANTIGO_1.pdf").write_bytes(b"%PDF-1.4")
+
+    assert unir_shards(2, destino)["cnh"] == 2
+    assert sorted(p.name for p in (destino / "cnh").iterdir()) == ["ABC0001_1.pdf", "ABC0002_2.pdf"]
+    with pytest.raises(ValueError):
+        unir_shards(3, destino)
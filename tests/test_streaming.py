@@ -0,0 +1,129 @@
+import threading
+import time
+
+import pandas as pd
+
+from src.main.pipeline import streaming
+
+
+def test_linhas_por_chave_dedup():
+    df = pd.DataFrame({
+        "dataVehiclePlate": ["ABC1234", "ABC1234", "XYZ9876"],
+        "dataUserId": [10.0, 10, 20],
+        "dataVehicleId": [1, 1, 2],
+        "dataUserRentalId": [5, 5, 6],
+        "dataOccurrenceType": [1, 1, 4],
+    })
+    linhas = streaming.linhas_por_chave(df)
+    assert list(linhas) == ["ABC1234_10", "XYZ9876_20"]
+
+
+def test_executar_streaming_limita_em_voo(monkeypatch):
+    df = pd.DataFrame({
+        "dataVehiclePlate": [f"AAA{i:04d}" for i in range(8)],
+        "dataUserId": list(range(100, 108)),
+        "dataVehicleId": list(range(1, 9)),
+        "dataUserRentalId": list(range(11, 19)),
+        "dataOccurrenceType": [1] * 8,
+    })
+
+    class FakeAuth:
+        def get_token(self):
+            return "token"
+
+    monkeypatch.setattr("src.settings.auth.get_auth", lambda: FakeAuth())
+    monkeypatch.setattr(streaming, "preparar_pastas", lambda: None)
+
+    lock = threading.Lock()
+    ativos = []
+    pico = []
+
+    def fake_dossie(chave, row, session, data_hora):
+        with lock:
+            ativos.append(chave)
+            pico.append(len(ativos))
+        time.sleep(0.02)
+        with lock:
+            ativos.remove(chave)
+        return chave != "AAA0003_103"
+
+    monkeypatch.setattr(streaming, "processar_dossie", fake_dossie)
+    resultados = streaming.executar_streaming(max_em_voo=3, df=df)
+
+    assert len(resultados) == 8
+    assert max(pico) <= 3
+    assert resultados["AAA0003_103"] is False
+    assert sum(resultados.values()) == 7
+
+
+def test_executar_streaming_comeca_antes_de_ler_a_planilha_inteira(monkeypatch):
+    lidas = []
+
+    def linhas():
+        for i in range(20):
+            lidas.append(i)
+            yield i, pd.Series({"dataVehiclePlate": f"BBB{i:04d}", "dataUserId": 200 + i, "dataVehicleId": i + 1,
+                                "dataUserRentalId": 300 + i, "dataOccurrenceType": 1}, dtype=object)
+
+    class FakeAuth:
+        def get_token(self):
+            return "token"
+
+    monkeypatch.setattr("src.settings.auth.get_auth", lambda: FakeAuth())
+    monkeypatch.setattr("src.utils.fileUtils.iterar_linhas", lambda: linhas())
+    monkeypatch.setattr(streaming, "preparar_pastas", lambda: None)
+
+    lidas_no_primeiro = []
+
+    def fake_dossie(chave, row, session, data_hora):
+        if chave == "BBB0000_200":
+            lidas_no_primeiro.append(len(lidas))
+        return True
+
+    monkeypatch.setattr(streaming, "processar_dossie", fake_dossie)
+    resultados = streaming.executar_streaming(max_em_voo=2)
+
+    assert len(resultados) == 20
+    assert lidas_no_primeiro[0] < 20
+
+
+def test_planilha_invalida_falha_antes_de_limpar_as_pastas(tmp_path, monkeypatch):
+    import pytest
+
+    class FakeAuth:
+        def get_token(self):
+            return "token"
+
+    limpezas = []
+    monkeypatch.setattr("src.settings.auth.get_auth", lambda: FakeAuth())
+    monkeypatch.setattr(streaming, "preparar_pastas", lambda: limpezas.append(1))
+    monkeypatch.setenv("excel", str(tmp_path / "nao_existe.xlsx"))
+
+    with pytest.raises(ValueError):
+        streaming.executar_streaming(max_em_voo=2)
+    assert limpezas == []
+
+
+def test_dossies_da_mesma_placa_nao_disputam_o_arquivo_mesclado(tmp_path):
+    from concurrent.futures import ThreadPoolExecutor
+
+    from PyPDF2 import PdfReader, PdfWriter
+
+    from src.main.geracao.gerador import mergePDF
+
+    dossies = []
+    for paginas, chave in ((1, "ABC1234_10"), (2, "ABC1234_20")):
+        escritor = PdfWriter()
+        for _ in range(paginas):
+            escritor.add_blank_page(width=72, height=72)
+        origem = tmp_path / f"{chave}.pdf"
+        escritor.write(str(origem))
+        dossies.append((chave, origem))
+
+    # mesma placa, mesmo tipo e mesma data_hora da execução, mesclados em paralelo
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        caminhos = list(executor.map(
+            lambda dossie: mergePDF.mesclar_dossie(dossie[0], 1, [dossie[1]], tmp_path, "20260101_000000"), dossies))
+
+    assert len(set(caminhos)) == 2
+    assert [len(PdfReader(str(caminho)).pages) for caminho in caminhos] == [1, 2]
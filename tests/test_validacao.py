@@ -0,0 +1,70 @@
+import pandas as pd
+
+from src.main.pipeline import streaming
+from src.main.pipeline.validacao import (
+    coordenada_invalida,
+    coordenadas_invalidas,
+    motivo_rejeicao,
+    motivos_rejeicao,
+    preparar_validacao,
+)
+from src.utils import fileUtils
+from src.utils.ocorrencia import ocorrencia_da_linha
+
+
+def planilha():
+    return pd.DataFrame({
+        "dataVehiclePlate": ["ABC1234", None, "DEF5555", "GHI1111", "JKL2222", "MNO3333", "PQR4444", "STU5555"],
+        "dataUserId": [10, 11, 12, 13, "-", "-", 16, 17],
+        "dataVehicleId": [100, 101, 102, None, 104, 105, 106, 107],
+        "dataUserRentalId": [500, 501, 502, 503, 504, None, 506, None],
+        "dataOccurrenceType": [1, 1, 99, 12, 4, 12, 12, 1],
+        "dataOccurenceAddress": ["-23.6, -46.5", "-23.6, -46.5", "-", "Rua A, 10", "-23.6, -46.5",
+                                 "-23.6, -46.5", "-123.6, -46.5", "-23.6 -46.5"],
+    })
+
+
+MOTIVOS = [None, "sem placa", "tipo de ocorrência desconhecido", "sem vehicleId", "sem userId", None,
+           "coordenadas inválidas em dataOccurenceAddress", "sem rentalId"]
+
+
+def test_motivos_por_coluna_iguais_aos_por_linha():
+    df = planilha()
+    assert motivos_rejeicao(df) == MOTIVOS
+    assert [motivo_rejeicao(ocorrencia_da_linha(row, i)) for i, row in df.iterrows()] == MOTIVOS
+
+    valores = ["-23.6, -46.5", " +10,20 ", "-23.6 -46.5", "91, 0", "10, 181", "Rua A, 10", "-", None, float("nan"), -23.6, "1,2,3"]
+    assert coordenadas_invalidas(pd.Series(valores, dtype=object)).tolist() == [coordenada_invalida(v) for v in valores]
+    assert [coordenada_invalida(v) for v in valores] == [False, False, True, True, True, False, False, False, False, True, True]
+
+
+def test_preparar_validacao_tira_as_rejeitadas_da_execucao(tmp_path, monkeypatch):
+    from src.main.pipeline.planner import gerar_plano
+
+    monkeypatch.delenv("validarPlanilha", raising=False)
+    try:
+        contagem = preparar_validacao(planilha())
+        validas = fileUtils.read_workbook()
+    finally:
+        fileUtils.instalar_planilha(None)
+
+    assert sum(contagem.values()) == 6
+    assert validas["dataVehiclePlate"].tolist() == ["ABC1234", "MNO3333"]
+    relatorio = pd.read_csv(tmp_path / "rejeitadas.csv", encoding="utf-8-sig")
+    assert relatorio.columns[0] == "motivo"
+    assert relatorio["motivo"].tolist() == [m for m in MOTIVOS if m]
+    assert {item.placa for item in gerar_plano(validas).itens("CRLV")} == {"ABC1234", "MNO3333"}
+
+    # sem rejeitadas, o relatório da execução anterior não fica para trás
+    preparar_validacao(planilha().iloc[[0]])
+    assert not (tmp_path / "rejeitadas.csv").exists()
+
+    monkeypatch.setenv("validarPlanilha", "0")
+    assert preparar_validacao(planilha()) == {}
+
+
+def test_streaming_rejeita_antes_de_montar_o_dossie():
+    rejeitadas = []
+    chaves = dict(streaming.chaves_unicas(planilha().iterrows(), rejeitadas))
+    assert list(chaves) == ["ABC1234_10", "MNO3333_105"]
+    assert [r["motivo"] for r in rejeitadas] == [m for m in MOTIVOS if m]
@@ -0,0 +1,33 @@
+import threading
+
+from src.main.pipeline.vigia import arquivos_prontos, vigiar
+from src.utils.fileUtils import read_workbook
+
+
+def test_arquivos_prontos_espera_exportacao_estabilizar(tmp_path):
+    (tmp_path / "a.csv").write_text("dataVehiclePlate\nABC1234\n", encoding="utf-8")
+    (tmp_path / "~$b.xlsx").write_bytes(b"lock")
+    (tmp_path / "notas.txt").write_text("x", encoding="utf-8")
+    vistos = {}
+    assert arquivos_prontos(tmp_path, vistos) == []
+    assert arquivos_prontos(tmp_path, vistos) == [str(tmp_path / "a.csv")]
+    (tmp_path / "a.csv").write_text("dataVehiclePlate\nABC1234\nXYZ9876\n", encoding="utf-8")
+    assert arquivos_prontos(tmp_path, vistos) == []
+
+
+def test_vigiar_processa_e_arquiva_cada_planilha(tmp_path, monkeypatch):
+    monkeypatch.setenv("excel", "")
+    (tmp_path / "lote1.csv").write_text("dataVehiclePlate,dataUserId\nABC1234,10\n", encoding="utf-8")
+    (tmp_path / "lote2.jsonl").write_text('{"dataVehiclePlate": "XYZ9876", "dataUserId": 20}\n', encoding="utf-8")
+    parar = threading.Event()
+    placas = []
+
+    def executar():
+        placas.extend(read_workbook()["dataVehiclePlate"].tolist())
+        if len(placas) == 2:
+            parar.set()
+        return 0
+
+    assert vigiar(tmp_path, executar, intervalo=0.01, parar=parar) == 0
+    assert sorted(placas) == ["ABC1234", "XYZ9876"]
+    assert sorted(p.name.split("_", 2)[-1] for p in (tmp_path / "processados").iterdir()) == ["lote1.csv", "lote2.jsonl"]